@@ -1,9 +1,15 @@
-from flask import Flask, jsonify, render_template
+from flask import Flask, Response, jsonify, render_template, request
 from flask_cors import CORS
+import click
+import json
 import os
+import time
 import sqlite3
 from werkzeug.security import generate_password_hash
 from dotenv import load_dotenv
+from database import configure_connection, close_db_connection
+from migrations import current_version, migrate
+from utils.metrics import metrics, instrument_app, cache_samples
 
 
 app = Flask(__name__)
@@ -14,21 +20,122 @@ load_dotenv()
 # Load environment variables
 app.config['SECRET_KEY'] = os.getenv("SECRET_KEY", "dev-secret-key-2024")
 app.config['DATABASE'] = os.path.join("instance", "database.db")
+# One connection per request (WAL, synchronous=NORMAL), memory-mapping up to this many bytes
+app.config['DATABASE_MMAP_SIZE'] = int(os.getenv("DATABASE_MMAP_SIZE", 64 * 1024 * 1024))
 app.config['TMDB_API_KEY'] = os.getenv("TMDB_API_KEY")
 
-# Initialize database
+# Cached /recommendations body; other workers notice admin writes within this many seconds
+app.config['RECOMMENDATIONS_VERSION_CHECK_INTERVAL'] = float(os.getenv("RECOMMENDATIONS_VERSION_CHECK_INTERVAL", 1.0))
+
+# /recommendations?sort=ranked: per-category lists blending curated, similar,
+# trending and popular movies, re-ranked in the background of every process
+app.config['RECOMMENDATIONS_RANKING_ENABLED'] = os.getenv("RECOMMENDATIONS_RANKING_ENABLED", "1") == "1"
+app.config['RECOMMENDATIONS_RANKING_SIZE'] = int(os.getenv("RECOMMENDATIONS_RANKING_SIZE", 50))
+app.config['RECOMMENDATIONS_RANKING_INTERVAL'] = float(os.getenv("RECOMMENDATIONS_RANKING_INTERVAL", 300))
+app.config['RECOMMENDATIONS_RANKING_CHECK_INTERVAL'] = float(os.getenv("RECOMMENDATIONS_RANKING_CHECK_INTERVAL", 5))
+
+# Background jobs: JOB_WORKER_THREADS per process; set JOB_WORKERS_ENABLED=0
+# and run `flask run-jobs` to keep them out of the web workers entirely
+app.config['JOB_WORKERS_ENABLED'] = os.getenv("JOB_WORKERS_ENABLED", "1") == "1"
+app.config['JOB_WORKER_THREADS'] = int(os.getenv("JOB_WORKER_THREADS", 2))
+app.config['JOB_POLL_INTERVAL'] = float(os.getenv("JOB_POLL_INTERVAL", 1.0))
+app.config['JOB_LOCK_TIMEOUT'] = float(os.getenv("JOB_LOCK_TIMEOUT", 300))
+
+# Latency histograms and counters, kept per thread and summed across worker
+# processes through METRICS_PATH every METRICS_FLUSH_INTERVAL seconds
+app.config['METRICS_ENABLED'] = os.getenv("METRICS_ENABLED", "1") == "1"
+app.config['METRICS_PATH'] = os.path.join("instance", "metrics.db")
+app.config['METRICS_FLUSH_INTERVAL'] = float(os.getenv("METRICS_FLUSH_INTERVAL", 5))
+# /metrics answers only these client addresses ("*" for any); behind a reverse
+# proxy every request comes from the proxy, so block /metrics there instead
+app.config['METRICS_ALLOWED_IPS'] = tuple(
+    ip.strip() for ip in os.getenv("METRICS_ALLOWED_IPS", "127.0.0.1,::1").split(",") if ip.strip()
+)
+
+# Admin dashboard stats are reused for this many seconds
+app.config['DASHBOARD_CACHE_TTL'] = float(os.getenv("DASHBOARD_CACHE_TTL", 10))
+
+# TMDB HTTP client: one pooled keep-alive session per worker process
+app.config['TMDB_BASE_URL'] = os.getenv("TMDB_BASE_URL", "https://api.themoviedb.org/3")
+app.config['TMDB_POOL_SIZE'] = int(os.getenv("TMDB_POOL_SIZE", 10))
+app.config['TMDB_MAX_RETRIES'] = int(os.getenv("TMDB_MAX_RETRIES", 2))
+app.config['TMDB_CONNECT_TIMEOUT'] = float(os.getenv("TMDB_CONNECT_TIMEOUT", 3.05))
+app.config['TMDB_READ_TIMEOUT'] = float(os.getenv("TMDB_READ_TIMEOUT", 10))
+app.config['TMDB_BATCH_CONCURRENCY'] = int(os.getenv("TMDB_BATCH_CONCURRENCY", 8))
+# Admin bulk imports fetch on a pool of their own so they never queue ahead of
+# user-facing /api/movies lookups
+app.config['TMDB_BULK_CONCURRENCY'] = int(os.getenv("TMDB_BULK_CONCURRENCY", 2))
+
+# Upstream protection: shared token bucket, retries with jittered backoff
+# (bounded by TMDB_RETRY_BUDGET seconds) and a circuit breaker
+app.config['TMDB_RATE_LIMIT'] = float(os.getenv("TMDB_RATE_LIMIT", 40))
+app.config['TMDB_RATE_BURST'] = float(os.getenv("TMDB_RATE_BURST", 40))
+app.config['TMDB_RETRY_BUDGET'] = float(os.getenv("TMDB_RETRY_BUDGET", 5))
+app.config['TMDB_BREAKER_FAILURE_RATIO'] = float(os.getenv("TMDB_BREAKER_FAILURE_RATIO", 0.5))
+app.config['TMDB_BREAKER_MIN_CALLS'] = int(os.getenv("TMDB_BREAKER_MIN_CALLS", 10))
+app.config['TMDB_BREAKER_COOLDOWN'] = float(os.getenv("TMDB_BREAKER_COOLDOWN", 15))
+
+# TMDB response cache: "sqlite" is shared by all gunicorn workers,
+# "memory" is per-process and "none" disables caching
+app.config['TMDB_CACHE_BACKEND'] = os.getenv("TMDB_CACHE_BACKEND", "sqlite")
+app.config['TMDB_CACHE_PATH'] = os.path.join("instance", "tmdb_cache.db")
+app.config['TMDB_CACHE_MAX_ENTRIES'] = int(os.getenv("TMDB_CACHE_MAX_ENTRIES", 5000))
+# Category feeds are served stale for up to this many seconds past their TTL
+# while refreshed in the background, or while TMDB is erroring
+app.config['TMDB_CACHE_STALE_TTL'] = int(os.getenv("TMDB_CACHE_STALE_TTL", 24 * 60 * 60))
+app.config['TMDB_COALESCE_ACROSS_WORKERS'] = os.getenv("TMDB_COALESCE_ACROSS_WORKERS", "1") == "1"
+# TMDB 404s are remembered this long; with the sqlite backend missing movie
+# ids go in a bitmap file shared by all workers instead of the cache
+app.config['TMDB_NEGATIVE_TTL'] = int(os.getenv("TMDB_NEGATIVE_TTL", 60 * 60))
+app.config['TMDB_MISSING_IDS_PATH'] = os.path.join("instance", "tmdb_missing_ids")
+
+# Offline TMDB snapshot filled by `flask ingest-catalog`; TMDB_SNAPSHOT_FIRST
+# answers details, feeds and search from it before going upstream, and it
+# stands in for TMDB whenever the API fails either way
+app.config['CATALOG_ENABLED'] = os.getenv("CATALOG_ENABLED", "1") == "1"
+app.config['CATALOG_PATH'] = os.path.join("instance", "catalog.db")
+app.config['TMDB_SNAPSHOT_FIRST'] = os.getenv("TMDB_SNAPSHOT_FIRST", "0") == "1"
+app.config['CATALOG_INGEST_PAGES'] = int(os.getenv("CATALOG_INGEST_PAGES", 25))
+app.config['CATALOG_INGEST_CONCURRENCY'] = int(os.getenv("CATALOG_INGEST_CONCURRENCY", 8))
+
+# Serialized, gzip/brotli-compressed response bodies kept per worker process
+app.config['RESPONSE_CACHE_MAX_BYTES'] = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+
+# /img/<size>/<name> proxy for TMDB images, kept on disk up to IMAGE_CACHE_MAX_BYTES
+# (least recently used deleted first) and sent with IMAGE_MAX_AGE cache headers;
+# IMAGE_THUMBNAIL_WIDTHS are extra sizes resized locally when Pillow is installed
+app.config['IMAGE_CACHE_DIR'] = os.path.join("instance", "images")
+app.config['IMAGE_CACHE_MAX_BYTES'] = int(os.getenv("IMAGE_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+app.config['IMAGE_BASE_URL'] = os.getenv("IMAGE_BASE_URL", "https://image.tmdb.org/t/p")
+app.config['IMAGE_MAX_AGE'] = int(os.getenv("IMAGE_MAX_AGE", 365 * 24 * 60 * 60))
+app.config['IMAGE_THUMBNAIL_WIDTHS'] = tuple(
+    int(width) for width in os.getenv("IMAGE_THUMBNAIL_WIDTHS", "120,240,320").split(",") if width.strip()
+)
+
+# Local FTS5 search index filled from every movie payload fetched from TMDB;
+# /search only goes upstream when it has fewer than SEARCH_LOCAL_MIN_RESULTS hits
+app.config['SEARCH_INDEX_ENABLED'] = os.getenv("SEARCH_INDEX_ENABLED", "1") == "1"
+app.config['SEARCH_INDEX_PATH'] = os.path.join("instance", "search_index.db")
+app.config['SEARCH_LOCAL_MIN_RESULTS'] = int(os.getenv("SEARCH_LOCAL_MIN_RESULTS", 20))
+
+# In-memory title suggestions for /search/suggest, per worker process
+app.config['SUGGEST_MAX_TITLES'] = int(os.getenv("SUGGEST_MAX_TITLES", 200000))
+
+# Background cache warmer for the first pages of every category feed
+app.config['CACHE_WARMER_ENABLED'] = os.getenv("CACHE_WARMER_ENABLED", "0") == "1"
+app.config['CACHE_WARMER_PAGES'] = int(os.getenv("CACHE_WARMER_PAGES", 5))
+app.config['CACHE_WARMER_INTERVAL'] = int(os.getenv("CACHE_WARMER_INTERVAL", 300))
+app.config['CACHE_WARMER_CONCURRENCY'] = int(os.getenv("CACHE_WARMER_CONCURRENCY", 4))
+app.config['CACHE_WARMER_RATE'] = float(os.getenv("CACHE_WARMER_RATE", 10))
+
+# Initialize database: apply pending migrations and create the default admin
 def init_db():
     os.makedirs("instance", exist_ok=True)
-    conn = sqlite3.connect(app.config['DATABASE'])
-    
-    # Import and create tables
-    from models.admin_model import create_admin_table
-    from models.recommendation_model import create_recommendation_table
-    from models.user_model import create_user_table
+    applied = migrate(app.config['DATABASE'])
+    if applied:
+        print(f"Applied database migrations: {applied}")
     
-    create_admin_table(conn)
-    create_recommendation_table(conn)
-    create_user_table(conn)
+    conn = configure_connection(sqlite3.connect(app.config['DATABASE']))
     
     # Create default admin user if not exists
     cursor = conn.cursor()
@@ -36,7 +143,7 @@ def init_db():
     if cursor.fetchone()[0] == 0:
         password_hash = generate_password_hash("admin123")
         cursor.execute(
-            "INSERT INTO admin (username, password_hash) VALUES (?, ?)",
+            "INSERT OR IGNORE INTO admin (username, password_hash) VALUES (?, ?)",
             ("admin", password_hash)
         )
         print("Default admin created: username='admin', password='admin123'")
@@ -45,6 +152,42 @@ def init_db():
     conn.close()
     print("Database initialized successfully!")
 
+# Schema setup runs once per process at startup instead of on every request;
+# with DATABASE_MIGRATE_ON_STARTUP=0 run `flask migrate-db` as a deploy step
+app.config['DATABASE_MIGRATE_ON_STARTUP'] = os.getenv("DATABASE_MIGRATE_ON_STARTUP", "1") == "1"
+if app.config['DATABASE_MIGRATE_ON_STARTUP']:
+    init_db()
+
+@app.cli.command("migrate-db")
+def migrate_db_command():
+    """Apply pending database migrations and create the default admin"""
+    if not app.config['DATABASE_MIGRATE_ON_STARTUP']:
+        init_db()
+    conn = sqlite3.connect(app.config['DATABASE'])
+    print(f"Database schema at version {current_version(conn)}")
+    conn.close()
+
+# Each request shares one database connection, closed when the request ends
+app.teardown_appcontext(close_db_connection)
+
+metrics.configure(
+    app.config['METRICS_PATH'],
+    app.config['METRICS_FLUSH_INTERVAL'],
+    app.config['METRICS_ENABLED']
+)
+if app.config['METRICS_ENABLED']:
+    instrument_app(app)
+
+@app.route("/metrics")
+def metrics_endpoint():
+    """Prometheus metrics for all worker processes"""
+    allowed = app.config['METRICS_ALLOWED_IPS']
+    if not app.config['METRICS_ENABLED'] or ("*" not in allowed and request.remote_addr not in allowed):
+        return jsonify({"error": "Resource not found"}), 404
+    from utils.cache import get_cache
+    body = metrics.render(cache_samples(get_cache().stats()))
+    return Response(body, mimetype="text/plain; version=0.0.4")
+
 # Import and register blueprints
 from routes.public_routes import public_bp
 from routes.api_routes import api_bp
@@ -54,6 +197,114 @@ app.register_blueprint(public_bp)
 app.register_blueprint(api_bp, url_prefix="/api")
 app.register_blueprint(admin_bp, url_prefix="/admin")
 
+# Cache warmer, started by the first request of every process (like the job
+# workers below) but only one warms per interval
+from services.cache_warmer import get_cache_warmer
+
+@app.before_request
+def start_cache_warmer():
+    if app.config['CACHE_WARMER_ENABLED']:
+        get_cache_warmer().start()
+
+# Job workers for slow admin operations (TMDB lookups), started by the first
+# request of every process so CLI commands and a preloading master run none
+from services.job_queue import get_job_worker
+
+@app.before_request
+def start_job_worker():
+    if app.config['JOB_WORKERS_ENABLED']:
+        get_job_worker().start()
+
+# Ranked recommendation lists, re-ranked by a daemon thread that the first
+# request of every process starts, like the job workers
+from services.recommendation_ranking import get_recommendation_ranker
+
+@app.before_request
+def start_recommendation_ranker():
+    if app.config['RECOMMENDATIONS_RANKING_ENABLED']:
+        get_recommendation_ranker().start()
+
+@app.cli.command("warm-cache")
+@click.option("--pages", type=int, help="Pages per category (defaults to CACHE_WARMER_PAGES)")
+@click.option("--loop", is_flag=True, help="Keep refreshing every CACHE_WARMER_INTERVAL seconds")
+def warm_cache_command(pages, loop):
+    """Prefetch the first pages of every category feed into the TMDB cache"""
+    cache_warmer = get_cache_warmer()
+    if pages:
+        cache_warmer.pages = pages
+    while True:
+        print(json.dumps(cache_warmer.warm(), indent=2))
+        if not loop:
+            break
+        time.sleep(cache_warmer.interval)
+
+@app.cli.command("build-search-index")
+def build_search_index_command():
+    """Index every movie currently held in the TMDB cache"""
+    from utils.cache import get_cache
+    from utils.search_index import get_search_index
+    index = get_search_index()
+    if index is None:
+        print("Search index is disabled (SEARCH_INDEX_ENABLED=0)")
+        return
+    indexed = 0
+    for key, data in get_cache().items():
+        indexed += index.index_payload(key.split('?', 1)[0], data)
+    print(f"Indexed {indexed} movie records, {index.count()} unique movies in the index")
+
+@app.cli.command("ingest-catalog")
+@click.option("--pages", type=int, help="Pages per category feed (defaults to CATALOG_INGEST_PAGES)")
+@click.option("--concurrency", type=int, help="Parallel TMDB requests (defaults to CATALOG_INGEST_CONCURRENCY)")
+@click.option("--refresh", is_flag=True, help="Also re-fetch snapshot movies TMDB changed since the last refresh")
+@click.option("--restart", is_flag=True, help="Drop the queue left by an interrupted run instead of resuming it")
+def ingest_catalog_command(pages, concurrency, refresh, restart):
+    """Download category feeds and movie details into the offline catalog snapshot"""
+    from models.recommendation_model import get_all_recommendations
+    from services.catalog_ingest import CatalogIngest
+    from utils.api_client import get_client
+    from utils.catalog import get_catalog
+    catalog = get_catalog()
+    if catalog is None:
+        print("Catalog is disabled (CATALOG_ENABLED=0)")
+        return
+    ingest = CatalogIngest.from_config(app, get_client(), catalog)
+    if pages:
+        ingest.pages = pages
+    if concurrency:
+        ingest.concurrency = concurrency
+    curated = [rec['movie_id'] for rec in get_all_recommendations()]
+    print(json.dumps(ingest.run(refresh=refresh, restart=restart, extra_ids=curated), indent=2))
+    print(json.dumps(catalog.stats(), indent=2))
+
+@app.cli.command("run-jobs")
+@click.option("--threads", type=int, help="Worker threads (defaults to JOB_WORKER_THREADS)")
+def run_jobs_command(threads):
+    """Process the background job queue until interrupted"""
+    job_worker = get_job_worker()
+    if threads:
+        job_worker.threads = threads
+    job_worker.start()
+    print(f"Processing jobs with {job_worker.threads} threads, Ctrl+C to stop")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        job_worker.stop()
+
+@app.cli.command("import-recommendations")
+@click.argument("source", type=click.File("r"))
+@click.option("--category", default="Featured", help="Category for items that do not name one")
+def import_recommendations_command(source, category):
+    """Bulk-add recommendations from a JSON or CSV file of movie IDs ('-' for stdin)"""
+    from services.recommendation_service import RecommendationService, parse_bulk_items
+    items = parse_bulk_items(source.read(), category)
+    results = RecommendationService.add_bulk_recommendations(items)
+    for result in results:
+        if result["status"] != "added":
+            print(f"{result['movie_id']}: {result['status']} - {result.get('error')}")
+    added = sum(1 for r in results if r["status"] == "added")
+    print(f"Added {added} of {len(results)} recommendations")
+
 # Admin Template Routes
 @app.route('/admin/login-page')
 def admin_login_page():
@@ -71,22 +322,6 @@ def manage_recommendations_page():
 def manage_users_page():
     return render_template('admin/manage_users.html')
 
-# Initialize database on app start
-@app.before_request
-def initialize_database():
-    # Check if database file exists and is initialized
-    if not os.path.exists(app.config['DATABASE']):
-        init_db()
-    else:
-        # Verify tables exist by checking one table
-        try:
-            conn = sqlite3.connect(app.config['DATABASE'])
-            conn.execute("SELECT 1 FROM admin LIMIT 1")
-            conn.close()
-        except sqlite3.OperationalError:
-            # Tables don't exist, initialize database
-            init_db()
-
 # Error handlers
 @app.errorhandler(404)
 def not_found(error):
@@ -101,7 +336,4 @@ def bad_request(error):
     return jsonify({"error": "Bad request"}), 400
 
 if __name__ == "__main__":
-    # Ensure database is initialized when starting the app
-    if not os.path.exists(app.config['DATABASE']):
-        init_db()
     app.run(debug=True, port=5000)
\ No newline at end of file
@@ -0,0 +1,65 @@
+"""Bulk ingest into the catalog snapshot and lookups served from it.
+
+Runs `CatalogIngest` against the realistic stub TMDB, then times detail
+lookups from the snapshot against the SQLite TMDB cache and reports the
+snapshot size per movie.
+
+Usage: python benchmarks/bench_catalog.py [pages] [concurrency]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from services.catalog_ingest import CatalogIngest
+from stub_tmdb import start_stub_server
+from utils.api_client import TMDBClient
+from utils.cache import SQLiteCache, make_cache_key
+
+
+def per_call(fn, ids):
+    start = time.perf_counter()
+    for movie_id in ids:
+        fn(movie_id)
+    return (time.perf_counter() - start) / len(ids) * 1e6
+
+
+def main():
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    server, base_url = start_stub_server(realistic=True, latency_ms=20)
+    with tempfile.TemporaryDirectory() as directory:
+        config = {
+            'TMDB_API_KEY': "bench", 'TMDB_BASE_URL': base_url,
+            'TMDB_CACHE_BACKEND': "sqlite", 'TMDB_CACHE_PATH': os.path.join(directory, "cache.db"),
+            'TMDB_RATE_LIMIT': 1000, 'TMDB_RATE_BURST': 1000,
+            'CATALOG_PATH': os.path.join(directory, "catalog.db"),
+            'SEARCH_INDEX_ENABLED': False
+        }
+        cache = SQLiteCache(config['TMDB_CACHE_PATH'], max_entries=100000)
+        client = TMDBClient(config, cache=cache)
+        catalog = client.catalog
+        ingest = CatalogIngest(client, catalog, pages=pages, concurrency=concurrency, log=lambda message: None)
+        report = ingest.run()
+        print(f"ingest: {report['fetched']} movies, {report['pages']} pages in {report['duration']:.1f}s "
+              f"({report['fetched'] / report['duration']:.0f} movies/s at {concurrency} concurrent)")
+
+        ids = sorted(catalog.movie_ids())
+        params = {'append_to_response': 'credits,videos,similar'}
+        for movie_id in ids:
+            data, _ = catalog.get_movie(movie_id)
+            cache.set(make_cache_key(f"movie/{movie_id}", params), data, 86400)
+        sample = [random.choice(ids) for _ in range(5000)]
+        print(f"snapshot lookup  {per_call(catalog.get_movie, sample):7.1f}us")
+        print(f"cache lookup     {per_call(lambda i: cache.get(make_cache_key(f'movie/{i}', params)), sample):7.1f}us")
+        size = catalog.stats()["size_bytes"]
+        print(f"snapshot size    {size / 1024:.0f}KB ({size / len(ids):.0f} bytes per movie incl. feed pages)")
+        client.close()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Admin dashboard stats as the tables grow: old row-loading code vs StatsService.
+
+Usage: python benchmarks/bench_dashboard.py [max_users]
+"""
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from flask import Flask
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from benchmarks.bench_listing import seed
+from database import close_db_connection, get_db_connection
+from migrations import migrate
+from models.recommendation_model import get_all_recommendations
+from services.stats_service import StatsService
+
+
+def old_dashboard():
+    conn = get_db_connection()
+    users_count = conn.execute('SELECT COUNT(*) FROM users').fetchone()[0]
+    recommendations = get_all_recommendations()
+    return {
+        "users": users_count,
+        "recommendations": len(recommendations),
+        "active_recommendations": len([r for r in recommendations if r['is_active']]),
+        "recent_recommendations": recommendations[:5]
+    }
+
+
+def timed(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    max_users = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    users = 10000
+    while users <= max_users:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "database.db")
+            migrate(path)
+            app = Flask(__name__)
+            app.config['DATABASE'] = path
+            app.teardown_appcontext(close_db_connection)
+            with app.app_context():
+                seed(get_db_connection(), users, users // 10)
+                old = timed(old_dashboard, 3)
+                new = timed(lambda: StatsService.compute_dashboard_stats(30), 50)
+            print(f"{users:>8} users  old {old:>9.2f}ms  stats service {new:>6.3f}ms (uncached)")
+        users *= 10
+
+
+if __name__ == "__main__":
+    main()
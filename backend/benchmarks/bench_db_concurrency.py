@@ -0,0 +1,148 @@
+"""Concurrent /recommendations reads against a steady stream of admin writes.
+
+Each reader process stands in for a gunicorn worker. "per-call" replays the
+old behaviour (a fresh connection per model call, rollback journal);
+"per-request" goes through database.get_db_connection (one WAL connection
+per request, synchronous=NORMAL, mmap, busy timeout).
+
+Usage: python benchmarks/bench_db_concurrency.py [readers] [seconds]
+"""
+import multiprocessing
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+SEED_RECOMMENDATIONS = 500
+
+
+def seed(path, journal_mode):
+    from models.recommendation_model import create_recommendation_table
+    from models.user_model import create_user_table
+
+    conn = sqlite3.connect(path)
+    conn.execute(f"PRAGMA journal_mode={journal_mode}")
+    create_recommendation_table(conn)
+    create_user_table(conn)
+    conn.executemany(
+        "INSERT INTO recommendations (movie_id, movie_title, description, image_url, category) "
+        "VALUES (?, ?, ?, ?, ?)",
+        [(i, f"Movie {i}", "A description " * 10, f"/poster{i}.jpg", "action")
+         for i in range(SEED_RECOMMENDATIONS)]
+    )
+    conn.commit()
+    conn.close()
+
+
+def per_call_request(path):
+    # What every model function used to do: connect, query, close
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    rows = conn.execute(
+        "SELECT * FROM recommendations WHERE is_active = 1 ORDER BY created_at DESC"
+    ).fetchall()
+    conn.close()
+    return [dict(row) for row in rows]
+
+
+def per_call_write(path, movie_id):
+    conn = sqlite3.connect(path)
+    cursor = conn.execute(
+        "INSERT INTO recommendations (movie_id, movie_title, description, image_url, category) "
+        "VALUES (?, ?, ?, ?, ?)", (movie_id, "New", "", "", "drama")
+    )
+    conn.commit()
+    conn.execute("DELETE FROM recommendations WHERE id = ?", (cursor.lastrowid,))
+    conn.commit()
+    conn.close()
+
+
+def make_app(path):
+    from flask import Flask
+    from database import close_db_connection
+
+    app = Flask(__name__)
+    app.config['DATABASE'] = path
+    app.teardown_appcontext(close_db_connection)
+    return app
+
+
+def reader(mode, path, seconds, results):
+    from models.recommendation_model import get_all_recommendations
+
+    app = make_app(path)
+    done = errors = 0
+    latencies = []
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            if mode == "per-call":
+                per_call_request(path)
+            else:
+                with app.app_context():
+                    get_all_recommendations()
+            done += 1
+            latencies.append(time.perf_counter() - start)
+        except sqlite3.OperationalError:
+            errors += 1
+    results.put((done, errors, latencies))
+
+
+def writer(mode, path, stop):
+    from models.recommendation_model import create_recommendation, delete_recommendation
+
+    app = make_app(path)
+    movie_id = 10 ** 6
+    while not stop.is_set():
+        movie_id += 1
+        if mode == "per-call":
+            per_call_write(path, movie_id)
+        else:
+            with app.app_context():
+                delete_recommendation(create_recommendation(movie_id, "New", "", "", "drama"))
+        time.sleep(0.005)
+
+
+def run(mode, readers, seconds, directory):
+    path = os.path.join(directory, f"{mode}.db")
+    seed(path, "DELETE" if mode == "per-call" else "WAL")
+    results = multiprocessing.Queue()
+    stop = multiprocessing.Event()
+    write_process = multiprocessing.Process(target=writer, args=(mode, path, stop))
+    write_process.start()
+    processes = [
+        multiprocessing.Process(target=reader, args=(mode, path, seconds, results))
+        for _ in range(readers)
+    ]
+    for process in processes:
+        process.start()
+    outcomes = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    stop.set()
+    write_process.join()
+
+    done = sum(outcome[0] for outcome in outcomes)
+    errors = sum(outcome[1] for outcome in outcomes)
+    latencies = sorted(latency for outcome in outcomes for latency in outcome[2])
+    p99 = latencies[int(len(latencies) * 0.99)] * 1000 if latencies else 0
+    print(f"{mode:<12} {done / seconds:>9.1f} req/s  p99 {p99:>7.2f}ms  "
+          f"locked errors {errors}")
+
+
+def main():
+    readers = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 5
+    print(f"{readers} reader processes, 1 writer, {seconds:.0f}s each, "
+          f"{SEED_RECOMMENDATIONS} recommendations")
+    with tempfile.TemporaryDirectory() as directory:
+        run("per-call", readers, seconds, directory)
+        run("per-request", readers, seconds, directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Compare per-call requests.get against the pooled TMDBClient session.
+
+Usage: python benchmarks/bench_http_session.py [requests] [threads]
+"""
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from benchmarks.stub_tmdb import start_stub_server
+from utils.api_client import TMDBClient
+from utils.cache import NullCache
+
+
+def run(label, fetch, total, threads):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(lambda _: fetch(), range(total)))
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {total / elapsed:>10.1f} req/s  ({elapsed:.2f}s)")
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    server, base_url = start_stub_server()
+
+    def bare_get():
+        response = requests.get(f"{base_url}/movie/popular",
+                                params={"page": 1, "api_key": "bench"}, timeout=10)
+        response.raise_for_status()
+        return response.json()
+
+    client = TMDBClient(config={
+        "TMDB_API_KEY": "bench",
+        "TMDB_BASE_URL": base_url,
+        "TMDB_POOL_SIZE": threads,
+        "TMDB_RATE_LIMIT": 100000,
+        "TMDB_RATE_BURST": 100000,
+        "SEARCH_INDEX_ENABLED": False
+    }, cache=NullCache())
+
+    print(f"{total} requests, {threads} threads against {base_url}")
+    run("before: requests.get", bare_get, total, threads)
+    run("after: pooled TMDBClient", lambda: client.get_popular_movies(1), total, threads)
+    client.close()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
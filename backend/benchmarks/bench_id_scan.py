@@ -0,0 +1,78 @@
+"""Upstream calls caused by a bot walking sequential movie ids.
+
+Forks several worker processes that share one SQLite cache and the
+missing-id bitmap, and has each of them look up the same range of ids
+(none of which exist upstream) a few times over. Before negative caching
+every lookup went to TMDB.
+
+Usage: python benchmarks/bench_id_scan.py [ids] [workers] [passes]
+"""
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from benchmarks.stub_tmdb import StubHandler, start_stub_server
+from utils.api_client import TMDBClient
+
+NOT_FOUND = b'{"success": false, "status_code": 34, "status_message": "The resource you requested could not be found."}'
+
+
+def count_call(counter):
+    with counter.get_lock():
+        counter.value += 1
+
+
+def missing_movie_handler(counter):
+    class MissingMovieHandler(StubHandler):
+        def do_GET(self):
+            count_call(counter)
+            self.send_response(404)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(NOT_FOUND)))
+            self.end_headers()
+            self.wfile.write(NOT_FOUND)
+    return MissingMovieHandler
+
+
+def scan(config, ids, passes):
+    client = TMDBClient(config)
+    for _ in range(passes):
+        for movie_id in range(1, ids + 1):
+            assert client.get_movie_details(movie_id).get('status_code') == 404
+    client.close()
+
+
+def main():
+    ids = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    passes = int(sys.argv[3]) if len(sys.argv) > 3 else 3
+    counter = multiprocessing.Value('i', 0)
+    server, base_url = start_stub_server()
+    server.RequestHandlerClass = missing_movie_handler(counter)
+
+    with tempfile.TemporaryDirectory() as directory:
+        config = {
+            'TMDB_API_KEY': 'bench', 'TMDB_BASE_URL': base_url,
+            'TMDB_CACHE_BACKEND': 'sqlite', 'TMDB_CACHE_PATH': os.path.join(directory, 'cache.db'),
+            'TMDB_RATE_LIMIT': 100000, 'TMDB_RATE_BURST': 100000, 'SEARCH_INDEX_ENABLED': False
+        }
+        start = time.perf_counter()
+        processes = [multiprocessing.Process(target=scan, args=(config, ids, passes)) for _ in range(workers)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        elapsed = time.perf_counter() - start
+
+    lookups = ids * workers * passes
+    print(f"{lookups} lookups of {ids} missing ids by {workers} workers x {passes} passes in {elapsed:.1f}s")
+    print(f"upstream calls: {counter.value} (previously {lookups})")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Listing queries on a seeded database: unbounded SELECT vs OFFSET vs keyset pages.
+
+Seeds 1M users and 100k recommendations (about 10% inactive, 20 categories)
+through the real migrations, then times the model functions.
+
+Usage: python benchmarks/bench_listing.py [users] [recommendations]
+"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+from flask import Flask
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from database import close_db_connection, get_db_connection
+from migrations import migrate
+from models.recommendation_model import get_all_recommendations, get_recommendations_page
+from models.user_model import get_all_users, get_users_page
+from utils.pagination import decode_cursor, next_cursor
+
+CATEGORIES = [f"Category {i}" for i in range(20)]
+PAGE = 50
+
+
+def seed(conn, users, recommendations):
+    rng = random.Random(42)
+    start = time.perf_counter()
+    # Spread creation times over ~3 years with plenty of same-second ties
+    conn.executemany(
+        "INSERT INTO users (name, email, created) "
+        "VALUES (?, ?, datetime('2023-01-01', '+' || ? || ' seconds'))",
+        ((f"User {i}", f"user{i}@example.com", i * 90) for i in range(users))
+    )
+    conn.executemany(
+        "INSERT INTO recommendations (movie_id, movie_title, description, image_url, category, is_active, created_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, datetime('2023-01-01', '+' || ? || ' seconds'))",
+        ((i, f"Movie {i}", "A description", f"/p{i}.jpg", rng.choice(CATEGORIES),
+          0 if rng.random() < 0.1 else 1, i * 900) for i in range(recommendations))
+    )
+    conn.commit()
+    conn.execute("ANALYZE")
+    print(f"seeded {users} users, {recommendations} recommendations "
+          f"in {time.perf_counter() - start:.1f}s")
+
+
+def timed(label, fn, repeat=20):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    print(f"{label:<52} p50 {statistics.median(timings):>9.3f}ms")
+
+
+def deep_cursor(fetch, columns, pages):
+    """Cursor `pages` pages into a listing, found by walking it"""
+    after = None
+    for _ in range(pages):
+        rows = fetch(after)
+        after = decode_cursor(next_cursor(rows, PAGE, *columns), 2)
+    return after
+
+
+def main():
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    recommendations = int(sys.argv[2]) if len(sys.argv) > 2 else 100000
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "database.db")
+        migrate(path)
+        app = Flask(__name__)
+        app.config['DATABASE'] = path
+        app.teardown_appcontext(close_db_connection)
+        with app.app_context():
+            conn = get_db_connection()
+            seed(conn, users, recommendations)
+
+            timed("recommendations: all active (old endpoint)", get_all_recommendations, 3)
+            timed("recommendations: first page", lambda: get_recommendations_page(PAGE))
+            after = deep_cursor(lambda a: get_recommendations_page(PAGE, a), ('created_at', 'id'), 200)
+            timed("recommendations: page 200 by keyset", lambda: get_recommendations_page(PAGE, after))
+            timed("recommendations: page 200 by OFFSET", lambda: conn.execute(
+                "SELECT * FROM recommendations WHERE is_active = 1 "
+                "ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?", (PAGE, PAGE * 200)).fetchall())
+            timed("recommendations: category first page", lambda: get_recommendations_page(PAGE, None, CATEGORIES[3]))
+            after = deep_cursor(lambda a: get_recommendations_page(PAGE, a, CATEGORIES[3]), ('created_at', 'id'), 50)
+            timed("recommendations: category page 50 by keyset",
+                  lambda: get_recommendations_page(PAGE, after, CATEGORIES[3]))
+            timed("recommendations: inactive first page", lambda: get_recommendations_page(PAGE, None, None, False))
+
+            timed("users: all (old endpoint)", get_all_users, 3)
+            timed("users: first page", lambda: get_users_page(PAGE))
+            after = deep_cursor(lambda a: get_users_page(PAGE, a), ('created', 'id'), 2000)
+            timed("users: page 2000 by keyset", lambda: get_users_page(PAGE, after))
+            timed("users: page 2000 by OFFSET", lambda: conn.execute(
+                "SELECT * FROM users ORDER BY created DESC, id DESC LIMIT ? OFFSET ?",
+                (PAGE, PAGE * 2000)).fetchall())
+
+
+if __name__ == "__main__":
+    main()
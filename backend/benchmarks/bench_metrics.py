@@ -0,0 +1,70 @@
+"""Hot-path cost of the metrics instrumentation.
+
+Times a single histogram observation, a trivial Flask route with and
+without the request hooks, and a primary-key SELECT on a plain vs a timed
+SQLite connection.
+
+Usage: python benchmarks/bench_metrics.py [iterations]
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+from flask import Flask, jsonify
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from database import TimedConnection
+from utils.metrics import Metrics, instrument_app
+
+
+def per_call(fn, iterations, repeat=5):
+    """Best of `repeat` runs of the mean time per call, in microseconds"""
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        runs.append((time.perf_counter() - start) / iterations * 1e6)
+    return min(runs)
+
+
+def make_app(instrumented):
+    app = Flask(__name__)
+    if instrumented:
+        instrument_app(app)
+
+    @app.route("/ping")
+    def ping():
+        return jsonify({"ok": True})
+    return app
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    recorder = Metrics()
+    print(f"observe()          {per_call(lambda: recorder.observe('http_request_duration_seconds', ('GET', '/ping', '200'), 0.003), iterations * 10):6.2f}us")
+
+    for instrumented in (False, True):
+        client = make_app(instrumented).test_client()
+        label = "request + hooks" if instrumented else "request"
+        print(f"{label:<18} {per_call(lambda: client.get('/ping'), iterations // 10):6.2f}us")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.db")
+        setup = sqlite3.connect(path)
+        setup.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, name TEXT)")
+        setup.executemany("INSERT INTO t VALUES (?, ?)", ((i, f"row {i}") for i in range(1000)))
+        setup.commit()
+        setup.close()
+        for factory in (sqlite3.Connection, TimedConnection):
+            conn = sqlite3.connect(path, factory=factory)
+            label = "timed SELECT" if factory is TimedConnection else "plain SELECT"
+            print(f"{label:<18} {per_call(lambda: conn.execute('SELECT name FROM t WHERE id = ?', (500,)).fetchone(), iterations):6.2f}us")
+            conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Payload sizes before and after field projection.
+
+Compares what used to be cached and sent (TMDB's raw JSON) with the slimmed
+cache entry and the default card projection, for a category page and a
+movie with full credits and a full page of similar titles.
+
+Usage: python benchmarks/bench_projection.py
+"""
+import gzip
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from benchmarks.bench_response_cache import category_page, movie_details
+from routes.api_routes import _movie_info
+from utils.projection import CARD_FIELDS, project_page, slim_payload
+
+
+def raw_movie():
+    data = movie_details()
+    data["credits"]["cast"] = [dict(data["credits"]["cast"][0], id=i, cast_id=i, credit_id=f"c{i}",
+                                    gender=1, known_for_department="Acting", popularity=12.5)
+                               for i in range(60)]
+    data["credits"]["crew"] = data["credits"]["crew"] * 40
+    data["videos"] = {"results": [dict(v, id=f"v{i}", iso_639_1="en", size=1080, official=True)
+                                  for i, v in enumerate(data["videos"] * 4)]}
+    data["similar"] = dict(category_page())
+    return data
+
+
+def old_movie_info(data):
+    """/api/movie/<id> as served before: appended lists sliced but not projected"""
+    return dict(
+        _movie_info(data),
+        cast=data["credits"]["cast"][:10],
+        crew=data["credits"]["crew"][:5],
+        videos=[v for v in data["videos"]["results"] if v["site"] == "YouTube"][:3],
+        similar=data["similar"]["results"][:6]
+    )
+
+
+def sizes(data):
+    body = json.dumps(data).encode("utf-8")
+    return len(body), len(gzip.compress(body, mtime=0))
+
+
+def report(label, data):
+    identity, gzipped = sizes(data)
+    print(f"  {label:<28} {identity:>7}B  gzip {gzipped:>6}B")
+
+
+def main():
+    page = category_page()
+    print("category page")
+    report("raw (cached and sent)", page)
+    report("cache entry", slim_payload("movie/popular", page))
+    report("sent (card projection)", project_page(slim_payload("movie/popular", page), CARD_FIELDS))
+
+    movie = raw_movie()
+    print("movie details")
+    report("raw cache entry", movie)
+    report("cache entry", slim_payload("movie/1000", movie))
+    report("sent before", old_movie_info(movie))
+    report("sent", _movie_info(slim_payload("movie/1000", movie)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Refresh time of the ranked recommendation lists at 100k candidates.
+
+Builds a similarity index of synthetic movies (see bench_similarity.py),
+picks curated movies per category and a trending list, then times the
+shared trending/popularity scores and the per-category blend that a full
+and an incremental refresh run. Cards are left out: they are a handful of
+SQLite lookups per category.
+
+Usage: python benchmarks/bench_ranking.py [movies] [categories] [curated_per_category]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from bench_similarity import synthetic_movie
+from services.recommendation_ranking import RecommendationRanker
+from utils.similarity import SimilarityIndex
+
+
+class BenchRanker(RecommendationRanker):
+    def __init__(self, trending, **kwargs):
+        super().__init__(None, **kwargs)
+        self.trending = trending
+
+    def _trending_movies(self):
+        return self.trending
+
+    def _items(self, category, ranked, seeds, rows):
+        return ranked[:self.size]
+
+
+def best_of(fn, repeat=5):
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - start)
+    return min(runs) * 1000
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    categories = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    per_category = int(sys.argv[3]) if len(sys.argv) > 3 else 50
+    rng = random.Random(7)
+    index = SimilarityIndex()
+    index.load(synthetic_movie(rng, i, 50000) for i in range(1, count + 1))
+    curated = {f"Category {c}": rng.sample(range(1, count + 1), per_category) for c in range(categories)}
+    trending = [{'id': i} for i in rng.sample(range(1, count + 1), 100)]
+    ranker = BenchRanker(trending)
+
+    base_ms = best_of(lambda: ranker._base_scores(index))
+    ranker._base = ranker._base_scores(index)
+    category, seeds = next(iter(curated.items()))
+    category_ms = best_of(lambda: ranker._rank(index, category, seeds, []))
+    everything = [movie_id for seeds in curated.values() for movie_id in seeds]
+    all_ms = best_of(lambda: ranker._rank(index, None, everything, []))
+
+    print(f"{count} candidates, {categories} categories x {per_category} curated")
+    print(f"shared trending/popularity scores  {base_ms:7.2f}ms")
+    print(f"one category ({per_category} seeds)          {category_ms:7.2f}ms")
+    print(f"all categories list ({len(everything)} seeds)   {all_ms:7.2f}ms")
+    print(f"full refresh                        {base_ms + categories * category_ms + all_ms:7.2f}ms")
+    print(f"incremental (one category edited)   {category_ms + all_ms:7.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
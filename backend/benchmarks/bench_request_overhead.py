@@ -0,0 +1,77 @@
+"""Per-request cost of the old before_request database probe.
+
+"probe" reproduces the removed hook (os.path.exists plus a fresh SQLite
+connection querying `admin` on every request); "migrated" is the current
+setup, where migrations ran once at startup and a route that does not need
+the database never opens it.
+
+Usage: python benchmarks/bench_request_overhead.py [requests]
+"""
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+from flask import Flask, jsonify
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from database import close_db_connection
+from migrations import migrate
+
+
+def make_app(path, probe):
+    app = Flask(__name__)
+    app.config['DATABASE'] = path
+    app.teardown_appcontext(close_db_connection)
+
+    if probe:
+        @app.before_request
+        def initialize_database():
+            if not os.path.exists(app.config['DATABASE']):
+                migrate(app.config['DATABASE'])
+            else:
+                try:
+                    conn = sqlite3.connect(app.config['DATABASE'])
+                    conn.execute("SELECT 1 FROM admin LIMIT 1")
+                    conn.close()
+                except sqlite3.OperationalError:
+                    migrate(app.config['DATABASE'])
+
+    # Stands in for a TMDB proxy route served from cache
+    @app.route('/trending')
+    def trending():
+        return jsonify({"page": 1, "results": []})
+
+    return app
+
+
+def run(label, app, total):
+    client = app.test_client()
+    for _ in range(200):
+        client.get('/trending')
+    timings = []
+    for _ in range(total):
+        start = time.perf_counter()
+        client.get('/trending')
+        timings.append((time.perf_counter() - start) * 1e6)
+    timings.sort()
+    print(f"{label:<10} p50 {statistics.median(timings):>7.1f}us  "
+          f"p99 {timings[int(len(timings) * 0.99)]:>7.1f}us")
+    return statistics.median(timings)
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "database.db")
+        migrate(path)
+        before = run("probe", make_app(path, probe=True), total)
+        after = run("migrated", make_app(path, probe=False), total)
+    print(f"saved {before - after:.1f}us per request ({(before - after) / before:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Bytes on the wire and per-hit CPU: jsonify on every request vs pre-encoded bodies.
+
+Uses TMDB-shaped payloads (a category page and a movie with credits,
+videos and similar titles) and times building the response in a request
+context, which is the work a cache hit used to repeat.
+
+Usage: python benchmarks/bench_response_cache.py [iterations]
+"""
+import os
+import statistics
+import sys
+import time
+
+from flask import Flask, jsonify
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from utils.response_cache import encode_body, send_encoded, brotli
+
+
+def category_page():
+    return {
+        "page": 1,
+        "results": [{
+            "adult": False, "backdrop_path": f"/backdrop{i}.jpg", "genre_ids": [28, 12, 878],
+            "id": 1000 + i, "original_language": "en", "original_title": f"Movie Title {i}",
+            "overview": "A reluctant hero is drawn into a conflict far bigger than expected. " * 4,
+            "popularity": 1234.5 - i, "poster_path": f"/poster{i}.jpg", "release_date": "2024-05-01",
+            "title": f"Movie Title {i}", "video": False, "vote_average": 7.4, "vote_count": 2500 + i
+        } for i in range(20)],
+        "total_pages": 500,
+        "total_results": 10000
+    }
+
+
+def movie_details():
+    data = dict(category_page()["results"][0])
+    data.update({
+        "runtime": 128, "budget": 150000000, "revenue": 620000000, "status": "Released",
+        "genres": [{"id": 28, "name": "Action"}, {"id": 12, "name": "Adventure"}],
+        "credits": {
+            "cast": [{"id": i, "name": f"Actor {i}", "character": f"Character {i}",
+                      "profile_path": f"/actor{i}.jpg", "order": i} for i in range(10)],
+            "crew": [{"id": i, "name": f"Crew {i}", "job": "Director",
+                      "department": "Directing"} for i in range(5)]
+        },
+        "videos": [{"key": f"video{i}", "site": "YouTube", "type": "Trailer"} for i in range(3)],
+        "similar": category_page()["results"][:6]
+    })
+    return data
+
+
+def timed(fn, iterations):
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1e6)
+    return statistics.median(timings)
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    app = Flask(__name__)
+    print(f"brotli {'available' if brotli else 'not installed (gzip only)'}")
+    for label, data in (("category page", category_page()), ("movie details", movie_details())):
+        with app.test_request_context(headers={"Accept-Encoding": "gzip, br"}):
+            body = encode_body(data)
+            before = timed(lambda: jsonify(data), iterations)
+            after = timed(lambda: send_encoded(body), iterations)
+        sizes = f"identity {len(body.identity)}B  gzip {len(body.gzip)}B"
+        if body.br:
+            sizes += f"  br {len(body.br)}B"
+        print(f"{label:<14} {sizes}  (one-off encode {body.encode_time * 1e6:.0f}us)")
+        print(f"{'':<14} jsonify {before:.1f}us -> pre-encoded {after:.1f}us per response")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Time local FTS5 searches over a synthetic catalog.
+
+Usage: python benchmarks/bench_search_index.py [movies] [queries]
+"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from itertools import accumulate
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from utils.search_index import SearchIndex
+
+SYLLABLES = "ka lo mi ra ne to su vi an el or ith dar mon sel tra gor bel fin ash".split()
+
+
+def make_vocabulary(size, rng):
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def synthetic_movies(count, vocabulary, rng):
+    # Zipf-like word choice: a few words are very common, most are rare
+    cum_weights = list(accumulate(1 / (rank + 1) for rank in range(len(vocabulary))))
+    for movie_id in range(1, count + 1):
+        title = " ".join(rng.choices(vocabulary, cum_weights=cum_weights,
+                                     k=rng.randint(1, 4))).title()
+        yield {
+            "id": movie_id,
+            "title": title,
+            "original_title": title,
+            "overview": "",
+            "release_date": f"{rng.randint(1950, 2025)}-01-01",
+            "popularity": rng.expovariate(1 / 20),
+            "vote_average": round(rng.uniform(1, 10), 1),
+            "vote_count": rng.randint(0, 20000),
+            "genre_ids": [rng.choice([18, 28, 35, 27, 878])]
+        }
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    queries = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    rng = random.Random(42)
+    vocabulary = make_vocabulary(20000, rng)
+    with tempfile.TemporaryDirectory() as tmp:
+        index = SearchIndex(os.path.join(tmp, "search_index.db"))
+        start = time.perf_counter()
+        batch = []
+        for movie in synthetic_movies(total, vocabulary, rng):
+            batch.append(movie)
+            if len(batch) == 5000:
+                index.add_movies(batch)
+                batch = []
+        index.add_movies(batch)
+        print(f"indexed {total} movies in {time.perf_counter() - start:.2f}s")
+
+        cum_weights = list(accumulate(1 / (rank + 1) for rank in range(len(vocabulary))))
+        timings = []
+        for _ in range(queries):
+            # Queries follow the same popularity skew, last word partially typed
+            words = rng.choices(vocabulary, cum_weights=cum_weights, k=rng.randint(1, 2))
+            query = " ".join(words[:-1] + [words[-1][:rng.randint(3, len(words[-1]))]])
+            start = time.perf_counter()
+            index.search(query, page=rng.randint(1, 3))
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        print(f"{queries} searches: p50 {statistics.median(timings):.2f}ms  "
+              f"p95 {timings[int(len(timings) * 0.95)]:.2f}ms  "
+              f"p99 {timings[int(len(timings) * 0.99)]:.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
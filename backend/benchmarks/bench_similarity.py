@@ -0,0 +1,77 @@
+"""Top-k latency of the local similarity index.
+
+Builds an index of synthetic movies with TMDB-like features (1-3 genres,
+top cast drawn from a skewed pool of actors, a director, release year and
+log-normal popularity), then times `similar()` for random movies before
+and after a batch of incremental updates.
+
+Usage: python benchmarks/bench_similarity.py [movies] [queries]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from utils.similarity import GENRE_IDS, SimilarityIndex
+
+
+def synthetic_movie(rng, movie_id, actors):
+    cast = [{'id': int(actors * rng.paretovariate(1.2)) % actors + 1} for _ in range(8)]
+    return {
+        'id': movie_id,
+        'genre_ids': rng.sample(GENRE_IDS, rng.randint(1, 3)),
+        'release_date': f"{rng.randint(1930, 2025)}-01-01",
+        'popularity': rng.lognormvariate(2, 1.5),
+        'credits': {
+            'cast': cast,
+            'crew': [{'id': 1000000 + rng.randint(1, actors // 10), 'job': 'Director'}]
+        }
+    }
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return {p: samples[int(len(samples) * p / 100)] * 1000 for p in (50, 90, 99)}
+
+
+def time_queries(index, ids, k=10):
+    samples = []
+    for movie_id in ids:
+        start = time.perf_counter()
+        index.similar(movie_id, k)
+        samples.append(time.perf_counter() - start)
+    return percentiles(samples)
+
+
+def report(label, latency):
+    print(f"{label:<24} p50 {latency[50]:.3f}ms  p90 {latency[90]:.3f}ms  p99 {latency[99]:.3f}ms")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    queries = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    rng = random.Random(42)
+    movies = [synthetic_movie(rng, i, 50000) for i in range(1, count + 1)]
+
+    index = SimilarityIndex()
+    start = time.perf_counter()
+    index.load(movies)
+    print(f"load {count} movies: {time.perf_counter() - start:.2f}s  {index.stats()}")
+
+    sample = [rng.randint(1, count) for _ in range(queries)]
+    time_queries(index, sample[:100])
+    report("top-10", time_queries(index, sample))
+
+    updates = [synthetic_movie(rng, rng.randint(1, count + 5000), 50000) for _ in range(5000)]
+    start = time.perf_counter()
+    for offset in range(0, len(updates), 20):
+        index.add_movies(updates[offset:offset + 20])
+    elapsed = time.perf_counter() - start
+    print(f"incremental: {len(updates)} movies in batches of 20, {elapsed / len(updates) * 1e6:.0f}us per movie")
+    report("top-10 after updates", time_queries(index, sample))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Build time, memory and per-keystroke latency of the title suggester.
+
+Usage: python benchmarks/bench_suggest.py [titles] [queries]
+"""
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from benchmarks.bench_search_index import make_vocabulary, synthetic_movies
+from utils.suggest import TitleSuggester
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 150000
+    queries = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    rng = random.Random(42)
+    vocabulary = make_vocabulary(20000, rng)
+    movies = list(synthetic_movies(total, vocabulary, rng))
+
+    suggester = TitleSuggester(max_titles=total * 2)
+    start = time.perf_counter()
+    suggester.load(movies)
+    print(f"built {len(suggester)} titles in {time.perf_counter() - start:.2f}s, "
+          f"~{suggester.memory_estimate() / 1024 / 1024:.1f} MiB")
+
+    # Incremental updates arrive a page (20 titles) at a time from TMDB fetches
+    start = time.perf_counter()
+    for offset in range(0, 1000, 20):
+        suggester.add_movies([dict(movie, id=movie["id"] + total)
+                              for movie in movies[offset:offset + 20]])
+    print(f"incremental add of 1000 titles in pages of 20: "
+          f"{(time.perf_counter() - start) * 1000:.1f}ms")
+
+    # Simulate typing: every prefix of a sampled title, one keystroke at a time
+    timings = []
+    while len(timings) < queries:
+        title = rng.choice(movies)["title"]
+        for length in range(1, min(len(title), 12) + 1):
+            start = time.perf_counter()
+            suggester.suggest(title[:length], 10)
+            timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    print(f"{len(timings)} keystrokes: p50 {statistics.median(timings):.3f}ms  "
+          f"p95 {timings[int(len(timings) * 0.95)]:.3f}ms  "
+          f"p99 {timings[int(len(timings) * 0.99)]:.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+"""Load test: the app under gunicorn against the stub TMDB server.
+
+Starts benchmarks/stub_tmdb.py (realistic payloads, configurable latency,
+500s and 429s) and gunicorn serving app:app from a scratch directory, so
+the databases and caches start empty and nothing touches instance/. Then
+`--concurrency` client threads run a weighted mix of scenarios for
+`--duration` seconds after a warm-up:
+
+  scroll           a category feed, pages 1..5 in order
+  search           /search with one or two common words
+  details          /api/movie/<id>, mostly popular ids, a few missing ones
+  recommendations  /recommendations, sometimes a filtered page
+  admin            POST /admin/add as a logged-in admin
+
+Prints throughput and p50/p95/p99 per route and writes the results as JSON
+(default benchmarks/results/loadtest-<commit>-<time>.json). Pass
+--compare with an earlier file to see the change per route.
+
+Usage: python benchmarks/loadtest.py [--duration 30] [--concurrency 32] [--workers 4]
+           [--mix scroll=40,search=20,details=30,recommendations=8,admin=2]
+           [--latency-ms 80] [--error-rate 0.01] [--rate-limit-rate 0.002]
+           [--env NAME=VALUE ...] [--output FILE] [--compare FILE]
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from benchmarks.stub_tmdb import WORDS
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+RESULTS_DIR = os.path.join(BACKEND_DIR, "benchmarks", "results")
+
+FEEDS = ("/popular", "/trending", "/top-rated", "/upcoming", "/now-playing")
+DEFAULT_MIX = "scroll=40,search=20,details=30,recommendations=8,admin=2"
+
+# Most detail views go to a small set of popular movies
+HOT_MOVIES = 2000
+
+
+class Recorder:
+    """Latency samples per route label, shared by all client threads"""
+
+    def __init__(self):
+        self.samples = defaultdict(list)  # label -> [(seconds, status)]
+        self.lock = threading.Lock()
+        self.recording = False
+
+    def record(self, label, seconds, status):
+        if self.recording:
+            with self.lock:
+                self.samples[label].append((seconds, status))
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(p / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def summarize(samples, elapsed):
+    latencies = sorted(seconds * 1000 for seconds, _ in samples)
+    statuses = defaultdict(int)
+    for _, status in samples:
+        statuses[str(status)] += 1
+    errors = sum(1 for _, status in samples if status == "error" or status >= 500)
+    return {
+        "requests": len(samples),
+        "rps": round(len(samples) / elapsed, 1),
+        "errors": errors,
+        "statuses": dict(sorted(statuses.items())),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "max_ms": round(latencies[-1], 2) if latencies else 0.0
+    }
+
+
+class Client:
+    """One simulated user with its own keep-alive session"""
+
+    def __init__(self, base_url, recorder, rng, max_movie_id):
+        self.base_url = base_url
+        self.recorder = recorder
+        self.rng = rng
+        self.max_movie_id = max_movie_id
+        self.session = requests.Session()
+        self.logged_in = False
+
+    def request(self, label, method, path, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = self.session.request(method, self.base_url + path, timeout=30, **kwargs)
+            response.content  # read the whole body
+            status = response.status_code
+        except requests.exceptions.RequestException:
+            response, status = None, "error"
+        self.recorder.record(label, time.perf_counter() - start, status)
+        return response
+
+    def scroll(self):
+        feed = self.rng.choice(FEEDS)
+        for page in range(1, self.rng.randint(1, 5) + 1):
+            self.request(feed, "GET", f"{feed}?page={page}")
+
+    def search(self):
+        query = " ".join(self.rng.sample(WORDS, self.rng.randint(1, 2)))
+        self.request("/search", "GET", "/search", params={"query": query})
+
+    def details(self):
+        if self.rng.random() < 0.05:
+            movie_id = self.rng.randint(self.max_movie_id + 1, self.max_movie_id * 2)
+        elif self.rng.random() < 0.8:
+            movie_id = self.rng.randint(1, HOT_MOVIES)
+        else:
+            movie_id = self.rng.randint(1, self.max_movie_id)
+        self.request("/api/movie/<id>", "GET", f"/api/movie/{movie_id}")
+
+    def recommendations(self):
+        if self.rng.random() < 0.3:
+            self.request("/recommendations?category", "GET", "/recommendations",
+                         params={"category": "Featured", "limit": 20})
+        else:
+            self.request("/recommendations", "GET", "/recommendations")
+
+    def admin(self):
+        if not self.logged_in:
+            self.request("POST /admin/login", "POST", "/admin/login",
+                         json={"username": "admin", "password": "admin123"})
+            self.logged_in = True
+        self.request("POST /admin/add", "POST", "/admin/add",
+                     json={"movie_id": self.rng.randint(1, self.max_movie_id), "category": "Featured"})
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if not hasattr(Client, name.strip()):
+            raise SystemExit(f"Unknown scenario in --mix: {name}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def drive(base_url, args, recorder):
+    mix = parse_mix(args.mix)
+    names, weights = list(mix), list(mix.values())
+    deadline = time.monotonic() + args.warmup + args.duration
+
+    def user(seed):
+        client = Client(base_url, recorder, random.Random(seed), args.max_movie_id)
+        while time.monotonic() < deadline:
+            getattr(client, client.rng.choices(names, weights)[0])()
+
+    threads = [threading.Thread(target=user, args=(i,), daemon=True) for i in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.warmup)
+    recorder.recording = True
+    started = time.monotonic()
+    for thread in threads:
+        thread.join()
+    recorder.recording = False
+    return time.monotonic() - started
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_up(url, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"{url} exited with status {process.returncode}")
+        try:
+            requests.get(url, timeout=1)
+            return
+        except requests.exceptions.RequestException:
+            time.sleep(0.2)
+    raise SystemExit(f"{url} did not come up within {timeout}s")
+
+
+def git_commit():
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, text=True).strip()
+        dirty = bool(subprocess.check_output(["git", "status", "--porcelain", "--untracked-files=no"],
+                                             cwd=BACKEND_DIR, text=True).strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown", False
+
+
+def print_report(results, previous=None):
+    print(f"\n{'route':<28}{'req':>8}{'req/s':>9}{'err':>6}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    rows = list(results["routes"].items()) + [("TOTAL", results["totals"])]
+    for label, stats in rows:
+        print(f"{label:<28}{stats['requests']:>8}{stats['rps']:>9.1f}{stats['errors']:>6}"
+              f"{stats['p50_ms']:>9.1f}{stats['p95_ms']:>9.1f}{stats['p99_ms']:>9.1f}")
+        before = (previous or {}).get("routes", {}).get(label) if label != "TOTAL" else (previous or {}).get("totals")
+        if before:
+            changes = "  ".join(
+                f"{key} {_change(before[key], stats[key])}" for key in ("rps", "p50_ms", "p95_ms", "p99_ms")
+            )
+            print(f"{'':<28}vs {previous['commit']}: {changes}")
+
+
+def _change(before, after):
+    if not before:
+        return "n/a"
+    return f"{(after - before) / before * 100:+.0f}%"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the app under gunicorn against a stub TMDB")
+    parser.add_argument("--duration", type=float, default=30, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=5, help="Seconds of load before measuring")
+    parser.add_argument("--concurrency", type=int, default=32, help="Simulated users")
+    parser.add_argument("--workers", type=int, default=4, help="gunicorn worker processes")
+    parser.add_argument("--threads", type=int, default=4, help="Threads per gunicorn worker")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Scenario weights")
+    parser.add_argument("--latency-ms", type=float, default=80, help="Stub TMDB base latency")
+    parser.add_argument("--jitter-ms", type=float, default=40, help="Extra random stub latency")
+    parser.add_argument("--error-rate", type=float, default=0.01, help="Share of TMDB calls answered 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.002, help="Share answered 429")
+    parser.add_argument("--max-movie-id", type=int, default=100000, help="Higher ids are 404 upstream")
+    parser.add_argument("--env", action="append", default=[], metavar="NAME=VALUE",
+                        help="Extra app configuration, e.g. TMDB_CACHE_BACKEND=memory")
+    parser.add_argument("--output", help="Results file (default benchmarks/results/...)")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    args = parser.parse_args()
+
+    commit, dirty = git_commit()
+    stub_port, app_port = free_port(), free_port()
+    with tempfile.TemporaryDirectory() as workdir:
+        stub = subprocess.Popen([
+            sys.executable, os.path.join(BACKEND_DIR, "benchmarks", "stub_tmdb.py"), "--realistic",
+            "--port", str(stub_port), "--latency-ms", str(args.latency_ms), "--jitter-ms", str(args.jitter_ms),
+            "--error-rate", str(args.error_rate), "--rate-limit-rate", str(args.rate_limit_rate),
+            "--max-movie-id", str(args.max_movie_id)
+        ], stdout=subprocess.DEVNULL)
+        env = dict(os.environ, TMDB_BASE_URL=f"http://127.0.0.1:{stub_port}/3", TMDB_API_KEY="loadtest")
+        env.update(item.split("=", 1) for item in args.env)
+        log = open(os.path.join(workdir, "gunicorn.log"), "w")
+        app = subprocess.Popen([
+            sys.executable, "-m", "gunicorn", "--pythonpath", BACKEND_DIR,
+            "-w", str(args.workers), "--threads", str(args.threads),
+            "-b", f"127.0.0.1:{app_port}", "app:app"
+        ], cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT)
+        try:
+            wait_until_up(f"http://127.0.0.1:{stub_port}/3/movie/popular", stub)
+            wait_until_up(f"http://127.0.0.1:{app_port}/", app)
+            print(f"gunicorn {args.workers}x{args.threads} at {commit}{'+dirty' if dirty else ''}, "
+                  f"{args.concurrency} users, {args.warmup:.0f}s warm-up + {args.duration:.0f}s, mix {args.mix}")
+            recorder = Recorder()
+            elapsed = drive(f"http://127.0.0.1:{app_port}", args, recorder)
+        finally:
+            app.terminate()
+            stub.terminate()
+            app.wait()
+            stub.wait()
+            log.close()
+
+    results = {
+        "commit": commit,
+        "dirty": dirty,
+        "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "elapsed_s": round(elapsed, 2),
+        "routes": {label: summarize(samples, elapsed) for label, samples in sorted(recorder.samples.items())},
+        "totals": summarize([s for samples in recorder.samples.values() for s in samples], elapsed)
+    }
+    previous = None
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+    print_report(results, previous)
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = os.path.join(RESULTS_DIR, f"loadtest-{commit}-{stamp}.json")
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
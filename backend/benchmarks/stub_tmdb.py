@@ -0,0 +1,215 @@
+"""Minimal local stand-in for the TMDB API used by the benchmarks.
+
+By default answers every GET with a small movie-list payload over HTTP/1.1
+keep-alive, so client-side connection handling can be measured without
+touching the real API. With `realistic=True` it serves TMDB-sized payloads
+per endpoint (20-item list pages, movie details with credits, videos and
+similar titles, a change feed, 404 for ids above `max_movie_id`, and image bytes
+under /t/p/<size>/<name> with 404 for names starting with "missing"), and it
+can add latency and inject 500s and 429s for load tests.
+
+Usage: python benchmarks/stub_tmdb.py [--port 8765] [--realistic] [--latency-ms 80]
+           [--jitter-ms 40] [--error-rate 0.01] [--rate-limit-rate 0.005]
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+PAYLOAD = json.dumps({
+    "page": 1,
+    "results": [{"id": i, "title": f"Movie {i}", "overview": "x" * 200} for i in range(20)],
+    "total_pages": 500,
+    "total_results": 10000
+}).encode()
+
+DEFAULT_OPTIONS = {
+    "realistic": False,
+    "latency_ms": 0.0,
+    "jitter_ms": 0.0,
+    "error_rate": 0.0,
+    "rate_limit_rate": 0.0,
+    "max_movie_id": 100000
+}
+
+NOT_FOUND = json.dumps({
+    "success": False, "status_code": 34,
+    "status_message": "The resource you requested could not be found."
+}).encode()
+
+WORDS = ("last night city star dark love war return shadow king road house blood "
+         "summer winter lost secret game dream fire island world queen ghost").split()
+
+MOVIE_PATH = re.compile(r"^/3/movie/(\d+)$")
+IMAGE_PATH = re.compile(r"^/t/p/(\w+)/(\w+)\.\w+$")
+
+
+def list_item(movie_id):
+    rng = random.Random(movie_id)
+    title = " ".join(rng.choice(WORDS).title() for _ in range(rng.randint(1, 4)))
+    return {
+        "adult": False, "backdrop_path": f"/b{movie_id}.jpg",
+        "genre_ids": rng.sample([12, 14, 16, 18, 27, 28, 35, 53, 80, 878, 10749], 3),
+        "id": movie_id, "original_language": "en", "original_title": title,
+        "overview": " ".join(rng.choice(WORDS) for _ in range(rng.randint(30, 60))).capitalize() + ".",
+        "popularity": round(rng.uniform(1, 3000), 3), "poster_path": f"/p{movie_id}.jpg",
+        "release_date": f"{rng.randint(1970, 2025)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        "title": title, "video": False, "vote_average": round(rng.uniform(3, 9), 1),
+        "vote_count": rng.randint(0, 30000)
+    }
+
+
+def list_page(seed, page, max_movie_id):
+    rng = random.Random(f"{seed}:{page}")
+    return {
+        "page": page,
+        "results": [list_item(rng.randint(1, max_movie_id)) for _ in range(20)],
+        "total_pages": 500,
+        "total_results": 10000
+    }
+
+
+def movie_details(movie_id, max_movie_id):
+    rng = random.Random(-movie_id)
+    data = list_item(movie_id)
+    data.update({
+        "runtime": rng.randint(80, 180), "budget": rng.randint(0, 300) * 1000000,
+        "revenue": rng.randint(0, 2000) * 1000000, "status": "Released", "tagline": "",
+        "genres": [{"id": g, "name": f"Genre {g}"} for g in data["genre_ids"]],
+        "credits": {
+            "cast": [{"adult": False, "gender": rng.randint(0, 2), "id": 10000 + i,
+                      "known_for_department": "Acting", "name": f"Actor {i}",
+                      "original_name": f"Actor {i}", "popularity": 10.5,
+                      "profile_path": f"/a{i}.jpg", "cast_id": i, "character": f"Character {i}",
+                      "credit_id": f"credit{movie_id}{i}", "order": i} for i in range(40)],
+            "crew": [{"adult": False, "gender": 0, "id": 20000 + i, "known_for_department": "Crew",
+                      "name": f"Crew {i}", "original_name": f"Crew {i}", "popularity": 2.1,
+                      "profile_path": None, "credit_id": f"crew{movie_id}{i}",
+                      "department": "Production", "job": "Producer"} for i in range(60)]
+        },
+        "videos": {"results": [{"iso_639_1": "en", "iso_3166_1": "US", "name": f"Trailer {i}",
+                                "key": f"key{movie_id}{i}", "site": "YouTube", "size": 1080,
+                                "type": "Trailer", "official": True, "id": f"v{movie_id}{i}"}
+                               for i in range(6)]},
+        "similar": list_page(f"similar:{movie_id}", 1, max_movie_id)
+    })
+    return data
+
+
+def search_page(query, page, max_movie_id):
+    data = list_page(f"search:{query.lower()}", page, max_movie_id)
+    total = sum(ord(c) for c in query) % 200
+    data.update(total_results=total, total_pages=max(1, (total + 19) // 20))
+    return data
+
+
+def changes_page(start_date, page, max_movie_id):
+    rng = random.Random(f"changes:{start_date}:{page}")
+    return {
+        "results": [{"id": rng.randint(1, max_movie_id), "adult": False} for _ in range(100)],
+        "page": page,
+        "total_pages": 3,
+        "total_results": 300
+    }
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        options = getattr(self.server, "options", DEFAULT_OPTIONS)
+        latency = options["latency_ms"] + random.uniform(0, options["jitter_ms"])
+        if latency:
+            time.sleep(latency / 1000)
+        roll = random.random()
+        if roll < options["rate_limit_rate"]:
+            self.send_body(429, b'{"status_code": 25, "status_message": "Request count over limit."}',
+                           {"Retry-After": "1"})
+        elif roll < options["rate_limit_rate"] + options["error_rate"]:
+            self.send_body(500, b'{"status_code": 11, "status_message": "Internal error."}')
+        elif not options["realistic"]:
+            self.send_body(200, PAYLOAD)
+        else:
+            self.send_realistic(options["max_movie_id"])
+
+    def send_realistic(self, max_movie_id):
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        page = int(query.get("page", ["1"])[0])
+        image = IMAGE_PATH.match(url.path)
+        if image:
+            self.send_image(*image.groups())
+            return
+        match = MOVIE_PATH.match(url.path)
+        if match:
+            movie_id = int(match.group(1))
+            if movie_id > max_movie_id:
+                self.send_body(404, NOT_FOUND)
+                return
+            data = movie_details(movie_id, max_movie_id)
+        elif url.path == "/3/movie/changes":
+            data = changes_page(query.get("start_date", [""])[0], page, max_movie_id)
+        elif url.path == "/3/search/movie":
+            data = search_page(query.get("query", [""])[0], page, max_movie_id)
+        else:
+            data = list_page(url.path, page, max_movie_id)
+        self.send_body(200, json.dumps(data).encode())
+
+    def send_image(self, size, name):
+        if name.startswith("missing"):
+            self.send_body(404, NOT_FOUND)
+            return
+        # Not a decodable image, just bytes of a size that grows with the requested width
+        width = int(size[1:]) if size[1:].isdigit() else 2000
+        body = b"\xff\xd8\xff\xe0" + f"{size}/{name}".encode() * (width // 4)
+        self.send_body(200, body, content_type="image/jpeg")
+
+    def send_body(self, status, body, headers=None, content_type="application/json"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server(host="127.0.0.1", port=0, **options):
+    """Start the stub server in a daemon thread and return (server, base_url)"""
+    server = ThreadingHTTPServer((host, port), StubHandler)
+    server.daemon_threads = True
+    server.options = dict(DEFAULT_OPTIONS, **options)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}/3"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the TMDB API")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--realistic", action="store_true", help="TMDB-sized payloads per endpoint")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Share answered 429")
+    parser.add_argument("--max-movie-id", type=int, default=100000, help="Higher ids are 404")
+    args = parser.parse_args()
+    options = {name: getattr(args, name) for name in DEFAULT_OPTIONS}
+    server, base_url = start_stub_server(port=args.port, **options)
+    print(f"Stub TMDB listening on {base_url}", flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(__file__))
+# No background threads racing the tests; they start what they need themselves
+os.environ.setdefault("RECOMMENDATIONS_RANKING_ENABLED", "0")
+os.environ.setdefault("JOB_WORKERS_ENABLED", "0")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "benchmarks"))
+
+from stub_tmdb import DEFAULT_OPTIONS, start_stub_server
+
+
+@pytest.fixture(scope="session")
+def stub_server():
+    server, base_url = start_stub_server(realistic=True)
+    server.base_url = base_url
+    yield server
+    server.shutdown()
+
+
+@pytest.fixture
+def stub_tmdb(stub_server):
+    """The stub TMDB server; tests may change its options (error_rate, ...)"""
+    stub_server.options = dict(DEFAULT_OPTIONS, realistic=True)
+    yield stub_server
+    stub_server.options = dict(DEFAULT_OPTIONS, realistic=True)
+
+
+@pytest.fixture
+def client_config(stub_tmdb):
+    """TMDBClient config against the stub with in-memory, unshared state"""
+    return {
+        'TMDB_API_KEY': 'test-key',
+        'TMDB_BASE_URL': stub_tmdb.base_url,
+        'TMDB_CACHE_BACKEND': 'memory',
+        'SEARCH_INDEX_ENABLED': False,
+        'CATALOG_ENABLED': False,
+        'TMDB_MAX_RETRIES': 0,
+        'TMDB_BREAKER_MIN_CALLS': 2,
+        'TMDB_BREAKER_COOLDOWN': 0.05
+    }
+
+
+@pytest.fixture
+def app_db(tmp_path, monkeypatch):
+    """The Flask app pointed at a freshly migrated database of its own"""
+    from app import app
+    from migrations import migrate
+    path = str(tmp_path / "database.db")
+    migrate(path)
+    monkeypatch.setitem(app.config, 'DATABASE', path)
+    return app
+
+
+@pytest.fixture
+def tmdb(client_config, monkeypatch):
+    """A fresh TMDBClient installed as the app's client, with empty response caches"""
+    from app import app
+    from utils import api_client
+    from utils.api_client import TMDBClient
+    from utils.cache import MemoryCache
+    from utils.response_cache import get_response_cache
+    client = TMDBClient(client_config, cache=MemoryCache())
+    monkeypatch.setattr(api_client, "_client", client)
+    monkeypatch.setattr(api_client, "_client_pid", os.getpid())
+    with app.app_context():
+        get_response_cache().clear()
+    return client
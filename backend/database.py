@@ -1,9 +1,73 @@
+import re
 import sqlite3
 import os
-from flask import current_app
+import time
+from functools import lru_cache
+from flask import current_app, g
+from utils.metrics import metrics
+
+TABLE_RE = re.compile(r"\b(?:FROM|INTO|UPDATE)\s+(\w+)", re.IGNORECASE)
+
+@lru_cache(maxsize=1024)
+def _query_labels(sql):
+    """(statement, table) labels for a SQL string, e.g. ("SELECT", "recommendations")"""
+    words = sql.split(None, 1)
+    table = TABLE_RE.search(sql)
+    return (words[0].upper() if words else "", table.group(1) if table else "")
+
+class TimedConnection(sqlite3.Connection):
+    """Connection that records how long each statement takes to produce its first row"""
+    
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            metrics.observe('sqlite_query_duration_seconds', _query_labels(sql), time.perf_counter() - start)
+    
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            metrics.observe('sqlite_query_duration_seconds', _query_labels(sql), time.perf_counter() - start)
+    
+    def commit(self):
+        start = time.perf_counter()
+        try:
+            return super().commit()
+        finally:
+            metrics.observe('sqlite_query_duration_seconds', ("COMMIT", ""), time.perf_counter() - start)
+
+def configure_connection(conn, mmap_size=64 * 1024 * 1024):
+    """Apply the pragmas every connection to the app database should use"""
+    # WAL lets readers run while an admin write is in progress
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute('PRAGMA busy_timeout=5000')
+    conn.execute(f'PRAGMA mmap_size={int(mmap_size)}')
+    conn.execute('PRAGMA temp_store=MEMORY')
+    return conn
 
 def get_db_connection():
-    """Get database connection"""
-    conn = sqlite3.connect(current_app.config['DATABASE'])
-    conn.row_factory = sqlite3.Row
-    return conn
\ No newline at end of file
+    """Get database connection, shared by everything in the current app context"""
+    if 'db' not in g:
+        conn = sqlite3.connect(current_app.config['DATABASE'], timeout=5, factory=TimedConnection)
+        conn.row_factory = sqlite3.Row
+        g.db = configure_connection(conn, current_app.config.get('DATABASE_MMAP_SIZE', 64 * 1024 * 1024))
+    return g.db
+
+def close_db_connection(exception=None):
+    """Close the app context's connection, rolling back anything left uncommitted"""
+    conn = g.pop('db', None)
+    if conn is not None:
+        if conn.in_transaction:
+            conn.rollback()
+        conn.close()
+
+def get_data_version(name):
+    """Change counter for a table, bumped by triggers on every write (see migrations.py)"""
+    row = get_db_connection().execute(
+        'SELECT version FROM data_versions WHERE name = ?', (name,)
+    ).fetchone()
+    return row[0] if row else 0
\ No newline at end of file
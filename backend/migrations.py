@@ -0,0 +1,193 @@
+import sqlite3
+import time
+from database import configure_connection
+
+def _initial_schema(conn):
+    from models.admin_model import create_admin_table
+    from models.recommendation_model import create_recommendation_table
+    from models.user_model import create_user_table
+
+    # IF NOT EXISTS keeps this safe on databases created before migrations existed
+    create_admin_table(conn)
+    create_recommendation_table(conn)
+    create_user_table(conn)
+
+def _recommendation_versions(conn):
+    # Cached feeds compare this counter instead of re-reading the table;
+    # triggers bump it on every write, whichever code path made it
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS data_versions(
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    conn.execute("INSERT OR IGNORE INTO data_versions (name, version) VALUES ('recommendations', 1)")
+    for event in ('INSERT', 'UPDATE', 'DELETE'):
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS recommendations_version_{event.lower()}
+            AFTER {event} ON recommendations BEGIN
+                UPDATE data_versions SET version = version + 1 WHERE name = 'recommendations';
+            END
+        ''')
+
+def _listing_indexes(conn):
+    # Keyset pages walk these in (created, id) order for each filter combination
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_recommendations_created ON recommendations(created_at, id)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_recommendations_active ON recommendations(is_active, created_at, id)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_recommendations_category ON recommendations(category, is_active, created_at, id)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_users_created ON users(created, id)')
+
+def _dashboard_counters(conn):
+    # Kept up to date by triggers so the dashboard reads a handful of rows
+    # however large users and recommendations grow
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS stats_counters(
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS category_counts(
+            category TEXT PRIMARY KEY,
+            total INTEGER NOT NULL DEFAULT 0,
+            active INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS daily_signups(
+            day TEXT PRIMARY KEY,
+            signups INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+
+    # Backfill from the existing rows
+    conn.execute("INSERT OR REPLACE INTO stats_counters (name, value) SELECT 'users', COUNT(*) FROM users")
+    conn.execute('''
+        INSERT OR REPLACE INTO stats_counters (name, value)
+        SELECT 'recommendations', COUNT(*) FROM recommendations
+        UNION ALL
+        SELECT 'active_recommendations', COUNT(*) FROM recommendations WHERE is_active
+    ''')
+    conn.execute('''
+        INSERT OR REPLACE INTO category_counts (category, total, active)
+        SELECT COALESCE(category, ''), COUNT(*), SUM(is_active != 0) FROM recommendations
+        GROUP BY COALESCE(category, '')
+    ''')
+    conn.execute('''
+        INSERT OR REPLACE INTO daily_signups (day, signups)
+        SELECT date(created), COUNT(*) FROM users GROUP BY date(created)
+    ''')
+
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS users_stats_insert AFTER INSERT ON users BEGIN
+            UPDATE stats_counters SET value = value + 1 WHERE name = 'users';
+            INSERT INTO daily_signups (day, signups) VALUES (date(new.created), 1)
+                ON CONFLICT(day) DO UPDATE SET signups = signups + 1;
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS users_stats_delete AFTER DELETE ON users BEGIN
+            UPDATE stats_counters SET value = value - 1 WHERE name = 'users';
+            UPDATE daily_signups SET signups = signups - 1 WHERE day = date(old.created);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS recommendations_stats_insert AFTER INSERT ON recommendations BEGIN
+            UPDATE stats_counters SET value = value + 1 WHERE name = 'recommendations';
+            UPDATE stats_counters SET value = value + (new.is_active != 0) WHERE name = 'active_recommendations';
+            INSERT INTO category_counts (category, total, active)
+                VALUES (COALESCE(new.category, ''), 1, new.is_active != 0)
+                ON CONFLICT(category) DO UPDATE SET total = total + 1, active = active + excluded.active;
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS recommendations_stats_delete AFTER DELETE ON recommendations BEGIN
+            UPDATE stats_counters SET value = value - 1 WHERE name = 'recommendations';
+            UPDATE stats_counters SET value = value - (old.is_active != 0) WHERE name = 'active_recommendations';
+            UPDATE category_counts SET total = total - 1, active = active - (old.is_active != 0)
+                WHERE category = COALESCE(old.category, '');
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS recommendations_stats_update
+        AFTER UPDATE OF is_active, category ON recommendations BEGIN
+            UPDATE stats_counters SET value = value - (old.is_active != 0) + (new.is_active != 0)
+                WHERE name = 'active_recommendations';
+            UPDATE category_counts SET total = total - 1, active = active - (old.is_active != 0)
+                WHERE category = COALESCE(old.category, '');
+            INSERT INTO category_counts (category, total, active)
+                VALUES (COALESCE(new.category, ''), 1, new.is_active != 0)
+                ON CONFLICT(category) DO UPDATE SET total = total + 1, active = active + excluded.active;
+        END
+    ''')
+
+def _job_queue(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS jobs(
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'queued',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            max_attempts INTEGER NOT NULL DEFAULT 3,
+            result TEXT,
+            error TEXT,
+            run_after REAL NOT NULL,
+            locked_until REAL,
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_pending ON jobs(status, run_after)')
+
+def _category_listing_index(conn):
+    # Admin listings filtered by category across active and inactive rows
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_recommendations_category_created ON recommendations(category, created_at, id)')
+
+# Append new migrations to the end; never edit or reorder applied ones
+MIGRATIONS = [
+    (1, "initial schema", _initial_schema),
+    (2, "recommendations data version", _recommendation_versions),
+    (3, "listing indexes", _listing_indexes),
+    (4, "dashboard counters", _dashboard_counters),
+    (5, "job queue", _job_queue),
+    (6, "category listing index", _category_listing_index),
+]
+
+def current_version(conn):
+    """Highest applied migration, 0 for a fresh database"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS schema_version(
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at REAL NOT NULL
+        )
+    ''')
+    return conn.execute('SELECT COALESCE(MAX(version), 0) FROM schema_version').fetchone()[0]
+
+def migrate(path):
+    """Apply pending migrations to the database at `path`, returning the versions applied"""
+    conn = configure_connection(sqlite3.connect(path, timeout=30, isolation_level=None))
+    applied = []
+    try:
+        # BEGIN IMMEDIATE serialises workers starting at the same time;
+        # the version is re-read once the write lock is held
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            version = current_version(conn)
+            for number, description, apply in MIGRATIONS:
+                if number <= version:
+                    continue
+                apply(conn)
+                conn.execute(
+                    'INSERT INTO schema_version (version, description, applied_at) VALUES (?, ?, ?)',
+                    (number, description, time.time())
+                )
+                applied.append(number)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+    finally:
+        conn.close()
+    return applied
@@ -16,7 +16,6 @@ def get_admin_by_username(username):
     admin = conn.execute(
         'SELECT * FROM admin WHERE username = ?', (username,)
     ).fetchone()
-    conn.close()
     return dict(admin) if admin else None
 
 def verify_admin_password(password_hash, password):
@@ -31,8 +30,7 @@ def create_admin(username, password):
             (username, password_hash)
         )
         conn.commit()
-        conn.close()
         return True
     except sqlite3.IntegrityError:
-        conn.close()
+        conn.rollback()
         return False
\ No newline at end of file
@@ -18,9 +18,33 @@ def create_recommendation_table(conn):
 def get_all_recommendations():
     conn = get_db_connection()
     recommendations = conn.execute(
-        'SELECT * FROM recommendations WHERE is_active = 1 ORDER BY created_at DESC'
+        'SELECT * FROM recommendations WHERE is_active = 1 ORDER BY created_at DESC, id DESC'
+    ).fetchall()
+    return [dict(rec) for rec in recommendations]
+
+def get_recommendations_page(limit, after=None, category=None, is_active=True):
+    """Newest first, `limit` + 1 rows so callers can tell if there is a next page.
+
+    `after` is the (created_at, id) of the last row already returned; the
+    idx_recommendations_* indexes (migrations.py) return rows already in order.
+    """
+    clauses = []
+    params = []
+    if category:
+        clauses.append('category = ?')
+        params.append(category)
+    if is_active is not None:
+        clauses.append('is_active = ?')
+        params.append(1 if is_active else 0)
+    if after:
+        clauses.append('(created_at, id) < (?, ?)')
+        params.extend(after)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+    conn = get_db_connection()
+    recommendations = conn.execute(
+        f'SELECT * FROM recommendations {where} ORDER BY created_at DESC, id DESC LIMIT ?',
+        (*params, limit + 1)
     ).fetchall()
-    conn.close()
     return [dict(rec) for rec in recommendations]
 
 def get_recommendation_by_id(recommendation_id):
@@ -28,9 +52,15 @@ def get_recommendation_by_id(recommendation_id):
     recommendation = conn.execute(
         'SELECT * FROM recommendations WHERE id = ?', (recommendation_id,)
     ).fetchone()
-    conn.close()
     return dict(recommendation) if recommendation else None
 
+def recommendation_exists(movie_id):
+    conn = get_db_connection()
+    row = conn.execute(
+        'SELECT 1 FROM recommendations WHERE movie_id = ?', (movie_id,)
+    ).fetchone()
+    return row is not None
+
 def create_recommendation(movie_id, movie_title, description, image_url, category):
     conn = get_db_connection()
     try:
@@ -40,10 +70,9 @@ def create_recommendation(movie_id, movie_title, description, image_url, categor
         ''', (movie_id, movie_title, description, image_url, category))
         conn.commit()
         recommendation_id = cursor.lastrowid
-        conn.close()
         return recommendation_id
     except sqlite3.IntegrityError:
-        conn.close()
+        conn.rollback()
         return None
 
 def delete_recommendation(recommendation_id):
@@ -52,5 +81,68 @@ def delete_recommendation(recommendation_id):
         'DELETE FROM recommendations WHERE id = ?', (recommendation_id,)
     )
     conn.commit()
-    conn.close()
-    return True
\ No newline at end of file
+    return True
+
+# Stay well under SQLite's bound-parameter limit in IN (...) lists
+IN_CHUNK = 500
+
+def _chunks(values):
+    for start in range(0, len(values), IN_CHUNK):
+        yield values[start:start + IN_CHUNK]
+
+def create_recommendations(rows):
+    """Insert (movie_id, movie_title, description, image_url, category) rows in one transaction.
+
+    Movies already recommended are skipped; returns {movie_id: recommendation_id}
+    for the rows that were inserted.
+    """
+    conn = get_db_connection()
+    movie_ids = [row[0] for row in rows]
+    with conn:
+        existing = set()
+        for chunk in _chunks(movie_ids):
+            existing.update(r[0] for r in conn.execute(
+                f"SELECT movie_id FROM recommendations WHERE movie_id IN ({','.join('?' * len(chunk))})",
+                chunk
+            ))
+        new_rows = [row for row in rows if row[0] not in existing]
+        conn.executemany('''
+            INSERT INTO recommendations (movie_id, movie_title, description, image_url, category)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(movie_id) DO NOTHING
+        ''', new_rows)
+        inserted = {}
+        new_ids = [row[0] for row in new_rows]
+        for chunk in _chunks(new_ids):
+            inserted.update((r[0], r[1]) for r in conn.execute(
+                f"SELECT movie_id, id FROM recommendations WHERE movie_id IN ({','.join('?' * len(chunk))})",
+                chunk
+            ))
+    return inserted
+
+def _existing_ids(conn, recommendation_ids):
+    found = set()
+    for chunk in _chunks(recommendation_ids):
+        found.update(r[0] for r in conn.execute(
+            f"SELECT id FROM recommendations WHERE id IN ({','.join('?' * len(chunk))})", chunk
+        ))
+    return found
+
+def delete_recommendations(recommendation_ids):
+    """Delete in one transaction; returns the ids that existed"""
+    conn = get_db_connection()
+    with conn:
+        found = _existing_ids(conn, recommendation_ids)
+        conn.executemany('DELETE FROM recommendations WHERE id = ?', [(i,) for i in found])
+    return found
+
+def set_recommendations_active(recommendation_ids, is_active):
+    """Activate or deactivate in one transaction; returns the ids that existed"""
+    conn = get_db_connection()
+    with conn:
+        found = _existing_ids(conn, recommendation_ids)
+        conn.executemany(
+            'UPDATE recommendations SET is_active = ? WHERE id = ? AND is_active != ?',
+            [(1 if is_active else 0, i, 1 if is_active else 0) for i in found]
+        )
+    return found
\ No newline at end of file
@@ -0,0 +1,23 @@
+from database import get_db_connection
+
+def get_counters():
+    """Row counts maintained by triggers (see migrations.py)"""
+    conn = get_db_connection()
+    rows = conn.execute('SELECT name, value FROM stats_counters').fetchall()
+    return {row['name']: row['value'] for row in rows}
+
+def get_category_counts():
+    conn = get_db_connection()
+    rows = conn.execute('''
+        SELECT category, total, active FROM category_counts
+        WHERE total > 0 ORDER BY total DESC, category
+    ''').fetchall()
+    return [dict(row) for row in rows]
+
+def get_signups_since(day):
+    """Signups per day from `day` (YYYY-MM-DD) onwards, days without signups omitted"""
+    conn = get_db_connection()
+    rows = conn.execute(
+        'SELECT day, signups FROM daily_signups WHERE day >= ? AND signups > 0 ORDER BY day', (day,)
+    ).fetchall()
+    return {row['day']: row['signups'] for row in rows}
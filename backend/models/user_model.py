@@ -14,9 +14,22 @@ def create_user_table(conn):
 def get_all_users():
     conn = get_db_connection()
     users = conn.execute(
-        'SELECT * FROM users ORDER BY created DESC'
+        'SELECT * FROM users ORDER BY created DESC, id DESC'
     ).fetchall()
-    conn.close()
+    return [dict(user) for user in users]
+
+def get_users_page(limit, after=None):
+    """Newest first, `limit` + 1 rows; `after` is the (created, id) of the last row returned"""
+    conn = get_db_connection()
+    if after:
+        users = conn.execute(
+            'SELECT * FROM users WHERE (created, id) < (?, ?) ORDER BY created DESC, id DESC LIMIT ?',
+            (*after, limit + 1)
+        ).fetchall()
+    else:
+        users = conn.execute(
+            'SELECT * FROM users ORDER BY created DESC, id DESC LIMIT ?', (limit + 1,)
+        ).fetchall()
     return [dict(user) for user in users]
 
 def create_user(name, email):
@@ -28,10 +41,9 @@ def create_user(name, email):
         )
         conn.commit()
         user_id = cursor.lastrowid
-        conn.close()
         return user_id
     except sqlite3.IntegrityError:
-        conn.close()
+        conn.rollback()
         return None
 
 def get_user_by_email(email):
@@ -39,11 +51,10 @@ def get_user_by_email(email):
     user = conn.execute(
         'SELECT * FROM users WHERE email = ?', (email,)
     ).fetchone()
-    conn.close()
     return dict(user) if user else None
 
 def count_users():
+    # Maintained by triggers, so this stays constant-time as users grows
     conn = get_db_connection()
-    count = conn.execute('SELECT COUNT(*) FROM users').fetchone()[0]
-    conn.close()
-    return count
\ No newline at end of file
+    row = conn.execute("SELECT value FROM stats_counters WHERE name = 'users'").fetchone()
+    return row[0] if row else 0
\ No newline at end of file
@@ -1,14 +1,19 @@
 from flask import Blueprint, request, jsonify, session, render_template, redirect, url_for
 from functools import wraps
 from models.admin_model import get_admin_by_username, verify_admin_password
-from models.recommendation_model import get_all_recommendations, get_recommendation_by_id, delete_recommendation
-from models.user_model import get_all_users, count_users
+from models.recommendation_model import get_recommendations_page, get_recommendation_by_id, delete_recommendation, recommendation_exists
+from models.user_model import get_users_page, count_users
 from utils.api_client import get_movie_details
 from services.auth_service import AuthService
-from services.recommendation_service import RecommendationService
+from services.recommendation_service import RecommendationService, parse_bulk_items
+from services.stats_service import StatsService
+from services.job_queue import enqueue, get_job
+from utils.pagination import page_args, parse_active, next_cursor
 
 admin_bp = Blueprint("admin_bp", __name__)
 
+MAX_BULK_ITEMS = 1000
+
 def login_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
@@ -72,20 +77,8 @@ def logout():
 @login_required
 def dashboard():
     try:
-        # Get statistics
-        users_count = count_users()
-        recommendations = get_all_recommendations()
-        recommendations_count = len(recommendations)
-        active_recommendations = len([r for r in recommendations if r['is_active']])
-        
-        return jsonify({
-            "stats": {
-                "users": users_count,
-                "recommendations": recommendations_count,
-                "active_recommendations": active_recommendations
-            },
-            "recent_recommendations": recommendations[:5]
-        })
+        days = max(1, min(request.args.get('days', 30, type=int), 365))
+        return jsonify(StatsService.get_dashboard_stats(days))
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -93,10 +86,18 @@ def dashboard():
 @login_required
 def get_recommendations():
     try:
-        recommendations = get_all_recommendations()
+        limit, after = page_args(request.args)
+        is_active = parse_active(request.args.get('is_active'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    try:
+        rows = get_recommendations_page(limit, after, request.args.get('category') or None, is_active)
+        recommendations = rows[:limit]
         return jsonify({
             "recommendations": recommendations,
-            "count": len(recommendations)
+            "count": len(recommendations),
+            "next_cursor": next_cursor(rows, limit, 'created_at', 'id')
         })
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -114,18 +115,25 @@ def add_movie():
     category = data.get('category', 'Featured')
     
     try:
-        recommendation_id, message = RecommendationService.add_movie_recommendation(
-            movie_id, description, category
-        )
+        movie_id = int(movie_id)
+    except (TypeError, ValueError):
+        return jsonify({"error": "Movie ID must be an integer"}), 400
+    
+    try:
+        if recommendation_exists(movie_id):
+            return jsonify({"error": "Movie already exists in recommendations"}), 400
         
-        if recommendation_id:
-            return jsonify({
-                "message": message,
-                "recommendation_id": recommendation_id
-            })
-        else:
-            return jsonify({"error": message}), 400
-            
+        # The TMDB lookup runs on a job worker so this request returns at once
+        job_id = enqueue("add_recommendation", {
+            "movie_id": movie_id,
+            "description": description,
+            "category": category
+        })
+        return jsonify({
+            "message": "Recommendation queued",
+            "job_id": job_id,
+            "status_url": f"/admin/jobs/{job_id}"
+        }), 202
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -141,14 +149,93 @@ def delete_movie(recommendation_id):
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@admin_bp.route("/add-bulk", methods=["POST"])
+@login_required
+def add_movies_bulk():
+    # JSON (ids or objects) or CSV (movie_id,category,description) body
+    try:
+        items = parse_bulk_items(request.get_data(as_text=True), request.args.get('category', 'Featured'))
+    except (ValueError, TypeError, AttributeError):
+        return jsonify({"error": "Body must be a JSON list of movie IDs or CSV"}), 400
+    
+    if not items:
+        return jsonify({"error": "No movie IDs given"}), 400
+    if len(items) > MAX_BULK_ITEMS:
+        return jsonify({"error": f"At most {MAX_BULK_ITEMS} movies per request"}), 400
+    
+    try:
+        job_id = enqueue("add_recommendations_bulk", {"items": items})
+        return jsonify({
+            "message": f"{len(items)} movies queued",
+            "job_id": job_id,
+            "status_url": f"/admin/jobs/{job_id}"
+        }), 202
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def _bulk_update(action):
+    data = request.get_json(silent=True) or {}
+    ids = data.get('ids')
+    if not isinstance(ids, list) or not ids:
+        return jsonify({"error": "ids must be a non-empty list"}), 400
+    if len(ids) > MAX_BULK_ITEMS:
+        return jsonify({"error": f"At most {MAX_BULK_ITEMS} ids per request"}), 400
+    try:
+        ids = [int(i) for i in ids]
+    except (TypeError, ValueError):
+        return jsonify({"error": "ids must be integers"}), 400
+    
+    try:
+        results = RecommendationService.bulk_update(ids, action)
+        return jsonify({
+            "results": results,
+            "updated": sum(1 for r in results if r["status"] == "ok")
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@admin_bp.route("/delete-bulk", methods=["POST"])
+@login_required
+def delete_movies_bulk():
+    return _bulk_update("delete")
+
+@admin_bp.route("/deactivate-bulk", methods=["POST"])
+@login_required
+def deactivate_movies_bulk():
+    return _bulk_update("deactivate")
+
+@admin_bp.route("/activate-bulk", methods=["POST"])
+@login_required
+def activate_movies_bulk():
+    return _bulk_update("activate")
+
+@admin_bp.route("/jobs/<int:job_id>")
+@login_required
+def job_status(job_id):
+    try:
+        job = get_job(job_id)
+        if not job:
+            return jsonify({"error": "Job not found"}), 404
+        return jsonify(job)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @admin_bp.route("/users")
 @login_required
 def get_users():
     try:
-        users = get_all_users()
+        limit, after = page_args(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    try:
+        rows = get_users_page(limit, after)
+        users = rows[:limit]
         return jsonify({
             "users": users,
-            "count": len(users)
+            "count": len(users),
+            "total": count_users(),
+            "next_cursor": next_cursor(rows, limit, 'created', 'id')
         })
     except Exception as e:
         return jsonify({"error": str(e)}), 500
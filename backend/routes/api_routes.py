@@ -1,47 +1,160 @@
-from flask import Blueprint, jsonify, request
-from utils.api_client import get_movie_details
+from flask import Blueprint, jsonify, request, current_app
+from utils.api_client import get_movie_details, get_movies_details, get_client, not_found
+from utils.cache import get_cache, make_cache_key
+from utils.image_cache import get_image_cache
+from utils.projection import (
+    project, parse_fields, fields_key, CARD_FIELDS, CAST_FIELDS, CREW_FIELDS, VIDEO_FIELDS,
+    MAX_CAST, MAX_CREW, MAX_VIDEOS, MAX_SIMILAR
+)
+from utils.response_cache import cached_json, error_response, get_response_cache
+from utils.similarity import ready_similarity_index, similar_movies
+from services.cache_warmer import feed_coverage
+from services.recommendation_ranking import get_recommendation_ranker
 
 api_bp = Blueprint("api_bp", __name__)
 
+# Upper bound on ids accepted by /api/movies
+MAX_BATCH_IDS = 50
+
+# TMDB ids are positive 32-bit integers; anything else cannot exist
+MAX_MOVIE_ID = 2 ** 31 - 1
+
+# Upper bound on ?limit= for /api/movie/<id>/similar
+MAX_SIMILAR_LIMIT = 50
+
+# Retry-After sent while a worker is still building its similarity index
+SIMILARITY_BUILD_RETRY_AFTER = 5
+
+def _movie_info(data):
+    """Project a TMDB movie payload onto the fields the frontend uses"""
+    movie_info = {
+        "id": data.get("id"),
+        "title": data.get("title"),
+        "overview": data.get("overview"),
+        "poster_path": data.get("poster_path"),
+        "backdrop_path": data.get("backdrop_path"),
+        "release_date": data.get("release_date"),
+        "vote_average": data.get("vote_average"),
+        "vote_count": data.get("vote_count"),
+        "genres": data.get("genres", []),
+        "runtime": data.get("runtime"),
+        "budget": data.get("budget"),
+        "revenue": data.get("revenue"),
+        "status": data.get("status")
+    }
+    
+    # Add credits if available
+    if "credits" in data:
+        movie_info["cast"] = [project(p, CAST_FIELDS) for p in data["credits"].get("cast", [])[:MAX_CAST]]
+        movie_info["crew"] = [project(p, CREW_FIELDS) for p in data["credits"].get("crew", [])[:MAX_CREW]]
+    
+    # Add videos if available
+    if "videos" in data and "results" in data["videos"]:
+        movie_info["videos"] = [
+            project(video, VIDEO_FIELDS) for video in data["videos"]["results"]
+            if video["site"] == "YouTube"
+        ][:MAX_VIDEOS]
+    
+    # Add similar movies if available, as cards
+    if "similar" in data and "results" in data["similar"]:
+        movie_info["similar"] = [project(m, CARD_FIELDS) for m in data["similar"]["results"][:MAX_SIMILAR]]
+    
+    return movie_info
+
+def _details_or_error(data, fields=None):
+    # Errors pass through unprojected so they are recognised and never cached
+    return data if "error" in data else project(_movie_info(data), fields)
+
 @api_bp.route("/movie/<int:movie_id>")
 def movie_details(movie_id):
+    if not 0 < movie_id <= MAX_MOVIE_ID:
+        return jsonify(not_found()), 404
+    
     try:
-        data = get_movie_details(movie_id)
-        
-        # Extract relevant information
-        movie_info = {
-            "id": data.get("id"),
-            "title": data.get("title"),
-            "overview": data.get("overview"),
-            "poster_path": data.get("poster_path"),
-            "backdrop_path": data.get("backdrop_path"),
-            "release_date": data.get("release_date"),
-            "vote_average": data.get("vote_average"),
-            "vote_count": data.get("vote_count"),
-            "genres": data.get("genres", []),
-            "runtime": data.get("runtime"),
-            "budget": data.get("budget"),
-            "revenue": data.get("revenue"),
-            "status": data.get("status")
-        }
-        
-        # Add credits if available
-        if "credits" in data:
-            movie_info["cast"] = data["credits"].get("cast", [])[:10]  # Top 10 cast
-            movie_info["crew"] = data["credits"].get("crew", [])[:5]   # Top 5 crew
-        
-        # Add videos if available
-        if "videos" in data and "results" in data["videos"]:
-            movie_info["videos"] = [
-                video for video in data["videos"]["results"] 
-                if video["site"] == "YouTube"
-            ][:3]  # Top 3 YouTube videos
-        
-        # Add similar movies if available
-        if "similar" in data and "results" in data["similar"]:
-            movie_info["similar"] = data["similar"]["results"][:6]  # Top 6 similar movies
+        fields = parse_fields(request.args.get("fields"), default=None)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    try:
+        key = make_cache_key(request.path, {"fields": fields_key(fields)})
+        return cached_json(key, lambda: _details_or_error(get_movie_details(movie_id), fields))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@api_bp.route("/movie/<int:movie_id>/similar")
+def similar(movie_id):
+    """Movies like this one, ranked by the local similarity index"""
+    if not 0 < movie_id <= MAX_MOVIE_ID:
+        return jsonify(not_found()), 404
+    
+    try:
+        fields = parse_fields(request.args.get("fields"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        limit = int(request.args.get("limit", 10))
+    except ValueError:
+        limit = None
+    if limit is None or not 1 <= limit <= MAX_SIMILAR_LIMIT:
+        return jsonify({"error": f"limit must be between 1 and {MAX_SIMILAR_LIMIT}"}), 400
+    
+    # The index is built in the background; requests never wait for it
+    index = ready_similarity_index()
+    if index is None:
+        return error_response({
+            "error": "Similarity index is being built, try again shortly",
+            "status_code": 503,
+            "retry_after": SIMILARITY_BUILD_RETRY_AFTER
+        })
+    
+    try:
+        results = similar_movies(movie_id, limit, fields, index)
+        if results is None:
+            # Not seen yet: index it from its details and try again
+            data = get_movie_details(movie_id)
+            if "error" in data:
+                return error_response(data)
+            index.add_movies([data])
+            results = similar_movies(movie_id, limit, fields, index)
+        return jsonify({"id": movie_id, "results": results})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@api_bp.route("/movies")
+def movies_details():
+    try:
+        movie_ids = [int(i) for i in request.args.get("ids", "").split(",") if i.strip()]
+    except ValueError:
+        return jsonify({"error": "ids must be a comma separated list of movie IDs"}), 400
+    
+    try:
+        fields = parse_fields(request.args.get("fields"), default=None)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    movie_ids = list(dict.fromkeys(movie_ids))  # Drop duplicates, keep order
+    if not movie_ids:
+        return jsonify({"error": "ids parameter is required"}), 400
+    if len(movie_ids) > MAX_BATCH_IDS:
+        return jsonify({"error": f"At most {MAX_BATCH_IDS} ids per request"}), 400
+    if any(not 0 < movie_id <= MAX_MOVIE_ID for movie_id in movie_ids):
+        return jsonify({"error": "ids must be positive movie IDs"}), 400
+    
+    try:
+        data = get_movies_details(movie_ids)
+        results = []
+        errors = []
+        for movie_id in movie_ids:
+            if "error" in data[movie_id]:
+                errors.append(dict(data[movie_id], id=movie_id))
+            else:
+                results.append(project(_movie_info(data[movie_id]), fields))
         
-        return jsonify(movie_info)
+        return jsonify({
+            "results": results,
+            "errors": errors,
+            "count": len(results)
+        })
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -70,4 +183,23 @@ def genres():
         {"id": 10752, "name": "War"},
         {"id": 37, "name": "Western"}
     ]
-    return jsonify({"genres": common_genres})
\ No newline at end of file
+    return jsonify({"genres": common_genres})
+
+@api_bp.route("/cache/stats")
+def cache_stats():
+    return jsonify(dict(get_cache().stats(), responses=get_response_cache().stats(),
+                        images=get_image_cache().stats()))
+
+@api_bp.route("/cache/coverage")
+def cache_coverage():
+    pages = request.args.get("pages", current_app.config['CACHE_WARMER_PAGES'], type=int)
+    return jsonify(feed_coverage(get_cache(), max(1, min(pages, 50))))
+
+@api_bp.route("/recommendations/ranking")
+def ranking_stats():
+    """Outcome and duration of this worker's last recommendation ranking"""
+    return jsonify(get_recommendation_ranker().stats())
+
+@api_bp.route("/upstream/stats")
+def upstream_stats():
+    return jsonify(get_client().stats())
\ No newline at end of file
@@ -1,9 +1,27 @@
-from flask import Blueprint, jsonify, request
-from utils.api_client import get_trending, search_movie, get_popular_movies, get_top_rated, get_upcoming, get_now_playing
-from models.recommendation_model import get_all_recommendations
+from flask import Blueprint, current_app, jsonify, request, send_file, g
+from utils.api_client import get_trending, search_movie, get_popular_movies, get_top_rated, get_upcoming, get_now_playing, prefetch_next_page, MAX_FEED_PAGE
+from services.recommendation_feed import get_recommendation_feed
+from services.recommendation_ranking import get_recommendation_ranker
+from utils.pagination import limit_arg, page_args, page_number_arg
+from utils.projection import parse_fields, fields_key, project_page
+from utils.cache import make_cache_key
+from utils.response_cache import cached_json, error_response
+from utils.image_cache import ImageFetchError, get_image_cache, mimetype_for
+from utils.suggest import ready_suggester
 
 public_bp = Blueprint("public_bp", __name__)
 
+# Retry-After sent while a worker is still building its title suggestions
+SUGGEST_BUILD_RETRY_AFTER = 5
+
+@public_bp.after_request
+def add_age_header(response):
+    # Set by the TMDB client when a feed was served from cache
+    age = g.get("tmdb_cache_age")
+    if age is not None:
+        response.headers["Age"] = str(age)
+    return response
+
 @public_bp.route("/")
 def home():
     return jsonify({
@@ -11,12 +29,15 @@ def home():
         "version": "1.0",
         "endpoints": {
             "trending": "/trending",
-            "search": "/search?query=...",
+            "search": "/search?query=...&fields=...",
+            "suggest": "/search/suggest?q=...",
             "popular": "/popular",
             "top_rated": "/top-rated",
             "upcoming": "/upcoming",
             "now_playing": "/now-playing",
-            "recommendations": "/recommendations"
+            "images": "/img/<size>/<path>",
+            "recommendations": "/recommendations?category=...&limit=...&cursor=...",
+            "ranked_recommendations": "/recommendations?sort=ranked&category=...&limit=..."
         }
     })
 
@@ -30,72 +51,154 @@ def search():
         return jsonify({"error": "Query parameter is required"}), 400
     
     try:
-        data = search_movie(query)
-        return jsonify(data)
+        fields = parse_fields(request.args.get("fields"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    try:
+        data = search_movie(query, page)
+        if "error" in data:
+            return error_response(data)
+        return jsonify(project_page(data, fields))
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+@public_bp.route("/search/suggest")
+def suggest():
+    prefix = request.args.get("q", "")
+    limit = max(1, min(request.args.get("limit", 10, type=int), 20))
+    
+    # The title index is built in the background; requests never wait for it
+    suggester = ready_suggester()
+    if suggester is None:
+        return error_response({
+            "error": "Suggestions are being built, try again shortly",
+            "status_code": 503,
+            "retry_after": SUGGEST_BUILD_RETRY_AFTER
+        })
+    
+    try:
+        return jsonify({
+            "query": prefix,
+            "results": suggester.suggest(prefix, limit)
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+def _feed_response(feed, fetch):
+    """A category page, served as pre-encoded bytes while the TMDB data is fresh.
+
+    Results are projected to movie cards (or ?fields=) before encoding, so
+    the cached bodies hold only what is sent. Pages TMDB would refuse are
+    rejected here rather than sent upstream.
+    """
+    try:
+        page = page_number_arg(request.args, MAX_FEED_PAGE)
+        fields = parse_fields(request.args.get("fields"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    def build():
+        data = fetch(page)
+        prefetch_next_page(feed, page, data)
+        return project_page(data, fields)
+    return cached_json(make_cache_key(request.path, {"page": page, "fields": fields_key(fields)}), build)
+
 # routes/public_routes.py
 
 @public_bp.route("/popular")
 def popular():
     try:
-        page = request.args.get("page", 1, type=int)  # Add this line
-        data = get_popular_movies(page)  # Pass page parameter
-        return jsonify(data)
+        return _feed_response('popular', get_popular_movies)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @public_bp.route("/trending")
 def trending():
     try:
-        page = request.args.get("page", 1, type=int)  # Add this line
-        data = get_trending()  # This might also need updating
-        return jsonify(data)
+        return _feed_response('trending', get_trending)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @public_bp.route("/top-rated")
 def top_rated():
     try:
-        page = request.args.get("page", 1, type=int)  # Add this line
-        data = get_top_rated(page)  # Pass page parameter
-        return jsonify(data)
+        return _feed_response('top_rated', get_top_rated)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @public_bp.route("/upcoming")
 def upcoming():
     try:
-        page = request.args.get("page", 1, type=int)  # Add this line
-        data = get_upcoming(page)  # Pass page parameter
-        return jsonify(data)
+        return _feed_response('upcoming', get_upcoming)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @public_bp.route("/now-playing")
 def now_playing():
     try:
-        page = request.args.get("page", 1, type=int)  # Add this line
-        data = get_now_playing(page)  # Pass page parameter
-        return jsonify(data)
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
-    try:
-        page = request.args.get("page", 1, type=int)
-        data = get_now_playing(page)
-        return jsonify(data)
+        return _feed_response('now_playing', get_now_playing)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @public_bp.route("/recommendations")
 def get_recommendations():
+    category = request.args.get("category") or None
+    
+    if request.args.get("sort") == "ranked":
+        try:
+            limit = limit_arg(request.args, default=None)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        try:
+            response = get_recommendation_ranker().response(category, limit)
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+        # Until this worker has ranked once, serve the curated order below
+        if response is not None:
+            return response
+    
+    # Without paging or filter arguments the whole feed is returned, as before
+    if category is None and "limit" not in request.args and "cursor" not in request.args:
+        limit, after = None, None
+    else:
+        try:
+            limit, after = page_args(request.args)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+    
     try:
-        recommendations = get_all_recommendations()
-        return jsonify({
-            "results": recommendations,
-            "count": len(recommendations)
-        })
+        return get_recommendation_feed().response(category, limit, after)
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
\ No newline at end of file
+        return jsonify({"error": str(e)}), 500
+
+
+@public_bp.route("/img/<size>/<name>")
+def image(size, name):
+    """TMDB image through the local disk cache, e.g. /img/w342/abc.jpg"""
+    cache = get_image_cache()
+    try:
+        path = cache.get(size, name)
+        if path is None:
+            return jsonify({"error": "Image not found"}), 404
+        try:
+            # Sent with wsgi.file_wrapper, i.e. sendfile() under gunicorn
+            response = send_file(path, mimetype=mimetype_for(name), conditional=True,
+                                 max_age=current_app.config['IMAGE_MAX_AGE'])
+        except FileNotFoundError:
+            # Evicted by another worker in between; fetch it again
+            path = cache.get(size, name)
+            if path is None:
+                return jsonify({"error": "Image not found"}), 404
+            response = send_file(path, mimetype=mimetype_for(name), conditional=True,
+                                 max_age=current_app.config['IMAGE_MAX_AGE'])
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except ImageFetchError as e:
+        return jsonify({"error": str(e)}), 502
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    response.headers['X-Content-Type-Options'] = 'nosniff'
+    return response
@@ -0,0 +1,135 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+
+from utils.api_client import FEEDS, get_client
+from utils.cache import make_cache_key
+from utils.resilience import TokenBucket
+
+
+def feed_coverage(cache, pages):
+    """Report which of the first `pages` pages of every feed are fresh in the cache"""
+    feeds = {}
+    fresh_total = 0
+    for name, endpoint in FEEDS.items():
+        fresh = [
+            page for page in range(1, pages + 1)
+            if cache.freshness(make_cache_key(endpoint, {'page': page})) > 0
+        ]
+        fresh_total += len(fresh)
+        feeds[name] = {"fresh_pages": fresh, "coverage": round(len(fresh) / pages, 4)}
+    return {
+        "pages_per_feed": pages,
+        "feeds": feeds,
+        "coverage": round(fresh_total / (pages * len(FEEDS)), 4)
+    }
+
+
+class CacheWarmer:
+    """Keeps the first pages of every category feed fresh in the TMDB cache.
+
+    Runs either as a daemon thread inside the app (CACHE_WARMER_ENABLED) or
+    once/looping from the `flask warm-cache` command. With several gunicorn
+    workers only the one holding the shared warmer lock does the work.
+    """
+    LOCK_KEY = "cache-warmer"
+
+    def __init__(self, app, pages=5, interval=300, concurrency=4, rate=10):
+        self.app = app
+        self.pages = pages
+        self.interval = interval
+        self.concurrency = concurrency
+        self.budget = TokenBucket(rate)
+        self.last_report = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def from_config(cls, app):
+        return cls(
+            app,
+            pages=app.config['CACHE_WARMER_PAGES'],
+            interval=app.config['CACHE_WARMER_INTERVAL'],
+            concurrency=app.config['CACHE_WARMER_CONCURRENCY'],
+            rate=app.config['CACHE_WARMER_RATE']
+        )
+
+    def _client(self):
+        with self.app.app_context():
+            return get_client()
+
+    def warm(self):
+        """Refresh every target page that would go stale before the next run"""
+        started = time.time()
+        client = self._client()
+        targets = [
+            (FEEDS[name], page) for name in FEEDS for page in range(1, self.pages + 1)
+        ]
+        due = [
+            (endpoint, page) for endpoint, page in targets
+            if client.cache.freshness(make_cache_key(endpoint, {'page': page})) < self.interval
+        ]
+
+        def warm_one(target):
+            endpoint, page = target
+            self.budget.acquire()
+            data = client.refresh(endpoint, {'page': page})
+            return 'error' not in data
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            results = list(pool.map(warm_one, due))
+
+        self.last_report = {
+            "fetched": results.count(True),
+            "failed": results.count(False),
+            "skipped": len(targets) - len(due),
+            "duration": round(time.time() - started, 3),
+            "coverage": feed_coverage(client.cache, self.pages)
+        }
+        return self.last_report
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="cache-warmer", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                # The lock is left to expire so other workers skip this round
+                if self._client().cache.acquire_lock(self.LOCK_KEY, self.interval * 0.9):
+                    report = self.warm()
+                    print(f"Cache warmer: {report['fetched']} fetched, "
+                          f"{report['failed']} failed, coverage {report['coverage']['coverage']:.0%}")
+            except Exception as e:
+                print(f"Cache warmer error: {e}")
+            self._stop.wait(self.interval)
+
+
+_warmer = None
+_warmer_pid = None
+_warmer_lock = threading.Lock()
+
+
+def get_cache_warmer():
+    """Get this process's cache warmer, created once per process.
+
+    Like the job worker it is never shared across a fork, so gunicorn
+    workers forked from a preloaded master warm in threads of their own.
+    """
+    global _warmer, _warmer_pid
+    if _warmer is None or _warmer_pid != os.getpid():
+        with _warmer_lock:
+            if _warmer is None or _warmer_pid != os.getpid():
+                _warmer = CacheWarmer.from_config(current_app._get_current_object())
+                _warmer_pid = os.getpid()
+    return _warmer
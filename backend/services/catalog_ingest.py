@@ -0,0 +1,139 @@
+import datetime
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.api_client import FEEDS, MAX_FEED_PAGE
+
+DETAILS_PARAMS = {'append_to_response': 'credits,videos,similar'}
+
+# TMDB's change feed only covers this many days per query
+MAX_CHANGES_DAYS = 14
+
+
+class CatalogIngest:
+    """Streams TMDB feed pages and movie details into the catalog snapshot.
+
+    A run first stores the first `pages` pages of every category feed and
+    queues the movies they list (plus `extra_ids`) that the snapshot lacks;
+    with `refresh` it also queues snapshot movies TMDB reports as changed
+    since the last sync. Details are then fetched by `concurrency` threads
+    through the client's shared rate limit and breaker, and each batch is
+    written together with its checkpoint, so an interrupted run picks up the
+    remaining queue on the next invocation.
+    """
+
+    def __init__(self, client, catalog, pages=25, concurrency=8, batch_size=100, log=print):
+        self.client = client
+        self.catalog = catalog
+        self.pages = min(pages, MAX_FEED_PAGE)
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.log = log
+
+    @classmethod
+    def from_config(cls, app, client, catalog):
+        return cls(
+            client, catalog,
+            pages=app.config['CATALOG_INGEST_PAGES'],
+            concurrency=app.config['CATALOG_INGEST_CONCURRENCY']
+        )
+
+    def run(self, refresh=False, restart=False, extra_ids=()):
+        started = time.time()
+        report = {"pages": 0, "queued": 0, "changed": 0}
+        if restart:
+            self.catalog.clear_pending()
+        pending = self.catalog.pending_count()
+        if pending:
+            self.log(f"Resuming: {pending} movies left from the previous run")
+        else:
+            known = self.catalog.movie_ids()
+            listed, report["pages"] = self.ingest_feeds()
+            new_ids = (listed | set(extra_ids)) - known
+            self.catalog.add_pending(new_ids)
+            report["queued"] = len(new_ids)
+            if refresh:
+                changed = self.changed_ids(known)
+                self.catalog.add_pending(changed)
+                report["changed"] = len(changed)
+            self.log(f"Queued {report['queued']} new and {report['changed']} changed movies")
+        report.update(self.ingest_details())
+        report["duration"] = round(time.time() - started, 3)
+        if not self.catalog.pending_count():
+            self.catalog.set_state('last_ingest', started)
+        return report
+
+    def ingest_feeds(self):
+        """Store feed pages; returns (movie ids they list, pages stored)"""
+        targets = [(endpoint, page) for endpoint in FEEDS.values() for page in range(1, self.pages + 1)]
+
+        def fetch(target):
+            endpoint, page = target
+            return endpoint, page, self.client.fetch(endpoint, {'page': page})
+
+        ids = set()
+        stored = 0
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            for endpoint, page, data in pool.map(fetch, targets):
+                if 'error' in data:
+                    self.log(f"{endpoint} page {page}: {data['error']}")
+                    continue
+                self.catalog.put_page(endpoint, {'page': page}, data, time.time())
+                ids.update(item['id'] for item in data.get('results', []) if item.get('id'))
+                stored += 1
+        return ids, stored
+
+    def changed_ids(self, known):
+        """Snapshot movies TMDB changed since the last sync (all of them if that is too long ago)"""
+        today = datetime.date.today()
+        synced_to = self.catalog.get_state('changes_synced_to')
+        since = datetime.date.fromisoformat(synced_to) if synced_to else None
+        if since is None or (today - since).days > MAX_CHANGES_DAYS:
+            # Older than the change feed reaches: everything may be stale
+            changed = set(known)
+        else:
+            changed = set()
+            page, total_pages = 1, 1
+            while page <= total_pages:
+                data = self.client.fetch('movie/changes', {
+                    'start_date': since.isoformat(), 'end_date': today.isoformat(), 'page': page
+                })
+                if 'error' in data:
+                    # Leave the sync date alone so the next refresh covers this window again
+                    self.log(f"movie/changes page {page}: {data['error']}")
+                    return changed & known
+                changed.update(item['id'] for item in data.get('results', []) if item.get('id'))
+                total_pages = data.get('total_pages', 1)
+                page += 1
+            changed &= known
+        self.catalog.set_state('changes_synced_to', today.isoformat())
+        return changed
+
+    def ingest_details(self):
+        """Fetch every queued movie once, checkpointing after each batch"""
+        fetched = missing = failed = 0
+        after = 0
+
+        def fetch(movie_id):
+            return movie_id, self.client.fetch(f"movie/{movie_id}", DETAILS_PARAMS)
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            while True:
+                batch = self.catalog.pending_after(after, self.batch_size)
+                if not batch:
+                    break
+                after = batch[-1]
+                movies, gone = [], []
+                for movie_id, data in pool.map(fetch, batch):
+                    if 'error' not in data:
+                        movies.append((movie_id, data))
+                    elif data.get('status_code') == 404:
+                        gone.append(movie_id)
+                    else:
+                        # Stays queued for the next run
+                        failed += 1
+                self.catalog.store_movies(movies, gone, time.time())
+                fetched += len(movies)
+                missing += len(gone)
+                self.log(f"{fetched} movies stored, {missing} gone, {failed} failed")
+        return {"fetched": fetched, "missing": missing, "failed": failed}
@@ -0,0 +1,215 @@
+import json
+import os
+import threading
+import time
+from flask import current_app
+from database import get_db_connection
+from utils.resilience import backoff_delay
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# kind -> function(payload) returning a JSON-serializable result
+HANDLERS = {}
+
+# Set on enqueue so idle worker threads in this process pick the job up at once
+_new_job = threading.Event()
+
+
+class PermanentJobError(Exception):
+    """Raised by a handler when retrying cannot help (bad input, duplicate, ...)"""
+
+
+def register_job(kind, handler):
+    HANDLERS[kind] = handler
+
+
+def enqueue(kind, payload, max_attempts=3):
+    """Queue a job and return its id"""
+    now = time.time()
+    conn = get_db_connection()
+    cursor = conn.execute('''
+        INSERT INTO jobs (kind, payload, max_attempts, run_after, created_at, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', (kind, json.dumps(payload), max_attempts, now, now, now))
+    conn.commit()
+    _new_job.set()
+    return cursor.lastrowid
+
+
+def get_job(job_id):
+    conn = get_db_connection()
+    row = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+    if row is None:
+        return None
+    job = dict(row)
+    job['payload'] = json.loads(job['payload'])
+    job['result'] = json.loads(job['result']) if job['result'] else None
+    return job
+
+
+def has_due_job():
+    """Cheap read telling idle workers whether claiming (a write) is worth trying"""
+    now = time.time()
+    conn = get_db_connection()
+    row = conn.execute('''
+        SELECT 1 FROM jobs
+        WHERE (status = 'queued' AND run_after <= ?) OR (status = 'running' AND locked_until < ?)
+        LIMIT 1
+    ''', (now, now)).fetchone()
+    return row is not None
+
+
+def claim_job(lock_timeout):
+    """Atomically take the next due job, including ones whose worker died mid-run"""
+    now = time.time()
+    conn = get_db_connection()
+    row = conn.execute('''
+        UPDATE jobs SET status = 'running', attempts = attempts + 1,
+            locked_until = ?, updated_at = ?
+        WHERE id = (
+            SELECT id FROM jobs
+            WHERE status IN ('queued', 'running') AND run_after <= ?
+                AND (status = 'queued' OR locked_until < ?)
+            ORDER BY run_after, id LIMIT 1
+        )
+        RETURNING id, kind, payload, attempts, max_attempts
+    ''', (now + lock_timeout, now, now, now)).fetchone()
+    conn.commit()
+    return dict(row) if row else None
+
+
+def finish_job(job, result=None, error=None, retry=False):
+    now = time.time()
+    conn = get_db_connection()
+    if error is None:
+        conn.execute('''
+            UPDATE jobs SET status = 'done', result = ?, error = NULL, locked_until = NULL, updated_at = ?
+            WHERE id = ?
+        ''', (json.dumps(result), now, job['id']))
+    elif retry and job['attempts'] < job['max_attempts']:
+        conn.execute('''
+            UPDATE jobs SET status = 'queued', error = ?, run_after = ?, locked_until = NULL, updated_at = ?
+            WHERE id = ?
+        ''', (error, now + backoff_delay(job['attempts'], base=2, cap=60), now, job['id']))
+    else:
+        conn.execute('''
+            UPDATE jobs SET status = 'failed', error = ?, locked_until = NULL, updated_at = ?
+            WHERE id = ?
+        ''', (error, now, job['id']))
+    conn.commit()
+
+
+def purge_jobs(older_than):
+    """Delete finished jobs last updated more than `older_than` seconds ago"""
+    conn = get_db_connection()
+    cursor = conn.execute(
+        "DELETE FROM jobs WHERE status IN ('done', 'failed') AND updated_at < ?",
+        (time.time() - older_than,)
+    )
+    conn.commit()
+    return cursor.rowcount
+
+
+class JobWorker:
+    """Runs queued jobs on a few daemon threads.
+
+    Started on the first request of every app process (JOB_WORKERS_ENABLED)
+    or on its own via `flask run-jobs`; jobs are claimed with an atomic
+    UPDATE so any number of processes can share the queue. Idle threads
+    only read until a job is due. A job whose worker dies is picked up
+    again once its lock expires.
+    """
+
+    def __init__(self, app, threads=2, poll_interval=1.0, lock_timeout=300, retention=7 * 24 * 3600):
+        self.app = app
+        self.threads = threads
+        self.poll_interval = poll_interval
+        self.lock_timeout = lock_timeout
+        self.retention = retention
+        self.purged_at = None  # time.monotonic() of the last purge
+        self._stop = threading.Event()
+        self._threads = []
+
+    @classmethod
+    def from_config(cls, app):
+        return cls(
+            app,
+            threads=app.config['JOB_WORKER_THREADS'],
+            poll_interval=app.config['JOB_POLL_INTERVAL'],
+            lock_timeout=app.config['JOB_LOCK_TIMEOUT']
+        )
+
+    def run_once(self):
+        """Run the next due job; returns False when there was none"""
+        with self.app.app_context():
+            job = claim_job(self.lock_timeout)
+            if job is None:
+                return False
+            handler = HANDLERS.get(job['kind'])
+            try:
+                if handler is None:
+                    raise PermanentJobError(f"Unknown job kind {job['kind']}")
+                result = handler(json.loads(job['payload']))
+                finish_job(job, result=result)
+            except PermanentJobError as e:
+                finish_job(job, error=str(e))
+            except Exception as e:
+                print(f"Job {job['id']} ({job['kind']}) attempt {job['attempts']} failed: {e}")
+                finish_job(job, error=str(e), retry=True)
+            return True
+
+    def start(self):
+        self._threads = [t for t in self._threads if t.is_alive()]
+        if len(self._threads) >= self.threads:
+            return
+        self._stop.clear()
+        while len(self._threads) < self.threads:
+            thread = threading.Thread(target=self._run, name="job-worker", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        self._stop.set()
+        _new_job.set()
+
+    def _purge(self):
+        if self.purged_at is None or time.monotonic() - self.purged_at > 3600:
+            self.purged_at = time.monotonic()
+            purge_jobs(self.retention)
+
+    def _run(self):
+        # Polling reads through one connection kept for the thread's life;
+        # each job is claimed and run in an app context of its own
+        with self.app.app_context():
+            while not self._stop.is_set():
+                try:
+                    if has_due_job() and self.run_once():
+                        continue
+                    self._purge()
+                except Exception as e:
+                    print(f"Job worker error: {e}")
+                _new_job.wait(self.poll_interval)
+                _new_job.clear()
+
+
+_worker = None
+_worker_pid = None
+_worker_lock = threading.Lock()
+
+
+def get_job_worker():
+    """Get this process's job worker, created once per process.
+
+    Like the TMDB client it is never shared across a fork, so gunicorn
+    workers forked from a preloaded master start threads of their own.
+    """
+    global _worker, _worker_pid
+    if _worker is None or _worker_pid != os.getpid():
+        with _worker_lock:
+            if _worker is None or _worker_pid != os.getpid():
+                _worker = JobWorker.from_config(current_app._get_current_object())
+                _worker_pid = os.getpid()
+    return _worker
@@ -0,0 +1,79 @@
+import threading
+import time
+from flask import current_app
+from database import get_data_version
+from models.recommendation_model import get_all_recommendations, get_recommendations_page
+from utils.pagination import next_cursor
+from utils.response_cache import encode_body, send_encoded
+
+# Distinct (category, limit, cursor) pages kept per data version
+MAX_CACHED_PAGES = 1000
+
+class RecommendationFeed:
+    """Serialized /recommendations bodies, rebuilt only when the data version moves.
+
+    The version lives in the database (bumped by triggers), so a write made
+    by any worker invalidates every worker's copy. Between writes a read is
+    a version lookup at most once per `check_interval` seconds, otherwise a
+    memory lookup.
+    """
+
+    def __init__(self, check_interval=1.0):
+        self.check_interval = check_interval
+        self.version = None
+        self._pages = {}  # (category, limit, after) -> EncodedBody
+        self.checked_at = 0
+        self._lock = threading.Lock()
+
+    def get(self, category=None, limit=None, after=None):
+        """Return the EncodedBody; without a limit the whole active feed is returned"""
+        key = (category, limit, after)
+        page = self._pages.get(key)
+        if page is not None and time.monotonic() - self.checked_at < self.check_interval:
+            return page
+        with self._lock:
+            version = get_data_version('recommendations')
+            if version != self.version:
+                self._pages = {}
+                self.version = version
+            self.checked_at = time.monotonic()
+            page = self._pages.get(key)
+            if page is None:
+                # Built after reading the version: a write landing mid-build
+                # only makes the next check rebuild again, never pins stale data
+                page = encode_body(self._build(category, limit, after))
+                if len(self._pages) >= MAX_CACHED_PAGES:
+                    self._pages = {}
+                self._pages[key] = page
+            return page
+
+    def _build(self, category, limit, after):
+        if limit is None:
+            recommendations = get_all_recommendations()
+            return {"results": recommendations, "count": len(recommendations)}
+        rows = get_recommendations_page(limit, after, category)
+        return {
+            "results": rows[:limit],
+            "count": len(rows[:limit]),
+            "next_cursor": next_cursor(rows, limit, 'created_at', 'id')
+        }
+
+    def invalidate(self):
+        """Force a version check on the next read (after a write in this process)"""
+        self.checked_at = 0
+
+    def response(self, category=None, limit=None, after=None):
+        """Pre-encoded JSON with a strong ETag, answering If-None-Match with 304"""
+        response = send_encoded(self.get(category, limit, after))
+        response.cache_control.public = True
+        response.cache_control.no_cache = True
+        return response
+
+
+_feed = None
+
+def get_recommendation_feed():
+    global _feed
+    if _feed is None:
+        _feed = RecommendationFeed(current_app.config.get('RECOMMENDATIONS_VERSION_CHECK_INTERVAL', 1.0))
+    return _feed
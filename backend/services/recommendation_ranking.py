@@ -0,0 +1,277 @@
+import os
+import threading
+import time
+
+import numpy as np
+from flask import current_app
+
+from database import get_data_version
+from models.recommendation_model import get_all_recommendations
+from utils.api_client import FEEDS, get_client
+from utils.cache import make_cache_key
+from utils.catalog import get_catalog
+from utils.metrics import metrics
+from utils.response_cache import encode_body, send_encoded
+from utils.search_index import get_search_index
+from utils.similarity import get_similarity_index, top_k
+
+# How much each signal counts; the curated bonus alone outweighs all the
+# others, so curated movies always lead their category
+WEIGHTS = {"curated": 1.0, "similar": 0.6, "trending": 0.3, "popularity": 0.1}
+
+# Trending pages read from the TMDB cache or catalog snapshot; the ranker
+# never calls TMDB itself
+TRENDING_PAGES = 5
+
+POSTER_URL = "https://image.tmdb.org/t/p/w500{}"
+
+
+def _positions(ids, order, movie_ids):
+    """Positions in `ids` (sorted by `order`) of those movie_ids present there"""
+    movie_ids = np.asarray(list(movie_ids), dtype=np.int64)
+    if not len(movie_ids) or not len(ids):
+        return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=bool)
+    found = np.searchsorted(ids, movie_ids, sorter=order)
+    found = np.minimum(found, len(ids) - 1)
+    present = ids[order[found]] == movie_ids
+    return order[found[present]], present
+
+
+class RecommendationRanker:
+    """Ranked /recommendations lists per category, computed off the request path.
+
+    A daemon thread in every worker scores each movie the similarity index
+    knows by blending whether it is curated in the category, its mean
+    similarity to the category's curated movies, its position in the
+    cached trending feed and its popularity. The top `size` of every
+    category are encoded once and served from memory. Curated edits (seen
+    through the data version) re-rank only the categories whose curated
+    set changed; trending and popularity are re-read every `interval`.
+    """
+
+    def __init__(self, app, size=50, interval=300, check_interval=5):
+        self.app = app
+        self.size = size
+        self.interval = interval
+        self.check_interval = check_interval
+        self.last_report = None
+        self._lists = {}  # category (None for all) -> ranked items
+        self._bodies = {}  # (category, limit) -> EncodedBody
+        self._curated = {}  # category -> curated movie ids as last ranked
+        self._base = None  # (ids, sort order of ids, trending + popularity scores)
+        self._version = None
+        self._refreshed_at = None
+        self._ranked_at = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def from_config(cls, app):
+        return cls(
+            app,
+            size=app.config['RECOMMENDATIONS_RANKING_SIZE'],
+            interval=app.config['RECOMMENDATIONS_RANKING_INTERVAL'],
+            check_interval=app.config['RECOMMENDATIONS_RANKING_CHECK_INTERVAL']
+        )
+
+    def refresh(self, full=True):
+        """Re-rank every category (full) or only those whose curated movies changed"""
+        with self.app.app_context():
+            started = time.perf_counter()
+            version = get_data_version('recommendations')
+            rows = get_all_recommendations()
+            curated = {None: [row['movie_id'] for row in rows]}
+            for row in rows:
+                if row['category']:
+                    curated.setdefault(row['category'], []).append(row['movie_id'])
+
+            index = get_similarity_index()
+            # Curated movies rank even when nothing else is known about them
+            index.add_movies([{'id': movie_id} for movie_id in curated[None] if movie_id not in index])
+            # New movies (curated ones included) need a place in the shared scores
+            if full or self._base is None or len(index) > len(self._base[0]):
+                self._base = self._base_scores(index)
+            changed = [c for c in curated if full or curated[c] != self._curated.get(c)]
+
+            lists = {c: items for c, items in self._lists.items() if c in curated and c not in changed}
+            for category in changed:
+                lists[category] = self._rank(index, category, curated[category], rows)
+            with self._lock:
+                self._lists = lists
+                self._bodies = {}
+                self._curated = curated
+                self._version = version
+                self._ranked_at = time.time()
+                if full:
+                    self._refreshed_at = time.monotonic()
+
+            duration = time.perf_counter() - started
+            mode = 'full' if full else 'incremental'
+            metrics.observe('recommendation_ranking_duration_seconds', (mode,), duration)
+            self.last_report = {
+                "mode": mode,
+                "candidates": len(self._base[0]),
+                "categories": len(curated),
+                "ranked": len(changed),
+                "duration_ms": round(duration * 1000, 2)
+            }
+            return self.last_report
+
+    def _base_scores(self, index):
+        """Trending and popularity scores shared by every category"""
+        trending = self._trending_movies()
+        index.add_movies([movie for movie in trending if movie['id'] not in index])
+        ids, popularity = index.popularity()
+        order = np.argsort(ids, kind='stable')
+        scores = WEIGHTS["popularity"] * popularity
+        positions, present = _positions(ids, order, [movie['id'] for movie in trending])
+        ranks = np.flatnonzero(present)
+        scores[positions] += WEIGHTS["trending"] * (1 - ranks / max(len(trending), 1))
+        return ids, order, scores
+
+    def _trending_movies(self):
+        """Trending list items, best first, from whatever is stored locally"""
+        client = get_client()
+        catalog = get_catalog()
+        movies = {}
+        for page in range(1, TRENDING_PAGES + 1):
+            params = {'page': page}
+            entry = client.cache.get_entry(make_cache_key(FEEDS['trending'], params))
+            data = entry.value if entry is not None else None
+            if data is None and catalog is not None:
+                snapshot = catalog.get(FEEDS['trending'], params)
+                data = snapshot[0] if snapshot else None
+            for item in (data or {}).get('results') or []:
+                if item.get('id') and item.get('media_type', 'movie') == 'movie':
+                    movies.setdefault(item['id'], item)
+        return list(movies.values())
+
+    def _rank(self, index, category, seeds, rows):
+        ids, order, base = self._base
+        scores = base.copy()
+        if seeds:
+            _, similarity = index.scores(seeds)
+            scores += WEIGHTS["similar"] * similarity[:len(ids)]
+            positions, _ = _positions(ids, order, seeds)
+            scores[positions] += WEIGHTS["curated"]
+        # Headroom for movies we have no title for
+        top = top_k(scores, self.size * 2)
+        return self._items(category, [(int(ids[i]), float(scores[i])) for i in top], seeds, rows)
+
+    def _items(self, category, ranked, seeds, rows):
+        seeds = set(seeds)
+        curated_rows = {
+            row['movie_id']: row for row in rows
+            if row['movie_id'] in seeds and (category is None or row['category'] == category)
+        }
+        index = get_search_index()
+        catalog = get_catalog()
+        movies = index.get_movies([i for i, _ in ranked if i not in curated_rows]) if index is not None else {}
+        items = []
+        for movie_id, score in ranked:
+            row = curated_rows.get(movie_id)
+            if row is not None:
+                item = {
+                    "movie_id": movie_id, "movie_title": row['movie_title'],
+                    "description": row['description'], "image_url": row['image_url'],
+                    "category": row['category'], "curated": True
+                }
+            else:
+                movie = movies.get(movie_id)
+                if movie is None and catalog is not None:
+                    snapshot = catalog.get_movie(movie_id)
+                    movie = snapshot[0] if snapshot else None
+                if not movie or not movie.get('title'):
+                    continue
+                item = {
+                    "movie_id": movie_id, "movie_title": movie['title'],
+                    "description": movie.get('overview') or '',
+                    "image_url": POSTER_URL.format(movie.get('poster_path') or ''),
+                    "category": category, "curated": False
+                }
+            item["score"] = round(score, 4)
+            items.append(item)
+            if len(items) == self.size:
+                break
+        return items
+
+    def get(self, category=None, limit=None):
+        """EncodedBody of the ranked list, or None until the first ranking is done"""
+        if self._ranked_at is None:
+            return None
+        limit = self.size if limit is None else max(1, min(limit, self.size))
+        key = (category, limit)
+        body = self._bodies.get(key)
+        if body is None:
+            with self._lock:
+                items = self._lists.get(category)
+                results = (items or [])[:limit]
+                body = encode_body({
+                    "results": results,
+                    "count": len(results),
+                    "category": category,
+                    "ranked_at": self._ranked_at
+                })
+                # Only known categories are kept, so arbitrary ?category= values cost nothing
+                if items is not None:
+                    self._bodies[key] = body
+        return body
+
+    def response(self, category=None, limit=None):
+        body = self.get(category, limit)
+        if body is None:
+            return None
+        response = send_encoded(body)
+        response.cache_control.public = True
+        response.cache_control.no_cache = True
+        return response
+
+    def stats(self):
+        return dict(self.last_report or {}, running=self._thread is not None and self._thread.is_alive())
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="recommendation-ranker", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _curated_changed(self):
+        with self.app.app_context():
+            return get_data_version('recommendations') != self._version
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                if self._refreshed_at is None or time.monotonic() - self._refreshed_at >= self.interval:
+                    self.refresh(full=True)
+                elif self._curated_changed():
+                    self.refresh(full=False)
+            except Exception as e:
+                print(f"Recommendation ranking error: {e}")
+            self._stop.wait(self.check_interval)
+
+
+_ranker = None
+_ranker_pid = None
+_ranker_lock = threading.Lock()
+
+
+def get_recommendation_ranker():
+    """Get this process's ranker, created once per process.
+
+    Like the job worker it is never shared across a fork, so gunicorn
+    workers forked from a preloaded master rank in threads of their own.
+    """
+    global _ranker, _ranker_pid
+    if _ranker is None or _ranker_pid != os.getpid():
+        with _ranker_lock:
+            if _ranker is None or _ranker_pid != os.getpid():
+                _ranker = RecommendationRanker.from_config(current_app._get_current_object())
+                _ranker_pid = os.getpid()
+    return _ranker
@@ -1,10 +1,59 @@
+import csv
+import io
+import json
 from models.recommendation_model import (
     get_all_recommendations, 
     get_recommendation_by_id, 
     create_recommendation, 
-    delete_recommendation
+    create_recommendations,
+    delete_recommendation,
+    delete_recommendations,
+    set_recommendations_active
 )
-from utils.api_client import get_movie_details
+from utils.api_client import get_movie_details, get_movies_details
+from services.recommendation_feed import get_recommendation_feed
+from services.stats_service import StatsService
+from services.job_queue import PermanentJobError, register_job
+
+def _recommendation_row(movie_id, movie_data, description, category):
+    return (
+        movie_id,
+        movie_data.get('title', 'Unknown Title'),
+        description or movie_data.get('overview', ''),
+        f"https://image.tmdb.org/t/p/w500{movie_data.get('poster_path', '')}",
+        category
+    )
+
+def parse_bulk_items(text, default_category="Featured"):
+    """Movies to import from JSON or CSV text.
+
+    JSON: a list of ids or of {"movie_id", "category", "description"} objects,
+    or {"movie_ids": [...], "category": ...}. CSV: movie_id[,category[,description]]
+    per line, with an optional header row. Returns dicts with movie_id left
+    as given so bad ids can be reported per item.
+    """
+    text = text.strip()
+    if text.startswith(('[', '{')):
+        data = json.loads(text)
+        if isinstance(data, dict):
+            default_category = data.get('category') or default_category
+            data = data.get('items') or data.get('movie_ids') or []
+        rows = [item if isinstance(item, dict) else {'movie_id': item} for item in data]
+    else:
+        lines = list(csv.reader(io.StringIO(text)))
+        if lines and lines[0] and lines[0][0].strip().lower() == 'movie_id':
+            header = [name.strip().lower() for name in lines.pop(0)]
+        else:
+            header = ['movie_id', 'category', 'description']
+        rows = [dict(zip(header, (cell.strip() for cell in line))) for line in lines if line]
+    return [
+        {
+            'movie_id': row.get('movie_id'),
+            'category': row.get('category') or default_category,
+            'description': row.get('description') or None
+        }
+        for row in rows
+    ]
 
 class RecommendationService:
     @staticmethod
@@ -13,19 +62,19 @@ class RecommendationService:
             # Get movie details from TMDB
             movie_data = get_movie_details(movie_id)
             
-            if 'error' in movie_data:
+            if movie_data.get('status_code') == 404:
                 return None, "Movie not found in TMDB"
+            if 'error' in movie_data:
+                return None, f"TMDB error: {movie_data['error']}"
             
             # Create recommendation entry
             recommendation_id = create_recommendation(
-                movie_id=movie_id,
-                movie_title=movie_data.get('title', 'Unknown Title'),
-                description=description or movie_data.get('overview', ''),
-                image_url=f"https://image.tmdb.org/t/p/w500{movie_data.get('poster_path', '')}",
-                category=category
+                *_recommendation_row(movie_id, movie_data, description, category)
             )
             
             if recommendation_id:
+                get_recommendation_feed().invalidate()
+                StatsService.invalidate()
                 return recommendation_id, "Recommendation added successfully"
             else:
                 return None, "Movie already exists in recommendations"
@@ -45,6 +94,97 @@ class RecommendationService:
                 return False, "Recommendation not found"
             
             delete_recommendation(recommendation_id)
+            get_recommendation_feed().invalidate()
+            StatsService.invalidate()
             return True, "Recommendation deleted successfully"
         except Exception as e:
-            return False, f"Error deleting recommendation: {str(e)}"
\ No newline at end of file
+            return False, f"Error deleting recommendation: {str(e)}"
+    
+    @staticmethod
+    def add_bulk_recommendations(items):
+        """Import many movies: details fetched concurrently, rows written in one transaction.
+
+        Returns one result per item, in order, with status added, exists or error.
+        """
+        results = []
+        wanted = {}
+        for item in items:
+            result = {"movie_id": item.get('movie_id')}
+            results.append(result)
+            try:
+                movie_id = int(item.get('movie_id'))
+                if movie_id <= 0:
+                    raise ValueError
+            except (TypeError, ValueError):
+                result.update(status="error", error="Invalid movie ID")
+                continue
+            result["movie_id"] = movie_id
+            if movie_id in wanted:
+                result.update(status="error", error="Duplicate movie ID in request")
+                continue
+            wanted[movie_id] = item
+        
+        # Concurrent on the bulk pool (TMDB_BULK_CONCURRENCY), answered from cache where possible
+        details = get_movies_details(list(wanted), bulk=True) if wanted else {}
+        rows = []
+        for movie_id, item in wanted.items():
+            movie_data = details[movie_id]
+            if 'error' not in movie_data:
+                rows.append(_recommendation_row(movie_id, movie_data, item.get('description'), item.get('category')))
+        inserted = create_recommendations(rows) if rows else {}
+        
+        for result in results:
+            if "status" in result:
+                continue
+            movie_id = result["movie_id"]
+            if details[movie_id].get('status_code') == 404:
+                result.update(status="error", error="Movie not found in TMDB")
+            elif 'error' in details[movie_id]:
+                result.update(status="error", error=f"TMDB error: {details[movie_id]['error']}")
+            elif movie_id in inserted:
+                result.update(status="added", recommendation_id=inserted[movie_id])
+            else:
+                result.update(status="exists", error="Movie already exists in recommendations")
+        
+        if inserted:
+            get_recommendation_feed().invalidate()
+            StatsService.invalidate()
+        return results
+    
+    @staticmethod
+    def bulk_update(recommendation_ids, action):
+        """Delete, deactivate or activate many recommendations in one transaction"""
+        if action == "delete":
+            found = delete_recommendations(recommendation_ids)
+        else:
+            found = set_recommendations_active(recommendation_ids, action == "activate")
+        if found:
+            get_recommendation_feed().invalidate()
+            StatsService.invalidate()
+        return [
+            {"id": i, "status": "ok"} if i in found else {"id": i, "status": "error", "error": "Recommendation not found"}
+            for i in recommendation_ids
+        ]
+
+
+def _add_recommendation_job(payload):
+    recommendation_id, message = RecommendationService.add_movie_recommendation(
+        payload['movie_id'], payload.get('description'), payload.get('category', 'Featured')
+    )
+    if recommendation_id:
+        return {"recommendation_id": recommendation_id, "message": message}
+    if message in ("Movie already exists in recommendations", "Movie not found in TMDB"):
+        raise PermanentJobError(message)
+    # TMDB errors and timeouts are worth retrying
+    raise RuntimeError(message)
+
+def _add_bulk_job(payload):
+    results = RecommendationService.add_bulk_recommendations(payload['items'])
+    return {
+        "results": results,
+        "added": sum(1 for r in results if r["status"] == "added"),
+        "failed": sum(1 for r in results if r["status"] != "added")
+    }
+
+register_job("add_recommendation", _add_recommendation_job)
+register_job("add_recommendations_bulk", _add_bulk_job)
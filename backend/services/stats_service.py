@@ -0,0 +1,54 @@
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from flask import current_app
+from models.recommendation_model import get_recommendations_page
+from models.stats_model import get_counters, get_category_counts, get_signups_since
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+class StatsService:
+    @staticmethod
+    def get_dashboard_stats(days=30):
+        """Dashboard stats, reused for DASHBOARD_CACHE_TTL seconds"""
+        ttl = current_app.config.get('DASHBOARD_CACHE_TTL', 10)
+        cached = _cache.get(days)
+        if cached is not None and time.monotonic() - cached[0] < ttl:
+            return cached[1]
+        with _cache_lock:
+            cached = _cache.get(days)
+            if cached is not None and time.monotonic() - cached[0] < ttl:
+                return cached[1]
+            stats = StatsService.compute_dashboard_stats(days)
+            _cache[days] = (time.monotonic(), stats)
+            return stats
+
+    @staticmethod
+    def compute_dashboard_stats(days=30):
+        counters = get_counters()
+        return {
+            "stats": {
+                "users": counters.get('users', 0),
+                "recommendations": counters.get('recommendations', 0),
+                "active_recommendations": counters.get('active_recommendations', 0)
+            },
+            "recent_recommendations": get_recommendations_page(5)[:5],
+            "categories": get_category_counts(),
+            "signups_per_day": StatsService.signups_per_day(days)
+        }
+
+    @staticmethod
+    def signups_per_day(days=30):
+        """The last `days` days (UTC, matching CURRENT_TIMESTAMP) including days with no signups"""
+        today = datetime.now(timezone.utc).date()
+        first = today - timedelta(days=days - 1)
+        counts = get_signups_since(first.isoformat())
+        return [
+            {"day": day, "signups": counts.get(day, 0)}
+            for day in ((first + timedelta(days=offset)).isoformat() for offset in range(days))
+        ]
+
+    @staticmethod
+    def invalidate():
+        _cache.clear()
@@ -0,0 +1,51 @@
+import threading
+
+import pytest
+
+from utils.api_client import SingleFlight
+
+
+def test_single_flight_shares_one_call():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "value"
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do("k", slow)))
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(flight.do("k", slow))) for _ in range(5)]
+    for thread in followers:
+        thread.start()
+    release.set()
+    for thread in [leader] + followers:
+        thread.join(5)
+    assert len(calls) == 1
+    assert sorted(results) == [("value", False)] + [("value", True)] * 5
+
+
+def test_single_flight_shares_errors():
+    flight = SingleFlight()
+    with pytest.raises(ValueError):
+        flight.do("k", lambda: (_ for _ in ()).throw(ValueError("boom")))
+    assert flight.do("k", lambda: 1) == (1, False)
+
+
+def test_concurrent_misses_make_one_upstream_call(stub_tmdb, tmdb, monkeypatch):
+    stub_tmdb.options['latency_ms'] = 100
+    calls = []
+    get = tmdb._get
+    monkeypatch.setattr(tmdb, "_get", lambda *args: calls.append(args[0]) or get(*args))
+    threads = [threading.Thread(target=tmdb.get_movie_details, args=(4242,)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert calls == ["movie/4242"]
+    assert tmdb.cache.stats()["coalesced"] == 7
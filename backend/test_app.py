@@ -23,7 +23,7 @@ def test_app():
         print(f"✓ Registered {len(rules)} routes")
         
         # Check for key routes
-        key_routes = ['/trending', '/search', '/admin/login-page', '/api/movie/']
+        key_routes = ['/trending', '/search', '/admin/login-page', '/api/movie/', '/api/cache/stats', '/search/suggest']
         found_routes = 0
         for route in key_routes:
             if any(route in r for r in rules):
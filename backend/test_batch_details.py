@@ -0,0 +1,41 @@
+import pytest
+
+from app import app
+
+
+@pytest.mark.parametrize("ids", ["1,x", "1,,2.5", "-3", "0", "4294967296", "", ",,"])
+def test_malformed_ids_are_400(tmdb, ids):
+    response = app.test_client().get(f"/api/movies?ids={ids}")
+    assert response.status_code == 400
+    assert "error" in response.json
+
+
+def test_duplicate_ids_are_fetched_and_returned_once(stub_tmdb, tmdb, monkeypatch):
+    calls = []
+    get = tmdb._get
+    monkeypatch.setattr(tmdb, "_get", lambda *args: calls.append(args[0]) or get(*args))
+    response = app.test_client().get("/api/movies?ids=11,12,11, 12 ,13")
+    assert response.status_code == 200
+    assert [movie["id"] for movie in response.json["results"]] == [11, 12, 13]
+    assert response.json["count"] == 3
+    assert sorted(calls) == ["movie/11", "movie/12", "movie/13"]
+
+
+def test_at_most_50_ids(stub_tmdb, tmdb):
+    client = app.test_client()
+    ids = ",".join(str(i) for i in range(1, 52))
+    assert client.get(f"/api/movies?ids={ids}").status_code == 400
+    # The cap counts distinct ids
+    ids = ",".join(str(i) for i in list(range(1, 51)) + [1, 2])
+    response = client.get(f"/api/movies?ids={ids}&fields=id")
+    assert response.status_code == 200
+    assert response.json["count"] == 50
+
+
+def test_missing_movie_is_a_per_item_error(stub_tmdb, tmdb):
+    response = app.test_client().get("/api/movies?ids=21,999999,22")
+    assert response.status_code == 200
+    assert [movie["id"] for movie in response.json["results"]] == [21, 22]
+    [error] = response.json["errors"]
+    assert error["id"] == 999999
+    assert error["status_code"] == 404
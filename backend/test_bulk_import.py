@@ -0,0 +1,67 @@
+import pytest
+
+from models.recommendation_model import create_recommendation, get_all_recommendations
+from services.recommendation_service import RecommendationService, parse_bulk_items
+
+
+def test_parse_json_ids_and_objects():
+    assert parse_bulk_items('[1, "2"]') == [
+        {"movie_id": 1, "category": "Featured", "description": None},
+        {"movie_id": "2", "category": "Featured", "description": None},
+    ]
+    assert parse_bulk_items('[{"movie_id": 3, "category": "Drama", "description": "Great"}]', "Other") == [
+        {"movie_id": 3, "category": "Drama", "description": "Great"}
+    ]
+    assert parse_bulk_items('{"movie_ids": [4, 5], "category": "Comedy"}') == [
+        {"movie_id": 4, "category": "Comedy", "description": None},
+        {"movie_id": 5, "category": "Comedy", "description": None},
+    ]
+
+
+def test_parse_csv_with_and_without_header():
+    assert parse_bulk_items("6,Drama,Moving\n7\n\n8,,") == [
+        {"movie_id": "6", "category": "Drama", "description": "Moving"},
+        {"movie_id": "7", "category": "Featured", "description": None},
+        {"movie_id": "8", "category": "Featured", "description": None},
+    ]
+    assert parse_bulk_items("Movie_ID, description\n9, Slow burn", "Horror") == [
+        {"movie_id": "9", "category": "Horror", "description": "Slow burn"},
+    ]
+
+
+def test_parse_rejects_malformed_json():
+    with pytest.raises(ValueError):
+        parse_bulk_items("[1, 2")
+
+
+def test_bulk_results_per_item(app_db, stub_tmdb, tmdb):
+    with app_db.app_context():
+        create_recommendation(5, "Already here", "", "", "Drama")
+        items = parse_bulk_items('[1, 2, 3, 2, "x", -4, 5, 999999]', "Drama")
+        results = RecommendationService.add_bulk_recommendations(items)
+        by_status = [(r["movie_id"], r["status"], r.get("error")) for r in results]
+        assert by_status == [
+            (1, "added", None),
+            (2, "added", None),
+            (3, "added", None),
+            (2, "error", "Duplicate movie ID in request"),
+            ("x", "error", "Invalid movie ID"),
+            (-4, "error", "Invalid movie ID"),
+            (5, "exists", "Movie already exists in recommendations"),
+            (999999, "error", "Movie not found in TMDB"),
+        ]
+        stored = {r["movie_id"]: r for r in get_all_recommendations()}
+        assert {r["recommendation_id"] for r in results if r["status"] == "added"} == {
+            stored[i]["id"] for i in (1, 2, 3)
+        }
+        assert stored[1]["category"] == "Drama"
+        assert stored[5]["movie_title"] == "Already here"
+
+
+def test_bulk_upstream_errors_are_reported(app_db, stub_tmdb, tmdb):
+    stub_tmdb.options['error_rate'] = 1.0
+    with app_db.app_context():
+        results = RecommendationService.add_bulk_recommendations([{"movie_id": 31}])
+        assert results[0]["status"] == "error"
+        assert results[0]["error"].startswith("TMDB error:")
+        assert get_all_recommendations() == []
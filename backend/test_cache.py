@@ -0,0 +1,42 @@
+import sqlite3
+
+from utils.cache import SQLiteCache
+
+
+def count_rows(cache):
+    return cache._connection().execute('SELECT COUNT(*) FROM cache_entries').fetchone()[0]
+
+
+def test_entry_count_follows_inserts_updates_and_deletes(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "cache.db"), max_entries=100)
+    for i in range(10):
+        cache.set(f"k{i}", {"i": i}, 60)
+    cache.set("k0", {"i": "again"}, 60)
+    cache.delete("k1")
+    assert cache.stats()["entries"] == count_rows(cache) == 9
+    cache.clear()
+    assert cache.stats()["entries"] == 0
+
+
+def test_eviction_keeps_max_entries(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "cache.db"), max_entries=5)
+    for i in range(12):
+        cache.set(f"k{i}", i, 60)
+    assert cache.stats()["entries"] == count_rows(cache) == 5
+    assert cache.get("k11") == 11
+    assert cache.get("k0") is None
+
+
+def test_hits_do_not_write_within_touch_interval(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = SQLiteCache(path)
+    cache.set("key", "value", 60)
+    # Another process holding the write lock must not block reads
+    other = sqlite3.connect(path, isolation_level=None)
+    other.execute('BEGIN IMMEDIATE')
+    try:
+        cache._connection().execute('PRAGMA busy_timeout = 0')
+        for _ in range(5):
+            assert cache.get("key") == "value"
+    finally:
+        other.execute('ROLLBACK')
@@ -0,0 +1,42 @@
+import os
+import subprocess
+import sys
+
+from app import app
+from services import cache_warmer
+from services.cache_warmer import CacheWarmer, get_cache_warmer
+
+
+def test_import_starts_no_warmer_thread():
+    code = "import threading, app; print(sum(t.name == 'cache-warmer' for t in threading.enumerate()))"
+    env = dict(os.environ, CACHE_WARMER_ENABLED="1")
+    output = subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(__file__), env=env,
+                            capture_output=True, text=True, check=True).stdout
+    assert output.split()[-1] == "0"
+
+
+def test_warmer_is_created_once_per_process(monkeypatch):
+    monkeypatch.setattr(cache_warmer, "_warmer", None)
+    with app.app_context():
+        warmer = get_cache_warmer()
+        assert get_cache_warmer() is warmer
+        monkeypatch.setattr(cache_warmer, "_warmer_pid", os.getpid() + 1)
+        assert get_cache_warmer() is not warmer
+
+
+def test_first_request_starts_the_warmer(monkeypatch):
+    started = []
+    monkeypatch.setitem(app.config, 'CACHE_WARMER_ENABLED', True)
+    monkeypatch.setattr(CacheWarmer, "start", lambda self: started.append(self))
+    monkeypatch.setattr(cache_warmer, "_warmer", None)
+    app.test_client().get("/api/recommendations/ranking")
+    with app.app_context():
+        assert started == [get_cache_warmer()]
+
+
+def test_warm_refreshes_due_pages(tmdb):
+    warmer = CacheWarmer(app, pages=2, rate=1000)
+    report = warmer.warm()
+    assert (report["fetched"], report["failed"], report["skipped"]) == (2 * len(cache_warmer.FEEDS), 0, 0)
+    assert report["coverage"]["coverage"] == 1.0
+    assert warmer.warm()["skipped"] == 2 * len(cache_warmer.FEEDS)
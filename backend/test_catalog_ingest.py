@@ -0,0 +1,112 @@
+import datetime
+
+import pytest
+
+from services.catalog_ingest import CatalogIngest
+from stub_tmdb import changes_page
+from utils.api_client import FEEDS, TMDBClient
+from utils.cache import MemoryCache
+from utils.catalog import Catalog
+
+MAX_MOVIE_ID = 2000
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    return Catalog(str(tmp_path / "catalog.db"))
+
+
+@pytest.fixture
+def client(stub_tmdb, client_config):
+    stub_tmdb.options['max_movie_id'] = MAX_MOVIE_ID
+    return TMDBClient(dict(client_config, TMDB_RATE_LIMIT=1000, TMDB_RATE_BURST=1000), cache=MemoryCache())
+
+
+def ingest(client, catalog, **kwargs):
+    return CatalogIngest(client, catalog, log=lambda message: None, **kwargs)
+
+
+def is_details(endpoint):
+    return endpoint.split("/")[-1].isdigit()
+
+
+def test_interrupted_run_resumes_from_the_pending_queue(client, catalog, monkeypatch):
+    fetch = client.fetch
+    details = []
+
+    def crashing(endpoint, params=None):
+        if is_details(endpoint):
+            if len(details) == 4:
+                raise KeyboardInterrupt
+            details.append(endpoint)
+        return fetch(endpoint, params)
+
+    monkeypatch.setattr(client, "fetch", crashing)
+    with pytest.raises(KeyboardInterrupt):
+        ingest(client, catalog, pages=1, concurrency=1, batch_size=2).run(extra_ids=[10, 20, 30])
+    stored = catalog.movie_ids()
+    left = catalog.pending_count()
+    # The two batches written before the crash are checked off
+    assert len(stored) == 4 and left > 0
+    assert catalog.get_state('last_ingest') is None
+
+    requests = []
+    monkeypatch.setattr(client, "fetch", lambda endpoint, params=None: requests.append(endpoint) or fetch(endpoint, params))
+    report = ingest(client, catalog, pages=1).run()
+    # Feeds are not listed again and only the remaining movies are fetched
+    assert (report["pages"], report["queued"]) == (0, 0)
+    assert report["fetched"] + report["missing"] == len(requests) == left
+    assert all(is_details(endpoint) for endpoint in requests)
+    assert not {int(endpoint.split("/")[1]) for endpoint in requests} & stored
+    assert {10, 20, 30} <= catalog.movie_ids()
+    assert catalog.pending_count() == 0
+    assert catalog.get_state('last_ingest') is not None
+
+
+def test_failed_details_stay_queued(stub_tmdb, client, catalog):
+    report = ingest(client, catalog, pages=1).run()
+    assert report["pages"] == len(FEEDS)
+    assert report["fetched"] == report["queued"] > 0
+
+    catalog.add_pending([40, 50])
+    stub_tmdb.options['error_rate'] = 1.0
+    assert ingest(client, catalog).run()["failed"] == 2
+    assert catalog.pending_count() == 2
+    stub_tmdb.options['error_rate'] = 0.0
+    assert ingest(client, catalog).run()["fetched"] == 2
+
+
+def test_refresh_queues_movies_from_the_change_feed(client, catalog, monkeypatch):
+    known = set(range(1, 401))
+    catalog.store_movies([(i, {"id": i}) for i in known], [], 0)
+    since = (datetime.date.today() - datetime.timedelta(days=3)).isoformat()
+    catalog.set_state('changes_synced_to', since)
+
+    fetch = client.fetch
+    requests = []
+    monkeypatch.setattr(client, "fetch", lambda endpoint, params=None: requests.append((endpoint, params)) or fetch(endpoint, params))
+    report = ingest(client, catalog, pages=1).run(refresh=True)
+
+    changes = [params for endpoint, params in requests if endpoint == "movie/changes"]
+    assert [p['page'] for p in changes] == [1, 2, 3]
+    assert all(p['start_date'] == since for p in changes)
+    expected = {item['id'] for page in (1, 2, 3) for item in changes_page(since, page, MAX_MOVIE_ID)['results']}
+    assert report["changed"] == len(expected & known) > 0
+    refetched = {int(endpoint.split("/")[1]) for endpoint, _ in requests if is_details(endpoint)}
+    assert expected & known <= refetched
+    assert catalog.get_state('changes_synced_to') == datetime.date.today().isoformat()
+
+
+def test_refresh_requeues_everything_when_the_change_feed_is_too_old(client, catalog, monkeypatch):
+    catalog.store_movies([(i, {"id": i}) for i in (1, 2, 3)], [], 0)
+    catalog.set_state('changes_synced_to', (datetime.date.today() - datetime.timedelta(days=30)).isoformat())
+    report = ingest(client, catalog, pages=1).run(refresh=True)
+    assert report["changed"] == 3
+
+
+def test_change_feed_error_keeps_the_sync_date(stub_tmdb, client, catalog):
+    since = (datetime.date.today() - datetime.timedelta(days=3)).isoformat()
+    catalog.set_state('changes_synced_to', since)
+    stub_tmdb.options['error_rate'] = 1.0
+    ingest(client, catalog, pages=1).changed_ids({1, 2})
+    assert catalog.get_state('changes_synced_to') == since
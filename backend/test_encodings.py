@@ -0,0 +1,18 @@
+from app import app
+
+
+def test_feed_etag_and_encodings(stub_tmdb, tmdb):
+    client = app.test_client()
+    plain = client.get("/popular?page=3")
+    assert plain.status_code == 200
+    assert "Accept-Encoding" in plain.headers["Vary"]
+    assert plain.headers.get("Content-Encoding") is None
+
+    gzipped = client.get("/popular?page=3", headers={"Accept-Encoding": "gzip"})
+    assert gzipped.headers["Content-Encoding"] == "gzip"
+    assert gzipped.headers["ETag"] != plain.headers["ETag"]
+    assert gzipped.get_data() != plain.get_data()
+
+    cached = client.get("/popular?page=3", headers={"If-None-Match": plain.headers["ETag"]})
+    assert cached.status_code == 304
+    assert cached.get_data() == b""
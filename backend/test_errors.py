@@ -0,0 +1,48 @@
+from app import app
+
+
+def test_upstream_failure_is_502_and_not_stored(stub_tmdb, tmdb):
+    stub_tmdb.options['error_rate'] = 1.0
+    response = app.test_client().get("/api/movie/7001")
+    assert response.status_code == 502
+    assert response.cache_control.no_store
+    assert "500 Error from TMDB" in response.json["error"]
+
+    stub_tmdb.options['error_rate'] = 0.0
+    response = app.test_client().get("/api/movie/7001")
+    assert response.status_code == 200
+    assert response.json["id"] == 7001
+
+
+def test_open_circuit_is_503_with_retry_after(stub_tmdb, tmdb):
+    tmdb.breaker.cooldown = 30
+    stub_tmdb.options['error_rate'] = 1.0
+    client = app.test_client()
+    client.get("/api/movie/7002")
+    client.get("/api/movie/7003")
+    response = client.get("/api/movie/7004")
+    assert response.status_code == 503
+    assert 1 <= int(response.headers["Retry-After"]) <= 30
+    assert "circuit open" in response.json["error"]
+
+
+def test_rate_limited_is_503_with_retry_after(stub_tmdb, tmdb):
+    stub_tmdb.options['rate_limit_rate'] = 1.0
+    response = app.test_client().get("/search?query=zzz-rate-limited")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+
+def test_feed_error_is_not_cached_as_success(stub_tmdb, tmdb):
+    stub_tmdb.options['error_rate'] = 1.0
+    client = app.test_client()
+    assert client.get("/trending?page=417").status_code == 502
+    stub_tmdb.options['error_rate'] = 0.0
+    response = client.get("/trending?page=417")
+    assert response.status_code == 200
+    assert len(response.json["results"]) == 20
+
+
+def test_missing_movie_is_404(stub_tmdb, tmdb):
+    response = app.test_client().get("/api/movie/999999")
+    assert response.status_code == 404
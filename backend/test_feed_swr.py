@@ -0,0 +1,45 @@
+import threading
+import time
+
+from app import app
+from utils.cache import make_cache_key
+
+
+def test_soft_expired_feed_is_served_stale_while_one_refresh_runs(stub_tmdb, tmdb, monkeypatch):
+    key = make_cache_key("movie/popular", {'page': 7})
+    stale = {"page": 7, "results": [{"id": 1, "title": "Stale"}], "total_pages": 500, "total_results": 10000}
+    tmdb.cache.set(key, stale, 1, 60)
+    time.sleep(1.05)
+
+    calls = []
+    get = tmdb._get
+    monkeypatch.setattr(tmdb, "_get", lambda *args: calls.append(args[2]) or get(*args))
+    stub_tmdb.options['latency_ms'] = 300
+
+    responses = []
+
+    def fetch():
+        start = time.monotonic()
+        response = app.test_client().get("/popular?page=7")
+        responses.append((response, time.monotonic() - start))
+
+    threads = [threading.Thread(target=fetch) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    for response, elapsed in responses:
+        assert response.status_code == 200
+        assert [m["title"] for m in response.json["results"]] == ["Stale"]
+        assert int(response.headers["Age"]) >= 1
+        # Answered from cache, not after the 300ms upstream call
+        assert elapsed < 0.25
+
+    deadline = time.monotonic() + 5
+    while tmdb.cache.freshness(key) <= 0 and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert [params.get('page') for params in calls].count(7) == 1
+    fresh = app.test_client().get("/popular?page=7")
+    assert fresh.json["results"][0]["title"] != "Stale"
+    assert fresh.headers.get("Age") in (None, "0")
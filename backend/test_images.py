@@ -0,0 +1,88 @@
+import pytest
+
+from app import app
+from utils import image_cache
+from utils.image_cache import ImageCache
+
+
+@pytest.fixture
+def images(stub_tmdb, tmp_path, monkeypatch):
+    cache = ImageCache(str(tmp_path / "images"), max_bytes=4000,
+                       base_url=stub_tmdb.base_url.replace("/3", "/t/p"), thumbnail_widths=(120, 320))
+    monkeypatch.setattr(image_cache, "_image_cache", cache)
+    return cache
+
+
+def test_image_is_fetched_once_and_served_immutable(images):
+    client = app.test_client()
+    first = client.get("/img/w342/poster.jpg")
+    assert first.status_code == 200
+    assert first.mimetype == "image/jpeg"
+    assert first.cache_control.public and first.cache_control.immutable
+    assert first.cache_control.max_age == app.config['IMAGE_MAX_AGE']
+    assert first.headers["X-Content-Type-Options"] == "nosniff"
+    second = client.get("/img/w342/poster.jpg")
+    assert second.data == first.data
+    assert client.get("/img/w342/poster.jpg", headers={"If-None-Match": first.headers["ETag"]}).status_code == 304
+    stats = images.stats()
+    assert (stats["misses"], stats["hits"]) == (1, 2)
+
+
+def test_thumbnail_without_pillow_serves_next_size_up(images, monkeypatch):
+    monkeypatch.setattr(image_cache, "Image", None)
+    response = app.test_client().get("/img/w320/poster.jpg")
+    assert response.status_code == 200
+    assert b"w342/poster" in response.data
+
+
+@pytest.mark.parametrize("path, status", [
+    ("/img/w9999/poster.jpg", 400),
+    ("/img/w342/poster.exe", 400),
+    ("/img/w342/logo.svg", 400),
+    ("/img/w342/..%2Fsecret.jpg", 404),
+])
+def test_bad_paths_rejected(images, path, status):
+    assert app.test_client().get(path).status_code == status
+
+
+def test_upstream_404_is_remembered(images):
+    client = app.test_client()
+    assert client.get("/img/w342/missing1.jpg").status_code == 404
+    assert client.get("/img/w342/missing1.jpg").status_code == 404
+    assert client.get("/img/w120/missing1.jpg").status_code == 404
+    stats = images.stats()
+    assert stats["not_found_hits"] == 1
+    assert stats["images"] == 0
+
+
+def test_upstream_error_is_502(stub_tmdb, images):
+    stub_tmdb.options['error_rate'] = 1.0
+    response = app.test_client().get("/img/w342/poster.jpg")
+    assert response.status_code == 502
+
+
+def test_undecodable_image_is_502_not_500(images, monkeypatch):
+    class BrokenPillow:
+        LANCZOS = 1
+
+        class DecompressionBombError(Exception):
+            pass
+
+        @staticmethod
+        def open(path):
+            raise OSError("cannot identify image file")
+
+    monkeypatch.setattr(image_cache, "Image", BrokenPillow)
+    response = app.test_client().get("/img/w120/poster.jpg")
+    assert response.status_code == 502
+    assert "could not be resized" in response.json["error"]
+
+
+def test_disk_usage_stays_within_budget(images):
+    client = app.test_client()
+    for i in range(20):
+        assert client.get(f"/img/w342/poster{i}.jpg").status_code == 200
+    stats = images.stats()
+    assert stats["bytes"] <= images.max_bytes
+    assert stats["evicted"] > 0
+    assert client.get("/img/w342/poster19.jpg").status_code == 200
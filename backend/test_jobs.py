@@ -0,0 +1,80 @@
+import os
+import subprocess
+import sys
+import time
+
+from services import job_queue
+from services.job_queue import (
+    JobWorker, enqueue, get_job, get_job_worker, has_due_job, register_job
+)
+
+
+def test_import_starts_no_job_threads():
+    # Checked in a fresh interpreter: requests made by other tests start them here
+    code = "import threading, app; print(sum(t.name == 'job-worker' for t in threading.enumerate()))"
+    env = dict(os.environ, JOB_WORKERS_ENABLED="1")
+    output = subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(__file__), env=env,
+                            capture_output=True, text=True, check=True).stdout
+    assert output.split()[-1] == "0"
+
+
+def test_job_runs_and_records_result(app_db):
+    register_job("test_double", lambda payload: payload["n"] * 2)
+    worker = JobWorker(app_db)
+    with app_db.app_context():
+        assert not has_due_job()
+        job_id = enqueue("test_double", {"n": 21})
+        assert has_due_job()
+    assert worker.run_once()
+    assert not worker.run_once()
+    with app_db.app_context():
+        job = get_job(job_id)
+        assert (job["status"], job["result"], job["attempts"]) == ("done", 42, 1)
+        assert not has_due_job()
+
+
+def test_unknown_kind_fails_permanently(app_db):
+    worker = JobWorker(app_db)
+    with app_db.app_context():
+        job_id = enqueue("no_such_kind", {})
+    assert worker.run_once()
+    with app_db.app_context():
+        assert get_job(job_id)["status"] == "failed"
+
+
+def test_first_purge_runs_immediately(app_db, monkeypatch):
+    purged = []
+    monkeypatch.setattr(job_queue, "purge_jobs", purged.append)
+    worker = JobWorker(app_db, retention=10)
+    with app_db.app_context():
+        worker._purge()
+        worker._purge()
+    assert purged == [10]
+
+
+def test_worker_is_created_once_per_process(app_db, monkeypatch):
+    monkeypatch.setattr(job_queue, "_worker", None)
+    with app_db.app_context():
+        worker = get_job_worker()
+        assert get_job_worker() is worker
+        monkeypatch.setattr(job_queue, "_worker_pid", os.getpid() + 1)
+        assert get_job_worker() is not worker
+
+
+def test_started_worker_picks_up_queued_job(app_db):
+    register_job("test_echo", lambda payload: payload)
+    worker = JobWorker(app_db, threads=1, poll_interval=0.05)
+    worker.start()
+    try:
+        with app_db.app_context():
+            job_id = enqueue("test_echo", {"ok": True})
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            with app_db.app_context():
+                if get_job(job_id)["status"] == "done":
+                    break
+            time.sleep(0.02)
+        with app_db.app_context():
+            assert get_job(job_id)["result"] == {"ok": True}
+    finally:
+        worker.stop()
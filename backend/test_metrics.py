@@ -0,0 +1,38 @@
+import threading
+
+from utils.metrics import Metrics
+
+
+def record_in_threads(registry, count):
+    for _ in range(count):
+        thread = threading.Thread(target=lambda: (
+            registry.inc('http_requests_in_flight', amount=2),
+            registry.observe('http_request_duration_seconds', ('GET', '/x', '200'), 0.01)
+        ))
+        thread.start()
+        thread.join()
+
+
+def test_exited_threads_are_folded_into_totals():
+    registry = Metrics()
+    record_in_threads(registry, 200)
+    registry.inc('http_requests_in_flight')
+
+    totals = registry.snapshot()
+    assert totals[('http_requests_in_flight', ())] == [401]
+    histogram = totals[('http_request_duration_seconds', ('GET', '/x', '200'))]
+    assert sum(histogram[:-1]) == 200
+    # Only the still-running main thread keeps its own series
+    assert len(registry._threads) == 1
+
+    record_in_threads(registry, 10)
+    assert registry.snapshot()[('http_requests_in_flight', ())] == [421]
+
+
+def test_endpoint_answers_allowed_addresses_only(monkeypatch):
+    from app import app
+    client = app.test_client()
+    assert client.get("/metrics").status_code == 200
+    assert client.get("/metrics", environ_base={"REMOTE_ADDR": "203.0.113.9"}).status_code == 404
+    monkeypatch.setitem(app.config, 'METRICS_ALLOWED_IPS', ("*",))
+    assert client.get("/metrics", environ_base={"REMOTE_ADDR": "203.0.113.9"}).status_code == 200
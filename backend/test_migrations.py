@@ -0,0 +1,115 @@
+import sqlite3
+
+import pytest
+
+from migrations import MIGRATIONS, current_version, migrate
+
+LATEST = MIGRATIONS[-1][0]
+
+# The schema init_db() created before versioned migrations existed
+BASELINE_SCHEMA = '''
+    CREATE TABLE admin(
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT NOT NULL UNIQUE,
+        password_hash TEXT NOT NULL
+    );
+    CREATE TABLE recommendations(
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        movie_id INTEGER NOT NULL UNIQUE,
+        movie_title TEXT NOT NULL,
+        description TEXT,
+        image_url TEXT,
+        category TEXT,
+        is_active BOOLEAN DEFAULT 1,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE users(
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        email TEXT UNIQUE NOT NULL,
+        created TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+'''
+
+
+def schema(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute('SELECT type, name, sql FROM sqlite_master ORDER BY type, name').fetchall()
+    finally:
+        conn.close()
+
+
+def test_fresh_database_reaches_latest_version(tmp_path):
+    path = str(tmp_path / "fresh.db")
+    assert migrate(path) == [number for number, _, _ in MIGRATIONS]
+    conn = sqlite3.connect(path)
+    assert current_version(conn) == LATEST
+    tables = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert {'admin', 'recommendations', 'users', 'data_versions', 'stats_counters',
+            'category_counts', 'daily_signups', 'jobs'} <= tables
+    conn.close()
+
+
+def test_baseline_database_upgrades_without_data_loss(tmp_path):
+    path = str(tmp_path / "baseline.db")
+    conn = sqlite3.connect(path)
+    conn.executescript(BASELINE_SCHEMA)
+    conn.execute("INSERT INTO admin (username, password_hash) VALUES ('admin', 'hash')")
+    conn.executemany(
+        'INSERT INTO recommendations (movie_id, movie_title, category, is_active) VALUES (?, ?, ?, ?)',
+        [(1, "One", "Drama", 1), (2, "Two", "Drama", 0), (3, "Three", None, 1)]
+    )
+    conn.executemany('INSERT INTO users (name, email) VALUES (?, ?)',
+                     [("Ann", "ann@example.com"), ("Bob", "bob@example.com")])
+    conn.commit()
+    before = {table: conn.execute(f'SELECT * FROM {table} ORDER BY id').fetchall()
+              for table in ('admin', 'recommendations', 'users')}
+    conn.close()
+
+    assert migrate(path) == [number for number, _, _ in MIGRATIONS]
+    conn = sqlite3.connect(path)
+    for table, rows in before.items():
+        assert conn.execute(f'SELECT * FROM {table} ORDER BY id').fetchall() == rows
+    # Counters are backfilled from the rows that were already there
+    assert dict(conn.execute('SELECT name, value FROM stats_counters')) == {
+        'users': 2, 'recommendations': 3, 'active_recommendations': 2
+    }
+    assert sorted(conn.execute('SELECT category, total, active FROM category_counts')) == [
+        ('', 1, 1), ('Drama', 2, 1)
+    ]
+    assert current_version(conn) == LATEST
+    conn.close()
+
+
+def test_second_migrate_is_a_no_op(tmp_path):
+    path = str(tmp_path / "twice.db")
+    migrate(path)
+    conn = sqlite3.connect(path)
+    conn.execute("INSERT INTO users (name, email) VALUES ('Ann', 'ann@example.com')")
+    conn.commit()
+    conn.close()
+    before = schema(path)
+
+    assert migrate(path) == []
+    assert schema(path) == before
+    conn = sqlite3.connect(path)
+    assert conn.execute('SELECT COUNT(*) FROM schema_version').fetchone()[0] == len(MIGRATIONS)
+    assert conn.execute("SELECT value FROM stats_counters WHERE name = 'users'").fetchone()[0] == 1
+    conn.close()
+
+
+def test_failed_migration_rolls_back(tmp_path, monkeypatch):
+    path = str(tmp_path / "broken.db")
+
+    def broken(conn):
+        conn.execute('CREATE TABLE half_done(id INTEGER)')
+        raise sqlite3.OperationalError("boom")
+
+    monkeypatch.setattr("migrations.MIGRATIONS", MIGRATIONS + [(LATEST + 1, "broken", broken)])
+    with pytest.raises(sqlite3.OperationalError):
+        migrate(path)
+    conn = sqlite3.connect(path)
+    assert conn.execute("SELECT name FROM sqlite_master WHERE name = 'half_done'").fetchone() is None
+    assert conn.execute("SELECT name FROM sqlite_master WHERE name = 'users'").fetchone() is None
+    conn.close()
@@ -0,0 +1,86 @@
+import pytest
+from werkzeug.datastructures import MultiDict
+
+from utils.pagination import MAX_PAGE_SIZE, decode_cursor, encode_cursor, page_args
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor(["2024-01-02 03:04:05", 17])
+    assert decode_cursor(cursor, 2) == ("2024-01-02 03:04:05", 17)
+
+
+@pytest.mark.parametrize("values", [[[1], [2]], [{"a": 1}, 2], [True, 1], [None, 1], [1]])
+def test_malformed_cursor_values_rejected(values):
+    with pytest.raises(ValueError):
+        decode_cursor(encode_cursor(values), 2)
+
+
+@pytest.mark.parametrize("cursor", ["!!!", "bm90IGpzb24", encode_cursor([1, 2, 3])])
+def test_undecodable_cursor_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, 2)
+
+
+@pytest.mark.parametrize("limit, expected", [(None, 50), ("10", 10), ("-5", 1), ("100000", MAX_PAGE_SIZE)])
+def test_limit_is_clamped(limit, expected):
+    args = MultiDict({} if limit is None else {"limit": limit})
+    assert page_args(args) == (expected, None)
+
+
+@pytest.mark.parametrize("limit", ["abc", "1.5"])
+def test_non_integer_limit_rejected(limit):
+    with pytest.raises(ValueError):
+        page_args(MultiDict({"limit": limit}))
+
+
+@pytest.mark.parametrize("query", [
+    "limit=abc",
+    "cursor=!!!",
+    "cursor=" + encode_cursor([[1], [2]]),
+    "category=Drama&cursor=" + encode_cursor([{"x": 1}, 2]),
+    "sort=ranked&limit=abc",
+])
+def test_recommendations_bad_paging_is_400(app_db, query):
+    response = app_db.test_client().get(f"/recommendations?{query}")
+    assert response.status_code == 400
+    assert "error" in response.json
+
+
+def test_recommendations_cursor_paging(app_db):
+    with app_db.app_context():
+        from database import get_db_connection
+        conn = get_db_connection()
+        for i in range(5):
+            conn.execute(
+                "INSERT INTO recommendations (movie_id, movie_title, category, created_at) VALUES (?, ?, ?, ?)",
+                (i + 1, f"Movie {i + 1}", "Drama", f"2024-01-0{i + 1} 00:00:00")
+            )
+        conn.commit()
+    client = app_db.test_client()
+    seen = []
+    query = "/recommendations?category=Drama&limit=2"
+    while query:
+        page = client.get(query).json
+        seen += [r["movie_id"] for r in page["results"]]
+        query = page["next_cursor"] and f"/recommendations?category=Drama&limit=2&cursor={page['next_cursor']}"
+    assert seen == [5, 4, 3, 2, 1]
+
+
+@pytest.mark.parametrize("category", [None, "Drama"])
+@pytest.mark.parametrize("is_active", [True, False, None])
+@pytest.mark.parametrize("after", [None, ("2024-01-01 00:00:00", 5)])
+def test_listing_pages_are_read_in_index_order(app_db, category, is_active, after):
+    from database import get_db_connection
+    from models.recommendation_model import get_recommendations_page
+    with app_db.app_context():
+        conn = get_db_connection()
+        statements = []
+        conn.set_trace_callback(statements.append)
+        try:
+            get_recommendations_page(10, after, category, is_active)
+        finally:
+            conn.set_trace_callback(None)
+        [query] = [s for s in statements if s.lstrip().startswith("SELECT")]
+        plan = " ".join(row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {query}"))
+    assert "USING INDEX" in plan or "USING COVERING INDEX" in plan
+    assert "TEMP B-TREE" not in plan
@@ -0,0 +1,38 @@
+import pytest
+
+from app import app
+from utils.resilience import CircuitBreaker
+
+
+def test_feed_projection(stub_tmdb, tmdb):
+    client = app.test_client()
+    cards = client.get("/popular?page=4").json["results"]
+    assert set(cards[0]) <= {'id', 'title', 'overview', 'poster_path', 'backdrop_path',
+                             'release_date', 'vote_average', 'genre_ids'}
+    slim = client.get("/popular?page=4&fields=id,title").json
+    assert all(set(item) == {"id", "title"} for item in slim["results"])
+    assert slim["total_pages"] == 500
+    assert client.get("/popular?page=4&fields=Bad-Name").status_code == 400
+
+
+def test_details_projection(stub_tmdb, tmdb):
+    client = app.test_client()
+    details = client.get("/api/movie/77").json
+    assert len(details["cast"]) <= 10
+    assert client.get("/api/movie/77?fields=id,runtime").json == {"id": 77, "runtime": details["runtime"]}
+
+
+@pytest.mark.parametrize("page", ["0", "-1", "501", "99999", "abc"])
+def test_feed_page_outside_tmdb_range_is_400(stub_tmdb, tmdb, monkeypatch, page):
+    calls = []
+    monkeypatch.setattr(tmdb, "_get", lambda *args: calls.append(args))
+    for route in ("/popular", "/trending", "/top-rated", "/upcoming", "/now-playing"):
+        assert app.test_client().get(f"{route}?page={page}").status_code == 400
+    assert calls == []
+    assert tmdb.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_feed_page_bounds_are_served(stub_tmdb, tmdb):
+    client = app.test_client()
+    assert client.get("/popular").json["page"] == 1
+    assert client.get("/popular?page=500").json["page"] == 500
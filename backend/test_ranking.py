@@ -0,0 +1,73 @@
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from app import app
+from services import recommendation_ranking
+from services.recommendation_ranking import RecommendationRanker, get_recommendation_ranker
+
+
+def item(movie_id, category):
+    return {"movie_id": movie_id, "movie_title": f"Movie {movie_id}", "category": category}
+
+
+@pytest.fixture
+def ranker(monkeypatch):
+    ranker = RecommendationRanker(app, size=5)
+    ranker._lists = {None: [item(i, "Drama") for i in range(5)], "Drama": [item(i, "Drama") for i in range(5)]}
+    ranker._ranked_at = time.time()
+    monkeypatch.setattr("routes.public_routes.get_recommendation_ranker", lambda: ranker)
+    return ranker
+
+
+def test_unknown_category_is_empty_and_not_cached(ranker):
+    client = app.test_client()
+    for name in ("nope", "other", "nope"):
+        response = client.get(f"/recommendations?sort=ranked&category={name}")
+        assert response.status_code == 200
+        assert response.json["results"] == []
+    assert ranker._bodies == {}
+
+    assert client.get("/recommendations?sort=ranked&category=Drama").json["count"] == 5
+    assert list(ranker._bodies) == [("Drama", 5)]
+
+
+@pytest.mark.parametrize("limit, count", [(-3, 1), (0, 1), (2, 2), (500, 5)])
+def test_ranked_limit_is_clamped(ranker, limit, count):
+    response = app.test_client().get(f"/recommendations?sort=ranked&category=Drama&limit={limit}")
+    assert response.json["count"] == count
+    assert [r["movie_id"] for r in response.json["results"]] == list(range(count))
+
+
+def test_not_ranked_yet_returns_none():
+    assert RecommendationRanker(app).get("Drama") is None
+
+
+def test_import_starts_no_ranker_thread():
+    code = "import threading, app; print(sum(t.name == 'recommendation-ranker' for t in threading.enumerate()))"
+    env = dict(os.environ, RECOMMENDATIONS_RANKING_ENABLED="1")
+    output = subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(__file__), env=env,
+                            capture_output=True, text=True, check=True).stdout
+    assert output.split()[-1] == "0"
+
+
+def test_ranker_is_created_once_per_process(monkeypatch):
+    monkeypatch.setattr(recommendation_ranking, "_ranker", None)
+    with app.app_context():
+        ranker = get_recommendation_ranker()
+        assert get_recommendation_ranker() is ranker
+        monkeypatch.setattr(recommendation_ranking, "_ranker_pid", os.getpid() + 1)
+        assert get_recommendation_ranker() is not ranker
+
+
+def test_first_request_starts_the_ranker(monkeypatch):
+    started = []
+    monkeypatch.setitem(app.config, 'RECOMMENDATIONS_RANKING_ENABLED', True)
+    monkeypatch.setattr(RecommendationRanker, "start", lambda self: started.append(self))
+    monkeypatch.setattr(recommendation_ranking, "_ranker", None)
+    app.test_client().get("/api/recommendations/ranking")
+    with app.app_context():
+        assert started == [get_recommendation_ranker()]
@@ -0,0 +1,72 @@
+import sqlite3
+import time
+
+import pytest
+
+from models.recommendation_model import create_recommendations
+from services import recommendation_feed
+from services.recommendation_feed import RecommendationFeed
+
+
+@pytest.fixture
+def client(app_db, monkeypatch):
+    monkeypatch.setattr(recommendation_feed, "_feed", RecommendationFeed(check_interval=0.05))
+    with app_db.app_context():
+        inserted = create_recommendations([
+            (i, f"Movie {i}", "", "", "Drama") for i in range(1, 6)
+        ])
+    client = app_db.test_client()
+    client.inserted = inserted
+    with client.session_transaction() as session:
+        session['admin_logged_in'] = True
+    return client
+
+
+def test_unchanged_feed_answers_304(client):
+    first = client.get("/recommendations")
+    assert first.status_code == 200
+    assert first.json["count"] == 5
+    etag = first.headers["ETag"]
+
+    cached = client.get("/recommendations", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.get_data() == b""
+    assert cached.headers["ETag"] == etag
+
+    page = client.get("/recommendations?limit=2")
+    assert page.headers["ETag"] != etag
+    assert client.get("/recommendations?limit=2", headers={"If-None-Match": page.headers["ETag"]}).status_code == 304
+
+
+def test_admin_write_invalidates_cached_pages(client):
+    etag = client.get("/recommendations").headers["ETag"]
+    page_etag = client.get("/recommendations?category=Drama&limit=10").headers["ETag"]
+
+    assert client.delete(f"/admin/delete/{client.inserted[1]}").status_code == 200
+
+    # Seen straight away in the process that made the write
+    response = client.get("/recommendations", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json["count"] == 4
+    assert response.headers["ETag"] != etag
+    page = client.get("/recommendations?category=Drama&limit=10", headers={"If-None-Match": page_etag})
+    assert page.status_code == 200
+    assert 1 not in [r["movie_id"] for r in page.json["results"]]
+
+    response = client.post("/admin/deactivate-bulk", json={"ids": [client.inserted[2]]})
+    assert response.json["updated"] == 1
+    assert client.get("/recommendations").json["count"] == 3
+
+
+def test_write_by_another_worker_is_seen_after_check_interval(client, app_db):
+    etag = client.get("/recommendations").headers["ETag"]
+    other = sqlite3.connect(app_db.config['DATABASE'])
+    other.execute("UPDATE recommendations SET is_active = 0 WHERE movie_id = 3")
+    other.commit()
+    other.close()
+
+    assert client.get("/recommendations", headers={"If-None-Match": etag}).status_code == 304
+    time.sleep(0.06)
+    response = client.get("/recommendations", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json["count"] == 4
@@ -0,0 +1,124 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from utils.api_client import TMDBClient
+from utils.cache import MemoryCache, SQLiteCache, make_cache_key
+from utils.resilience import CircuitBreaker
+
+
+def open_breaker(breaker):
+    for _ in range(breaker.min_calls):
+        assert breaker.allow()
+        breaker.record_failure()
+
+
+def test_breaker_opens_on_failure_ratio():
+    breaker = CircuitBreaker(failure_ratio=0.5, min_calls=4, cooldown=60)
+    breaker.record_success()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+
+def test_breaker_half_open_lets_one_probe_through():
+    breaker = CircuitBreaker(min_calls=2, cooldown=0.01)
+    open_breaker(breaker)
+    time.sleep(0.02)
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
+
+
+def test_breaker_failed_probe_reopens():
+    breaker = CircuitBreaker(min_calls=2, cooldown=0.01)
+    open_breaker(breaker)
+    time.sleep(0.02)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.times_opened == 2
+    time.sleep(0.02)
+    assert breaker.allow()
+
+
+def test_client_recovers_after_upstream_errors(stub_tmdb, client_config):
+    client = TMDBClient(client_config, cache=MemoryCache())
+    stub_tmdb.options['error_rate'] = 1.0
+    for movie_id in (1, 2):
+        assert 'error' in client.get_movie_details(movie_id)
+    assert client.breaker.state == CircuitBreaker.OPEN
+    assert 'circuit open' in client.get_movie_details(3)['error']
+
+    stub_tmdb.options['error_rate'] = 0.0
+    time.sleep(0.06)
+    assert client.get_movie_details(3)['id'] == 3
+    assert client.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_unexpected_error_in_probe_does_not_wedge_breaker(stub_tmdb, client_config, monkeypatch):
+    client = TMDBClient(client_config, cache=MemoryCache())
+    open_breaker(client.breaker)
+    time.sleep(0.06)
+
+    def broken_get(endpoint, url, params):
+        raise RuntimeError("boom")
+
+    with monkeypatch.context() as m:
+        m.setattr(client, '_get', broken_get)
+        with pytest.raises(RuntimeError):
+            client.get_movie_details(4)
+    assert client.breaker.state == CircuitBreaker.OPEN
+
+    time.sleep(0.06)
+    assert client.get_movie_details(4)['id'] == 4
+    assert client.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_stale_details_served_while_circuit_open(stub_tmdb, client_config):
+    cache = MemoryCache()
+    client = TMDBClient(client_config, cache=cache)
+    key = make_cache_key("movie/5", {'append_to_response': 'credits,videos,similar'})
+    cache.set(key, {'id': 5, 'title': 'Cached'}, 0.01, 60)
+    time.sleep(0.02)
+
+    stub_tmdb.options['error_rate'] = 1.0
+    open_breaker(client.breaker)
+    assert client.get_movie_details(5) == {'id': 5, 'title': 'Cached'}
+    assert client.get_movies_details([5])[5] == {'id': 5, 'title': 'Cached'}
+
+
+def test_shared_bucket_error_falls_back_to_process_bucket(tmp_path, monkeypatch):
+    cache = SQLiteCache(str(tmp_path / "cache.db"))
+
+    def locked(*args, **kwargs):
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(cache, '_update_bucket', locked)
+    assert cache.take_token("tmdb", 1, 1) == 0
+    assert cache.take_token("tmdb", 1, 1) > 0
+    cache.pause_tokens("tmdb", 5, 1, 1)
+    assert cache.take_token("tmdb", 1, 1) > 4
+
+
+def test_bulk_fetches_do_not_hold_up_interactive_batches(stub_tmdb, client_config):
+    client = TMDBClient(dict(client_config, TMDB_RATE_LIMIT=1000, TMDB_RATE_BURST=1000), cache=MemoryCache())
+    stub_tmdb.options['latency_ms'] = 50
+    importer = threading.Thread(target=client.get_movies_details, args=(list(range(100, 140)), True))
+    importer.start()
+    time.sleep(0.05)
+    details = client.get_movies_details([1, 2, 3, 4])
+    # 40 fetches two at a time take ~1s; queued behind them on one shared
+    # pool the interactive batch would only finish once the import had
+    importer_running = importer.is_alive()
+    importer.join()
+    assert all(details[i]['id'] == i for i in (1, 2, 3, 4))
+    assert importer_running
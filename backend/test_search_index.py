@@ -0,0 +1,87 @@
+import pytest
+
+from utils.api_client import TMDBClient
+from utils.cache import MemoryCache
+from utils.search_index import BROAD_MATCH_THRESHOLD, SearchIndex
+
+
+def movie(movie_id, title, popularity=1.0):
+    return {"id": movie_id, "title": title, "original_title": title, "popularity": popularity}
+
+
+@pytest.fixture
+def index(tmp_path):
+    return SearchIndex(str(tmp_path / "search_index.db"))
+
+
+def test_narrow_queries_are_ranked_by_relevance(index):
+    index.add_movies([
+        movie(1, "The Long Night Before The Alien Came Back Home", 20),
+        movie(2, "Alien", 10),
+        movie(3, "Aliens", 11),
+        movie(4, "Predator", 50),
+    ])
+    # Short titles first despite lower popularity; popularity breaks near-ties
+    results = index.search("alien")
+    assert [m["id"] for m in results["results"]] == [3, 2, 1]
+    assert results["total_results"] == 3
+    assert [m["id"] for m in index.search("long alien")["results"]] == [1]
+
+
+def test_broad_queries_are_ordered_by_popularity(index):
+    count = BROAD_MATCH_THRESHOLD + 50
+    index.add_movies([movie(i, f"The Movie Number {i}", popularity=i % 97) for i in range(1, count + 1)])
+    results = index.search("the")
+    assert results["total_results"] == count
+    popularity = [m["popularity"] for m in results["results"]]
+    assert popularity == sorted(popularity, reverse=True) and popularity[0] == 96
+
+
+def test_threshold_switches_from_bm25_to_popularity(index, monkeypatch):
+    index.add_movies([movie(i, f"Predator {i}") for i in range(1, 21)])
+    index.add_movies([movie(100, "Alien", 1), movie(101, "Night Of The Alien Returning Home Again", 10)])
+    assert [m["id"] for m in index.search("alien")["results"]] == [100, 101]
+    monkeypatch.setattr("utils.search_index.BROAD_MATCH_THRESHOLD", 1)
+    assert [m["id"] for m in index.search("alien")["results"]] == [101, 100]
+
+
+def test_paging(index):
+    index.add_movies([movie(i, f"Zebra {i}", popularity=i) for i in range(1, 46)])
+    first, second, third = (index.search("zebra", page) for page in (1, 2, 3))
+    assert (first["total_results"], first["total_pages"]) == (45, 3)
+    assert [len(p["results"]) for p in (first, second, third)] == [20, 20, 5]
+    ids = [m["id"] for p in (first, second, third) for m in p["results"]]
+    assert sorted(ids) == list(range(1, 46))
+    assert index.search("zebra", 4)["results"] == []
+    assert index.search("zebra", 0)["page"] == 1
+    assert index.search("!!!")["total_results"] == 0
+
+
+def test_adult_titles_are_not_indexed(index):
+    assert index.add_movies([dict(movie(1, "Zebra"), adult=True)]) == 0
+    assert index.count() == 0
+
+
+def test_search_goes_upstream_below_min_results(stub_tmdb, client_config, index):
+    config = dict(client_config, SEARCH_LOCAL_MIN_RESULTS=3)
+    client = TMDBClient(config, cache=MemoryCache(), search_index=index)
+    index.add_movies([movie(900001, "Quokka One"), movie(900002, "Quokka Two")])
+    upstream = client.search_movie("quokka")
+    assert upstream.get("source") != "local"
+    assert upstream["total_results"] > 2
+
+    client = TMDBClient(config, cache=MemoryCache(), search_index=index)
+    index.add_movies([movie(900003, "Quokka Three")])
+    local = client.search_movie("quokka")
+    assert local["source"] == "local"
+    # Past the last local page goes upstream too
+    assert client.search_movie("quokka", page=2).get("source") != "local"
+
+
+def test_local_matches_are_served_during_an_outage(stub_tmdb, client_config, index):
+    client = TMDBClient(dict(client_config, SEARCH_LOCAL_MIN_RESULTS=3), cache=MemoryCache(), search_index=index)
+    index.add_movies([movie(900011, "Wombat")])
+    stub_tmdb.options['error_rate'] = 1.0
+    results = client.search_movie("wombat")
+    assert results["source"] == "local"
+    assert [m["id"] for m in results["results"]] == [900011]
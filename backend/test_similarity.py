@@ -0,0 +1,64 @@
+import random
+import threading
+import time
+
+import pytest
+
+from app import app
+from utils import similarity
+from utils.similarity import SimilarityIndex
+
+from bench_similarity import synthetic_movie  # noqa: E402  (benchmarks/ is on sys.path via conftest)
+
+
+@pytest.fixture
+def unbuilt_index(monkeypatch):
+    release = threading.Event()
+    rng = random.Random(3)
+
+    def slow_known_movies():
+        release.wait(5)
+        for movie_id in range(1, 301):
+            yield synthetic_movie(rng, movie_id, 200)
+
+    monkeypatch.setattr(similarity, "_similarity_index", None)
+    monkeypatch.setattr(similarity, "_build_thread", None)
+    monkeypatch.setattr(similarity, "_known_movies", slow_known_movies)
+    yield release
+    release.set()
+
+
+def test_similar_is_503_until_built_then_served(unbuilt_index):
+    client = app.test_client()
+    start = time.monotonic()
+    response = client.get("/api/movie/5/similar?limit=3")
+    assert time.monotonic() - start < 1
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "5"
+    assert client.get("/api/movie/5/similar").status_code == 503
+
+    unbuilt_index.set()
+    similarity._build_thread.join(5)
+    response = client.get("/api/movie/5/similar?limit=3")
+    assert response.status_code == 200
+    assert len(response.json["results"]) == 3
+    assert 5 not in [r["id"] for r in response.json["results"]]
+
+
+def test_similar_ranks_shared_genres_and_people_first():
+    index = SimilarityIndex()
+    base = {'genre_ids': [18, 80], 'release_date': '1994-01-01', 'popularity': 20,
+            'credits': {'cast': [{'id': 1}, {'id': 2}], 'crew': [{'id': 9, 'job': 'Director'}]}}
+    index.load([
+        dict(base, id=1),
+        dict(base, id=2),
+        dict(base, id=3, genre_ids=[18], credits={'cast': [], 'crew': []}),
+        {'id': 4, 'genre_ids': [16, 10751], 'release_date': '2015-01-01', 'popularity': 20},
+    ])
+    assert [movie_id for movie_id, _ in index.similar(1, 3)] == [2, 3, 4]
+    assert index.similar(99, 3) is None
+
+
+@pytest.mark.parametrize("limit", ["0", "51", "abc"])
+def test_similar_limit_validated(limit):
+    assert app.test_client().get(f"/api/movie/5/similar?limit={limit}").status_code == 400
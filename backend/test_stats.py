@@ -0,0 +1,119 @@
+import time
+
+import pytest
+
+from database import get_db_connection
+from models.recommendation_model import (
+    create_recommendation, create_recommendations, delete_recommendation,
+    delete_recommendations, set_recommendations_active
+)
+from models.stats_model import get_category_counts, get_counters
+from models.user_model import create_user
+from services import stats_service
+from services.stats_service import StatsService
+
+
+def row(movie_id, category="Drama"):
+    return (movie_id, f"Movie {movie_id}", "", "", category)
+
+
+def assert_counters_match(conn):
+    """The trigger-maintained counters agree with counting the tables"""
+    counters = get_counters()
+    assert counters['users'] == conn.execute('SELECT COUNT(*) FROM users').fetchone()[0]
+    assert counters['recommendations'] == conn.execute('SELECT COUNT(*) FROM recommendations').fetchone()[0]
+    assert counters['active_recommendations'] == conn.execute(
+        'SELECT COUNT(*) FROM recommendations WHERE is_active').fetchone()[0]
+    counted = conn.execute('''
+        SELECT COALESCE(category, '') AS category, COUNT(*) AS total, SUM(is_active != 0) AS active
+        FROM recommendations GROUP BY COALESCE(category, '') ORDER BY total DESC, category
+    ''').fetchall()
+    assert get_category_counts() == [dict(r) for r in counted]
+    signups = conn.execute('SELECT SUM(signups) FROM daily_signups').fetchone()[0] or 0
+    assert signups == counters['users']
+
+
+@pytest.fixture
+def db(app_db, monkeypatch):
+    monkeypatch.setattr(stats_service, "_cache", {})
+    with app_db.app_context():
+        yield get_db_connection()
+
+
+def test_counters_follow_single_writes(db):
+    assert get_counters() == {'users': 0, 'recommendations': 0, 'active_recommendations': 0}
+    create_user("Ann", "ann@example.com")
+    create_user("Bob", "bob@example.com")
+    first = create_recommendation(1, "One", "", "", "Drama")
+    create_recommendation(2, "Two", "", "", "Comedy")
+    create_recommendation(3, "Three", "", "", None)
+    assert_counters_match(db)
+    assert get_counters()['recommendations'] == 3
+
+    delete_recommendation(first)
+    db.execute('DELETE FROM users WHERE email = ?', ('bob@example.com',))
+    db.commit()
+    assert_counters_match(db)
+    assert get_counters()['users'] == 1
+
+
+def test_counters_follow_active_toggle_and_category_change(db):
+    recommendation_id = create_recommendation(1, "One", "", "", "Drama")
+    create_recommendation(2, "Two", "", "", "Drama")
+
+    db.execute('UPDATE recommendations SET is_active = 0 WHERE id = ?', (recommendation_id,))
+    db.commit()
+    assert_counters_match(db)
+    assert get_counters()['active_recommendations'] == 1
+
+    db.execute('UPDATE recommendations SET category = ? WHERE id = ?', ("Comedy", recommendation_id))
+    db.commit()
+    assert_counters_match(db)
+    assert {c['category']: (c['total'], c['active']) for c in get_category_counts()} == {
+        "Drama": (1, 1), "Comedy": (1, 0)
+    }
+
+    # Unrelated column updates leave the counters alone
+    db.execute('UPDATE recommendations SET description = ?', ("changed",))
+    db.commit()
+    assert_counters_match(db)
+
+
+def test_counters_follow_bulk_paths(db):
+    inserted = create_recommendations([row(i, "Drama" if i % 2 else "Comedy") for i in range(1, 21)])
+    # Already-recommended movies are skipped and not counted twice
+    create_recommendations([row(1), row(21)])
+    assert_counters_match(db)
+    assert get_counters()['recommendations'] == 21
+
+    ids = [inserted[i] for i in range(1, 11)]
+    set_recommendations_active(ids, False)
+    set_recommendations_active(ids, False)
+    assert_counters_match(db)
+    assert get_counters()['active_recommendations'] == 11
+
+    set_recommendations_active(ids[:5], True)
+    delete_recommendations(ids[3:8] + [99999])
+    assert_counters_match(db)
+    assert get_counters()['recommendations'] == 16
+
+
+def test_dashboard_cache_is_reused_until_invalidated(db, app_db, monkeypatch):
+    monkeypatch.setitem(app_db.config, 'DASHBOARD_CACHE_TTL', 60)
+    assert StatsService.get_dashboard_stats()["stats"]["recommendations"] == 0
+    create_recommendation(1, "One", "", "", "Drama")
+    assert StatsService.get_dashboard_stats()["stats"]["recommendations"] == 0
+    StatsService.invalidate()
+    stats = StatsService.get_dashboard_stats()
+    assert stats["stats"]["recommendations"] == 1
+    assert stats["categories"] == [{"category": "Drama", "total": 1, "active": 1}]
+
+
+def test_dashboard_cache_expires(db, app_db, monkeypatch):
+    monkeypatch.setitem(app_db.config, 'DASHBOARD_CACHE_TTL', 0.05)
+    assert StatsService.get_dashboard_stats()["stats"]["users"] == 0
+    create_user("Ann", "ann@example.com")
+    time.sleep(0.06)
+    stats = StatsService.get_dashboard_stats()
+    assert stats["stats"]["users"] == 1
+    assert sum(day["signups"] for day in stats["signups_per_day"]) == 1
@@ -0,0 +1,68 @@
+import threading
+
+import pytest
+
+from app import app
+from utils import suggest
+from utils.suggest import TitleSuggester
+
+
+def movie(movie_id, title, popularity):
+    return {"id": movie_id, "title": title, "popularity": popularity, "release_date": "2001-05-01"}
+
+
+@pytest.fixture
+def suggester(monkeypatch):
+    suggester = TitleSuggester()
+    suggester.load([
+        movie(1, "Lord of War", 30), movie(2, "The Lord of the Rings", 90),
+        movie(3, "Lost Highway", 20), movie(4, "Love Actually", 50)
+    ])
+    monkeypatch.setattr(suggest, "_suggester", suggester)
+    return suggester
+
+
+def test_prefix_matches_by_popularity(suggester):
+    assert [m["id"] for m in suggester.suggest("lo", 10)] == [2, 4, 1, 3]
+    assert [m["id"] for m in suggester.suggest("lord", 1)] == [2]
+    assert suggester.suggest("rings")[0] == {"id": 2, "title": "The Lord of the Rings",
+                                            "year": 2001, "poster_path": None}
+
+
+def test_new_movies_are_suggested(suggester):
+    suggest.notify_movies([movie(5, "Lola Rennt", 99)])
+    assert suggester.suggest("lo", 1)[0]["id"] == 5
+
+
+@pytest.mark.parametrize("limit", [0, -3])
+def test_non_positive_limit_returns_nothing(suggester, limit):
+    assert suggester.suggest("lo", limit) == []
+
+
+@pytest.mark.parametrize("limit, count", [(-3, 1), (0, 1), (2, 2), (50, 4)])
+def test_route_clamps_limit(suggester, limit, count):
+    response = app.test_client().get(f"/search/suggest?q=lo&limit={limit}")
+    assert response.status_code == 200
+    assert len(response.json["results"]) == count
+
+
+def test_route_is_503_until_built_then_served(monkeypatch):
+    release = threading.Event()
+
+    def slow_known_movies():
+        release.wait(5)
+        yield movie(1, "Lord of War", 30)
+
+    monkeypatch.setattr(suggest, "_suggester", None)
+    monkeypatch.setattr(suggest, "_build_thread", None)
+    monkeypatch.setattr(suggest, "_known_movies", slow_known_movies)
+    client = app.test_client()
+    try:
+        response = client.get("/search/suggest?q=lo")
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "5"
+        assert client.get("/search/suggest?q=lo").status_code == 503
+    finally:
+        release.set()
+    suggest._build_thread.join(5)
+    assert [m["id"] for m in client.get("/search/suggest?q=lo").json["results"]] == [1]
@@ -1,96 +1,615 @@
+import math
 import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 import requests
-from flask import current_app
+from requests.adapters import HTTPAdapter
+from flask import current_app, g, has_request_context
+from utils.cache import (
+    get_cache, make_cache_key, ttl_for_endpoint, is_feed_endpoint, DEFAULT_STALE_TTL
+)
+from utils.catalog import get_catalog
+from utils.metrics import metrics
+from utils.missing_ids import create_missing_ids
+from utils.projection import slim_payload
+from utils.resilience import CircuitBreaker, backoff_delay, parse_retry_after
+from utils.search_index import get_search_index, movies_from_payload
+from utils.similarity import update_similarity
+from utils.suggest import notify_movies
 
 TMDB_BASE_URL = "https://api.themoviedb.org/3"
 
-class TMDBClient:
+# Paged category feeds served by the public routes and kept warm by the cache warmer
+FEEDS = {
+    'trending': "trending/movie/week",
+    'popular': "movie/popular",
+    'top_rated': "movie/top_rated",
+    'upcoming': "movie/upcoming",
+    'now_playing': "movie/now_playing"
+}
+
+# TMDB refuses list pages beyond this
+MAX_FEED_PAGE = 500
+
+# How long a page of local search results is reused
+LOCAL_SEARCH_TTL = 5 * 60
+
+# Name of the shared token bucket all workers draw from before calling TMDB
+RATE_LIMIT_BUCKET = "tmdb"
+
+MOVIE_DETAILS_ENDPOINT = re.compile(r"^movie/(\d+)$")
+MOVIE_ID_PATH = re.compile(r"/\d+(?=/|$)")
+
+def not_found():
+    return {"error": "Not found in TMDB", "status_code": 404}
+
+def upstream_error(message, status_code=502, retry_after=None):
+    """Error for a failed TMDB call: 502 when TMDB failed, 503 (with the
+    seconds to wait) when we are holding back because of rate limits or an
+    open circuit"""
+    error = {"error": message, "status_code": status_code}
+    if retry_after is not None:
+        error["retry_after"] = max(1, math.ceil(retry_after))
+    return error
+
+def _movie_id(endpoint):
+    match = MOVIE_DETAILS_ENDPOINT.match(endpoint.strip('/'))
+    return int(match.group(1)) if match else None
+
+class _InFlightCall:
     def __init__(self):
-        self.api_key = current_app.config['TMDB_API_KEY']
-        self.base_url = TMDB_BASE_URL
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """Collapse concurrent calls for the same key into a single execution.
+
+    The first caller runs the function; callers arriving while it is in
+    flight wait and receive the same result (or exception).
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+    
+    def do(self, key, fn):
+        """Run fn for key, returning (result, shared) where shared means it was coalesced"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _InFlightCall()
+                self._calls[key] = call
+        
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+        
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+        return call.result, False
+
+class TMDBClient:
+    def __init__(self, config=None, cache=None, search_index=None):
+        if config is None:
+            config = current_app.config
+        self.api_key = config['TMDB_API_KEY']
+        self.base_url = config.get('TMDB_BASE_URL') or TMDB_BASE_URL
+        self.timeout = (
+            config.get('TMDB_CONNECT_TIMEOUT', 3.05),
+            config.get('TMDB_READ_TIMEOUT', 10)
+        )
+        self.cache = cache if cache is not None else get_cache(config)
+        self.inflight = SingleFlight()
+        # Every movie payload fetched from TMDB is added to the local search index
+        self.search_index = search_index if search_index is not None else get_search_index(config)
+        self.local_search_min_results = config.get('SEARCH_LOCAL_MIN_RESULTS', 20)
+        # Let at most one worker process fetch a given key at a time
+        self.coalesce_across_workers = config.get('TMDB_COALESCE_ACROSS_WORKERS', True)
+        self.lock_poll_interval = 0.05
+        # Entries are kept this long after going stale: feeds are served stale
+        # while they revalidate, everything else only while the circuit is open
+        self.stale_ttl = config.get('TMDB_CACHE_STALE_TTL', DEFAULT_STALE_TTL)
+        # 404s are remembered briefly; movie ids go in a bitmap shared by all workers
+        self.negative_ttl = config.get('TMDB_NEGATIVE_TTL', 3600)
+        self.missing_ids = create_missing_ids(config)
+        # Offline snapshot from `flask ingest-catalog`: consulted first when
+        # TMDB_SNAPSHOT_FIRST is set, and always as a fallback when TMDB fails
+        self.catalog = get_catalog(config)
+        self.snapshot_first = config.get('TMDB_SNAPSHOT_FIRST', False) and self.catalog is not None
+        self._refreshing = set()
+        self._refresh_lock = threading.Lock()
+        self._refresh_pool = ThreadPoolExecutor(
+            max_workers=config.get('TMDB_REFRESH_WORKERS', 2),
+            thread_name_prefix='tmdb-refresh'
+        )
+        # Retries, rate limiting and circuit breaking
+        self.max_retries = config.get('TMDB_MAX_RETRIES', 2)
+        self.retry_budget = config.get('TMDB_RETRY_BUDGET', 5)
+        self.rate_limit = config.get('TMDB_RATE_LIMIT', 40)
+        self.rate_burst = config.get('TMDB_RATE_BURST', 40)
+        self.breaker = CircuitBreaker(
+            failure_ratio=config.get('TMDB_BREAKER_FAILURE_RATIO', 0.5),
+            min_calls=config.get('TMDB_BREAKER_MIN_CALLS', 10),
+            cooldown=config.get('TMDB_BREAKER_COOLDOWN', 15)
+        )
+        self.session = self._create_session(config.get('TMDB_POOL_SIZE', 10))
+        # Shared by all batch requests so fan-out stays bounded per process
+        self._batch_pool = ThreadPoolExecutor(
+            max_workers=config.get('TMDB_BATCH_CONCURRENCY', 8),
+            thread_name_prefix='tmdb-batch'
+        )
+        # Bulk imports get their own, smaller pool and never hold up the one above
+        self._bulk_pool = ThreadPoolExecutor(
+            max_workers=config.get('TMDB_BULK_CONCURRENCY', 2),
+            thread_name_prefix='tmdb-bulk'
+        )
+    
+    def _create_session(self, pool_size):
+        # Retries are handled in _request so they can share the rate limit and breaker
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=pool_size,
+            max_retries=0
+        )
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers.update({
+            'Accept': 'application/json',
+            'Connection': 'keep-alive'
+        })
+        return session
+    
+    def close(self):
+        self._refresh_pool.shutdown(wait=False)
+        self._batch_pool.shutdown(wait=False)
+        self._bulk_pool.shutdown(wait=False)
+        self.session.close()
     
     def _make_request(self, endpoint, params=None):
         if params is None:
             params = {}
         
-        params['api_key'] = self.api_key
+        if self.snapshot_first:
+            data = self._from_snapshot(endpoint, params)
+            if data is not None:
+                return data
+        
+        cache_key = make_cache_key(endpoint, params)
+        if is_feed_endpoint(endpoint):
+            # Serve whatever we have, refreshing expired feeds off the request path
+            entry = self.cache.get_entry(cache_key)
+            if entry is not None:
+                if not entry.fresh:
+                    self._refresh_in_background(endpoint, params, cache_key)
+                _record_cache_state(entry.age, entry.fresh_for)
+                return entry.value
+        else:
+            # Expired details stand in for TMDB only while the circuit is open
+            entry = self.cache.get_entry(cache_key, allow_stale=self._circuit_open())
+            if entry is not None:
+                _record_cache_state(None if entry.fresh else entry.age, entry.fresh_for)
+                return entry.value
+        
+        data = self._load(endpoint, params, cache_key)
+        if isinstance(data, dict) and 'error' not in data:
+            _record_cache_state(None, ttl_for_endpoint(endpoint))
+        elif _is_outage(data):
+            return self._from_snapshot(endpoint, params) or data
+        return data
+    
+    def _from_snapshot(self, endpoint, params):
+        if self.catalog is None:
+            return None
+        try:
+            entry = self.catalog.get(endpoint, params)
+        except Exception as e:
+            print(f"Catalog error: {e}")
+            return None
+        if entry is None:
+            return None
+        data, fetched_at = entry
+        _record_cache_state(int(max(0, time.time() - fetched_at)), ttl_for_endpoint(endpoint))
+        return data
+    
+    def _load(self, endpoint, params, cache_key):
+        """Fetch a cache miss, sharing the upstream call with concurrent callers"""
+        data, shared = self.inflight.do(
+            cache_key, lambda: self._fetch(endpoint, params, cache_key)
+        )
+        if shared:
+            self.cache.record_coalesced()
+        return data
+    
+    def refresh(self, endpoint, params=None):
+        """Fetch from TMDB and update the cache, ignoring any cached copy"""
+        params = params or {}
+        cache_key = make_cache_key(endpoint, params)
+        data, _ = self.inflight.do(
+            cache_key, lambda: self._fetch(endpoint, params, cache_key)
+        )
+        return data
+    
+    def fetch(self, endpoint, params=None):
+        """Fetch from TMDB without reading or filling the cache (bulk ingest)"""
+        return self._request(endpoint, params or {}, None)
+    
+    def prefetch(self, endpoint, params=None):
+        """Warm the cache for endpoint in the background unless it is already fresh"""
+        params = params or {}
+        cache_key = make_cache_key(endpoint, params)
+        if self.cache.freshness(cache_key) <= 0:
+            self._refresh_in_background(endpoint, params, cache_key)
+    
+    def _circuit_open(self):
+        return self.breaker.state != CircuitBreaker.CLOSED
+    
+    def _refresh_in_background(self, endpoint, params, cache_key):
+        with self._refresh_lock:
+            if cache_key in self._refreshing:
+                return
+            self._refreshing.add(cache_key)
+        
+        def refresh():
+            try:
+                self.inflight.do(cache_key, lambda: self._fetch(endpoint, params, cache_key))
+            except Exception as e:
+                print(f"TMDB refresh failed for {cache_key}: {e}")
+            finally:
+                with self._refresh_lock:
+                    self._refreshing.discard(cache_key)
+        
+        self._refresh_pool.submit(refresh)
+    
+    def _fetch(self, endpoint, params, cache_key):
+        locked = False
+        if self.coalesce_across_workers:
+            locked = self.cache.acquire_lock(cache_key, sum(self.timeout))
+            if not locked:
+                data, locked = self._wait_for_other_worker(cache_key)
+                if data is not None:
+                    self.cache.record_coalesced()
+                    return data
+        try:
+            # Another worker may have just found this id missing
+            movie_id = _movie_id(endpoint)
+            if movie_id is not None and self.is_missing(movie_id):
+                return not_found()
+            return self._request(endpoint, params, cache_key)
+        finally:
+            if locked:
+                self.cache.release_lock(cache_key)
+    
+    def _wait_for_other_worker(self, cache_key):
+        """Poll the shared cache until another worker stores cache_key.
+
+        Returns (data, locked); if the other worker finishes without caching
+        a result (upstream error) this worker takes over the lock instead.
+        """
+        deadline = time.monotonic() + sum(self.timeout)
+        while time.monotonic() < deadline:
+            time.sleep(self.lock_poll_interval)
+            data = self.cache.peek(cache_key)
+            if data is not None:
+                return data, False
+            if self.cache.acquire_lock(cache_key, sum(self.timeout)):
+                return None, True
+        return None, False
+    
+    def _request(self, endpoint, params, cache_key):
+        params = dict(params, api_key=self.api_key)
         url = f"{self.base_url}/{endpoint}"
+        # Total time we are willing to spend waiting on rate limits and backoff
+        deadline = time.monotonic() + self.retry_budget
+        error = None
+        status_code, retry_after = 502, None
+        
+        for attempt in range(self.max_retries + 1):
+            if not self._wait_for_rate_limit(deadline):
+                error = "TMDB rate limit budget exceeded"
+                status_code, retry_after = 503, 1
+                break
+            if not self.breaker.allow():
+                error = "TMDB temporarily unavailable (circuit open)"
+                status_code, retry_after = 503, self.breaker.retry_after()
+                break
+            
+            # Every call the breaker lets through must report back, or a
+            # half-open probe would stay in flight and keep the circuit shut
+            try:
+                response = self._get(endpoint, url, params)
+            except requests.exceptions.RequestException as e:
+                self.breaker.record_failure()
+                error = e
+                status_code, retry_after = 502, None
+                delay = backoff_delay(attempt)
+            except BaseException:
+                self.breaker.record_failure()
+                raise
+            else:
+                if response.status_code == 429 or response.status_code >= 500:
+                    self.breaker.record_failure()
+                    error = f"{response.status_code} Error from TMDB for url: {endpoint}"
+                    retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                    if response.status_code == 429:
+                        self.cache.pause_tokens(
+                            RATE_LIMIT_BUCKET, retry_after or 1, self.rate_limit, self.rate_burst
+                        )
+                        status_code, retry_after = 503, retry_after or 1
+                    else:
+                        status_code = 502
+                    delay = retry_after if retry_after is not None else backoff_delay(attempt)
+                elif response.status_code == 404:
+                    self.breaker.record_success()
+                    return self._not_found(endpoint, cache_key)
+                else:
+                    self.breaker.record_success()
+                    if response.status_code >= 400:
+                        print(f"TMDB API Error: {response.status_code} for {endpoint}")
+                        return upstream_error(f"{response.status_code} Error from TMDB for url: {endpoint}")
+                    try:
+                        data = response.json()
+                    except ValueError as e:
+                        print(f"TMDB API Error: {e}")
+                        return upstream_error(str(e))
+                    # Index everything TMDB sent, but cache only what we serve
+                    self._index(endpoint, data)
+                    data = slim_payload(endpoint, data)
+                    if cache_key is not None:
+                        self.cache.set(
+                            cache_key, data, ttl_for_endpoint(endpoint), self.stale_ttl
+                        )
+                    return data
+            
+            if attempt == self.max_retries or time.monotonic() + delay > deadline:
+                break
+            time.sleep(delay)
         
+        # Connection errors quote the request URL, api_key included
+        error = str(error).replace(self.api_key, '***') if self.api_key else str(error)
+        print(f"TMDB API Error: {error}")
+        return upstream_error(error, status_code, retry_after if status_code == 503 else None)
+    
+    def _get(self, endpoint, url, params):
+        """One upstream call, timed per endpoint (movie ids folded into {id})"""
+        label = MOVIE_ID_PATH.sub("/{id}", "/" + endpoint.strip('/'))[1:]
+        status = "error"
+        metrics.inc('tmdb_requests_in_flight')
+        start = time.perf_counter()
         try:
-            response = requests.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            print(f"TMDB API Error: {e}")
-            return {"error": str(e)}
-    
-    def get_trending(self, media_type="movie", time_window="week"):
+            response = self.session.get(url, params=params, timeout=self.timeout)
+            status = str(response.status_code)
+            return response
+        finally:
+            metrics.inc('tmdb_requests_in_flight', amount=-1)
+            metrics.observe('tmdb_request_duration_seconds', (label, status), time.perf_counter() - start)
+    
+    def _not_found(self, endpoint, cache_key):
+        """Remember a 404 so repeated lookups of a bad id stay local"""
+        movie_id = _movie_id(endpoint)
+        if movie_id is not None and self.missing_ids is not None and self.missing_ids.add(movie_id):
+            return not_found()
+        if cache_key is not None:
+            self.cache.set(cache_key, not_found(), self.negative_ttl)
+        return not_found()
+    
+    def is_missing(self, movie_id):
+        return self.missing_ids is not None and self.missing_ids.contains(movie_id)
+    
+    def _index(self, endpoint, data):
+        movies = movies_from_payload(endpoint, data)
+        if not movies:
+            return
+        notify_movies(movies)
+        update_similarity(movies)
+        if self.search_index is None:
+            return
+        try:
+            self.search_index.add_movies(movies)
+        except Exception as e:
+            print(f"Search index error: {e}")
+    
+    def _wait_for_rate_limit(self, deadline):
+        """Block until the shared bucket grants a token; False if that would pass deadline"""
+        while True:
+            wait = self.cache.take_token(RATE_LIMIT_BUCKET, self.rate_limit, self.rate_burst)
+            if not wait:
+                return True
+            if time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+    
+    def stats(self):
+        return {
+            "missing_ids": self.missing_ids.stats() if self.missing_ids is not None else None,
+            "catalog": self.catalog.stats() if self.catalog is not None else None,
+            "snapshot_first": self.snapshot_first,
+            "circuit_breaker": self.breaker.stats(),
+            "rate_limit": {"per_second": self.rate_limit, "burst": self.rate_burst},
+            "max_retries": self.max_retries,
+            "retry_budget": self.retry_budget
+        }
+    
+    def get_feed(self, name, page=1):
+        return self._make_request(FEEDS[name], {'page': page})
+    
+    def prefetch_feed(self, name, page):
+        if 1 <= page <= MAX_FEED_PAGE:
+            self.prefetch(FEEDS[name], {'page': page})
+    
+    def get_trending(self, media_type="movie", time_window="week", page=1):
         endpoint = f"trending/{media_type}/{time_window}"
-        return self._make_request(endpoint)
+        params = {'page': page}
+        return self._make_request(endpoint, params)
     
     def search_movie(self, query, page=1):
+        # Answer from the local index when it knows enough matching titles
+        if self.search_index is not None:
+            try:
+                local = self._search_local(query, page)
+            except Exception as e:
+                print(f"Search index error: {e}")
+                local = None
+            # In snapshot-first mode any local match will do
+            min_results = 1 if self.snapshot_first else self.local_search_min_results
+            if (local and local['total_results'] >= min_results
+                    and page <= local['total_pages']):
+                return local
+        else:
+            local = None
+        
         endpoint = "search/movie"
         params = {
             'query': query,
             'page': page,
             'include_adult': False
         }
-        return self._make_request(endpoint, params)
+        data = self._make_request(endpoint, params)
+        if _is_outage(data) and local and local['total_results']:
+            return local
+        return data
+    
+    def _search_local(self, query, page):
+        # Broad queries are the expensive ones to rank, so keep pages briefly
+        cache_key = make_cache_key(
+            "local/search/movie", {'query': " ".join(query.lower().split()), 'page': page}
+        )
+        local = self.cache.get(cache_key)
+        if local is None:
+            local = self.search_index.search(query, page)
+            self.cache.set(cache_key, local, LOCAL_SEARCH_TTL)
+        return local
     
     def get_movie_details(self, movie_id):
+        if self.is_missing(movie_id):
+            return not_found()
         endpoint = f"movie/{movie_id}"
         params = {
             'append_to_response': 'credits,videos,similar'
         }
         return self._make_request(endpoint, params)
     
+    def get_movies_details(self, movie_ids, bulk=False):
+        """Details for several movies keyed by id.
+
+        Cache hits are answered locally and the misses fetched concurrently,
+        so the whole batch costs roughly one upstream round trip. `bulk`
+        (admin imports) fetches on the separate bulk pool.
+        """
+        pool = self._bulk_pool if bulk else self._batch_pool
+        results = {}
+        misses = []
+        for movie_id in movie_ids:
+            if self.is_missing(movie_id):
+                results[movie_id] = not_found()
+                continue
+            if self.snapshot_first:
+                snapshot = self.catalog.get_movie(movie_id)
+                if snapshot is not None:
+                    results[movie_id] = snapshot[0]
+                    continue
+            endpoint = f"movie/{movie_id}"
+            params = {'append_to_response': 'credits,videos,similar'}
+            cache_key = make_cache_key(endpoint, params)
+            entry = self.cache.get_entry(cache_key, allow_stale=self._circuit_open())
+            if entry is not None:
+                results[movie_id] = entry.value
+            else:
+                misses.append((movie_id, pool.submit(
+                    self._load, endpoint, params, cache_key
+                )))
+        
+        for movie_id, future in misses:
+            try:
+                results[movie_id] = future.result()
+            except Exception as e:
+                results[movie_id] = upstream_error(str(e))
+            if _is_outage(results[movie_id]):
+                results[movie_id] = self._from_snapshot(f"movie/{movie_id}", None) or results[movie_id]
+        return results
+    
     def get_popular_movies(self, page=1):
-        endpoint = "movie/popular"
-        params = {'page': page}
-        return self._make_request(endpoint, params)
+        return self.get_feed('popular', page)
     
     def get_top_rated(self, page=1):
-        endpoint = "movie/top_rated"
-        params = {'page': page}
-        return self._make_request(endpoint, params)
+        return self.get_feed('top_rated', page)
     
     def get_upcoming(self, page=1):
-        endpoint = "movie/upcoming"
-        params = {'page': page}
-        return self._make_request(endpoint, params)
+        return self.get_feed('upcoming', page)
     
     def get_now_playing(self, page=1):
-        endpoint = "movie/now_playing"
-        params = {'page': page}
-        return self._make_request(endpoint, params)
+        return self.get_feed('now_playing', page)
+
+def _is_outage(data):
+    """An upstream failure (not a 404) that the snapshot can stand in for"""
+    return isinstance(data, dict) and 'error' in data and data.get('status_code') != 404
+
+def _record_cache_state(age, fresh_for):
+    """Remember how old the TMDB data is (for the Age header) and how long it
+    stays fresh (for caching the encoded response)"""
+    if has_request_context():
+        g.tmdb_cache_age = age
+        g.tmdb_fresh_for = max(0, fresh_for)
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+def get_client():
+    """Get the process-wide TMDB client.
+
+    The client (and its connection pool) is created once per process, so a
+    gunicorn worker forked from a preloaded master never shares sockets with
+    its parent.
+    """
+    global _client, _client_pid
+    if _client is None or _client_pid != os.getpid():
+        with _client_lock:
+            if _client is None or _client_pid != os.getpid():
+                _client = TMDBClient()
+                _client_pid = os.getpid()
+    return _client
 
 # ===== FIXED HELPER FUNCTIONS =====
 # These now accept page parameters to match the routes
 
-def get_trending():
-    client = TMDBClient()
-    return client.get_trending()
+def get_trending(page=1):
+    return get_client().get_trending(page=page)
 
 def search_movie(query, page=1):
-    client = TMDBClient()
-    return client.search_movie(query, page)
+    return get_client().search_movie(query, page)
 
 def get_movie_details(movie_id):
-    client = TMDBClient()
-    return client.get_movie_details(movie_id)
+    return get_client().get_movie_details(movie_id)
+
+def get_movies_details(movie_ids, bulk=False):
+    return get_client().get_movies_details(movie_ids, bulk)
 
 def get_popular_movies(page=1):
-    client = TMDBClient()
-    return client.get_popular_movies(page)
+    return get_client().get_popular_movies(page)
 
 def get_top_rated(page=1):
-    client = TMDBClient()
-    return client.get_top_rated(page)
+    return get_client().get_top_rated(page)
 
 def get_upcoming(page=1):
-    client = TMDBClient()
-    return client.get_upcoming(page)
+    return get_client().get_upcoming(page)
 
 def get_now_playing(page=1):
-    client = TMDBClient()
-    return client.get_now_playing(page)
\ No newline at end of file
+    return get_client().get_now_playing(page)
+
+def prefetch_next_page(feed, page, data):
+    """Start loading the page after this one so infinite scroll never waits on TMDB"""
+    if isinstance(data, dict) and page < data.get('total_pages', 0):
+        get_client().prefetch_feed(feed, page + 1)
\ No newline at end of file
@@ -0,0 +1,538 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from urllib.parse import urlencode
+
+from utils.resilience import TokenBucket
+
+# Freshness per TMDB endpoint in seconds, first matching pattern wins
+ENDPOINT_TTLS = [
+    (re.compile(r"^trending/"), 10 * 60),
+    (re.compile(r"^search/"), 30 * 60),
+    (re.compile(r"^movie/(popular|now_playing|upcoming)$"), 30 * 60),
+    (re.compile(r"^movie/top_rated$"), 6 * 60 * 60),
+    (re.compile(r"^movie/\d+$"), 12 * 60 * 60),
+]
+DEFAULT_TTL = 15 * 60
+
+# Category feeds may be served stale for this long past their TTL while a
+# refresh runs in the background or while TMDB is failing
+FEED_ENDPOINTS = re.compile(r"^(trending/|movie/(popular|top_rated|upcoming|now_playing)$)")
+DEFAULT_STALE_TTL = 24 * 60 * 60
+
+# Parameters that never take part in a cache key
+IGNORED_PARAMS = ('api_key',)
+
+COUNTERS = ('hits', 'stale_hits', 'misses', 'evictions', 'coalesced')
+
+# A hit writes an entry's last access back (for LRU order) at most this often
+TOUCH_INTERVAL = 60
+
+
+def make_cache_key(endpoint, params=None):
+    """Normalize endpoint + params into a stable cache key"""
+    items = sorted(
+        (str(k), str(v)) for k, v in (params or {}).items()
+        if k not in IGNORED_PARAMS and v is not None
+    )
+    endpoint = endpoint.strip('/')
+    if not items:
+        return endpoint
+    return f"{endpoint}?{urlencode(items)}"
+
+
+def ttl_for_endpoint(endpoint):
+    endpoint = endpoint.strip('/')
+    for pattern, ttl in ENDPOINT_TTLS:
+        if pattern.search(endpoint):
+            return ttl
+    return DEFAULT_TTL
+
+
+def is_feed_endpoint(endpoint):
+    return bool(FEED_ENDPOINTS.search(endpoint.strip('/')))
+
+
+CacheEntry = namedtuple('CacheEntry', ['value', 'age', 'fresh', 'fresh_for'])
+
+
+class BaseCache:
+    """Common lookup/counter logic; backends implement _lookup, set and friends.
+
+    Every entry has a soft TTL (fresh) and an optional stale window after it
+    in which get_entry() can still return it for stale-while-revalidate.
+    """
+    backend = "base"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = dict.fromkeys(COUNTERS, 0)
+        self._buckets = {}
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._counters[name] += amount
+
+    def record_coalesced(self, amount=1):
+        """Count upstream fetches avoided by request coalescing"""
+        self._count('coalesced', amount)
+
+    def _lookup(self, key, touch):
+        """Return (payload, stored_at, fresh_until) for a live entry or None"""
+        raise NotImplementedError
+
+    def get(self, key):
+        entry = self.get_entry(key, allow_stale=False)
+        return entry.value if entry else None
+
+    def get_entry(self, key, allow_stale=True):
+        """Return a CacheEntry, including stale ones when allow_stale is set"""
+        row = self._lookup(key, touch=True)
+        now = time.time()
+        if row is None or (not allow_stale and row[2] <= now):
+            self._count('misses')
+            return None
+        fresh = row[2] > now
+        self._count('hits' if fresh else 'stale_hits')
+        return CacheEntry(json.loads(row[0]), max(0, int(now - row[1])), fresh, row[2] - now)
+
+    def peek(self, key):
+        """Like get() but without touching LRU order or hit/miss counters"""
+        row = self._lookup(key, touch=False)
+        if row is None or row[2] <= time.time():
+            return None
+        return json.loads(row[0])
+
+    def freshness(self, key):
+        """Seconds until key goes stale; zero or less when stale or missing"""
+        row = self._lookup(key, touch=False)
+        if row is None:
+            return 0
+        return row[2] - time.time()
+
+    def set(self, key, value, ttl, stale_ttl=0):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def items(self):
+        """Iterate over (key, value) for every stored entry, stale ones included"""
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def stats(self):
+        raise NotImplementedError
+
+    def acquire_lock(self, key, ttl):
+        """Claim the right to fetch key upstream; False if another process holds it"""
+        return True
+
+    def release_lock(self, key):
+        pass
+
+    def take_token(self, name, rate, capacity):
+        """Take a token from a named rate-limit bucket.
+
+        Returns 0 when granted, otherwise the seconds until one is available.
+        The base implementation is per-process; shared backends override it.
+        """
+        return self._bucket(name, rate, capacity).try_acquire()
+
+    def pause_tokens(self, name, seconds, rate, capacity):
+        """Stop handing out tokens from a bucket for `seconds`"""
+        self._bucket(name, rate, capacity).pause(seconds)
+
+    def _bucket(self, name, rate, capacity):
+        with self._lock:
+            bucket = self._buckets.get(name)
+            if bucket is None:
+                bucket = self._buckets[name] = TokenBucket(rate, capacity)
+            return bucket
+
+    def _stats_dict(self, counters, entries, max_entries):
+        lookups = counters['hits'] + counters['stale_hits'] + counters['misses']
+        served = counters['hits'] + counters['stale_hits']
+        return {
+            "backend": self.backend,
+            "entries": entries,
+            "max_entries": max_entries,
+            "hits": counters['hits'],
+            "stale_hits": counters['stale_hits'],
+            "misses": counters['misses'],
+            "evictions": counters['evictions'],
+            "coalesced": counters['coalesced'],
+            "hit_ratio": round(served / lookups, 4) if lookups else 0.0
+        }
+
+
+class NullCache(BaseCache):
+    """Cache that never stores anything, used when caching is disabled"""
+    backend = "none"
+
+    def _lookup(self, key, touch):
+        return None
+
+    def set(self, key, value, ttl, stale_ttl=0):
+        pass
+
+    def delete(self, key):
+        pass
+
+    def items(self):
+        return iter(())
+
+    def clear(self):
+        pass
+
+    def stats(self):
+        return self._stats_dict(dict(self._counters), 0, 0)
+
+
+class MemoryCache(BaseCache):
+    """Per-process LRU cache, useful for development and tests"""
+    backend = "memory"
+
+    def __init__(self, max_entries=5000):
+        super().__init__()
+        self.max_entries = max_entries
+        # key -> (payload, stored_at, fresh_until, expires_at)
+        self._entries = OrderedDict()
+
+    def _lookup(self, key, touch):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[3] <= time.time():
+                del self._entries[key]
+                return None
+            if touch:
+                self._entries.move_to_end(key)
+            return entry[:3]
+
+    def set(self, key, value, ttl, stale_ttl=0):
+        payload = json.dumps(value)
+        now = time.time()
+        with self._lock:
+            self._entries[key] = (payload, now, now + ttl, now + ttl + stale_ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters['evictions'] += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def items(self):
+        with self._lock:
+            entries = list(self._entries.items())
+        for key, entry in entries:
+            yield key, json.loads(entry[0])
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._counters)
+            entries = len(self._entries)
+        return self._stats_dict(counters, entries, self.max_entries)
+
+
+class SQLiteCache(BaseCache):
+    """LRU cache stored in an on-disk SQLite file shared by all worker processes.
+
+    Each thread gets its own connection and connections are never reused
+    across a fork. Hit/miss/eviction counters are kept in memory and flushed
+    to the shared ``cache_stats`` table periodically so the numbers cover
+    every worker.
+    """
+    backend = "sqlite"
+    FLUSH_INTERVAL = 5
+    # Bumped whenever the table layout changes; the cache is simply rebuilt
+    SCHEMA_VERSION = 4
+
+    def __init__(self, path, max_entries=5000):
+        super().__init__()
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._last_flush = time.time()
+        self._touched = {}
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._create_tables(self._connection())
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _create_tables(self, conn):
+        if conn.execute('PRAGMA user_version').fetchone()[0] != self.SCHEMA_VERSION:
+            conn.execute('DROP TABLE IF EXISTS cache_entries')
+            conn.execute('DROP TABLE IF EXISTS cache_locks')
+            conn.execute('DROP TABLE IF EXISTS cache_stats')
+            conn.execute('DROP TABLE IF EXISTS rate_limits')
+            conn.execute('DROP TABLE IF EXISTS cache_meta')
+            conn.execute(f'PRAGMA user_version = {self.SCHEMA_VERSION}')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS cache_entries(
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                stored_at REAL NOT NULL,
+                fresh_until REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        ''')
+        conn.execute(
+            'CREATE INDEX IF NOT EXISTS idx_cache_entries_accessed ON cache_entries(accessed_at)'
+        )
+        # Entry count kept up to date by triggers so writes never scan the table
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS cache_meta(
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            )
+        ''')
+        conn.execute('''
+            INSERT OR IGNORE INTO cache_meta (name, value)
+            VALUES ('entries', (SELECT COUNT(*) FROM cache_entries))
+        ''')
+        conn.execute('''
+            CREATE TRIGGER IF NOT EXISTS cache_entries_insert AFTER INSERT ON cache_entries
+            BEGIN
+                UPDATE cache_meta SET value = value + 1 WHERE name = 'entries';
+            END
+        ''')
+        conn.execute('''
+            CREATE TRIGGER IF NOT EXISTS cache_entries_delete AFTER DELETE ON cache_entries
+            BEGIN
+                UPDATE cache_meta SET value = value - 1 WHERE name = 'entries';
+            END
+        ''')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS cache_locks(
+                key TEXT PRIMARY KEY,
+                pid INTEGER NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        ''')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS rate_limits(
+                name TEXT PRIMARY KEY,
+                tokens REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        ''')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS cache_stats(
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+
+    def _count(self, name, amount=1):
+        super()._count(name, amount)
+        if time.time() - self._last_flush >= self.FLUSH_INTERVAL:
+            self._flush()
+
+    def _lookup(self, key, touch):
+        conn = self._connection()
+        now = time.time()
+        row = conn.execute(
+            'SELECT value, stored_at, fresh_until, expires_at FROM cache_entries WHERE key = ?',
+            (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        if row[3] <= now:
+            conn.execute('DELETE FROM cache_entries WHERE key = ?', (key,))
+            return None
+        if touch:
+            self._touch(conn, key, now)
+        return row[:3]
+
+    def _touch(self, conn, key, now):
+        # Hits stay reads: the shared write lock is taken once per key per interval
+        if now - self._touched.get(key, 0) < TOUCH_INTERVAL:
+            return
+        self._touched[key] = now
+        if len(self._touched) > 100000:
+            self._touched = {}
+        conn.execute('UPDATE cache_entries SET accessed_at = ? WHERE key = ?', (now, key))
+
+    def _entry_count(self, conn):
+        return conn.execute("SELECT value FROM cache_meta WHERE name = 'entries'").fetchone()[0]
+
+    def acquire_lock(self, key, ttl):
+        conn = self._connection()
+        now = time.time()
+        # A lock left behind by a crashed worker simply expires
+        conn.execute('DELETE FROM cache_locks WHERE key = ? AND expires_at <= ?', (key, now))
+        try:
+            conn.execute(
+                'INSERT INTO cache_locks (key, pid, expires_at) VALUES (?, ?, ?)',
+                (key, os.getpid(), now + ttl)
+            )
+            return True
+        except sqlite3.IntegrityError:
+            return False
+
+    def release_lock(self, key):
+        self._connection().execute(
+            'DELETE FROM cache_locks WHERE key = ? AND pid = ?', (key, os.getpid())
+        )
+
+    def take_token(self, name, rate, capacity):
+        try:
+            return self._update_bucket(name, rate, capacity, take=True)
+        except sqlite3.Error as e:
+            # Shared bucket unavailable (e.g. locked too long); limit this process alone
+            print(f"Rate limit bucket error: {e}")
+            return super().take_token(name, rate, capacity)
+
+    def pause_tokens(self, name, seconds, rate, capacity):
+        try:
+            self._update_bucket(name, rate, capacity, pause=seconds)
+        except sqlite3.Error as e:
+            print(f"Rate limit bucket error: {e}")
+            super().pause_tokens(name, seconds, rate, capacity)
+
+    def _update_bucket(self, name, rate, capacity, take=False, pause=0):
+        # BEGIN IMMEDIATE serialises bucket updates across worker processes
+        conn = self._connection()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute(
+                'SELECT tokens, updated_at FROM rate_limits WHERE name = ?', (name,)
+            ).fetchone()
+            tokens = capacity if row is None else min(capacity, row[0] + (now - row[1]) * rate)
+            wait = 0
+            if pause:
+                tokens = min(tokens, -pause * rate)
+            elif take:
+                if tokens >= 1:
+                    tokens -= 1
+                else:
+                    wait = (1 - tokens) / rate
+            conn.execute('''
+                INSERT OR REPLACE INTO rate_limits (name, tokens, updated_at) VALUES (?, ?, ?)
+            ''', (name, tokens, now))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return wait
+
+    def set(self, key, value, ttl, stale_ttl=0):
+        conn = self._connection()
+        now = time.time()
+        # An upsert: INSERT OR REPLACE deletes without firing the count trigger
+        conn.execute('''
+            INSERT INTO cache_entries
+                (key, value, stored_at, fresh_until, expires_at, accessed_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(key) DO UPDATE SET
+                value = excluded.value, stored_at = excluded.stored_at,
+                fresh_until = excluded.fresh_until, expires_at = excluded.expires_at,
+                accessed_at = excluded.accessed_at
+        ''', (key, json.dumps(value), now, now + ttl, now + ttl + stale_ttl, now))
+        self._touched[key] = now
+        self._evict(conn, now)
+
+    def _evict(self, conn, now):
+        count = self._entry_count(conn)
+        if count <= self.max_entries:
+            return
+        # Expired entries go first, then the least recently used ones
+        removed = conn.execute(
+            'DELETE FROM cache_entries WHERE expires_at <= ?', (now,)
+        ).rowcount
+        overflow = count - removed - self.max_entries
+        if overflow > 0:
+            conn.execute('''
+                DELETE FROM cache_entries WHERE key IN (
+                    SELECT key FROM cache_entries ORDER BY accessed_at LIMIT ?
+                )
+            ''', (overflow,))
+            self._count('evictions', overflow)
+
+    def delete(self, key):
+        self._connection().execute('DELETE FROM cache_entries WHERE key = ?', (key,))
+
+    def items(self):
+        rows = self._connection().execute('SELECT key, value FROM cache_entries').fetchall()
+        for key, value in rows:
+            yield key, json.loads(value)
+
+    def clear(self):
+        conn = self._connection()
+        conn.execute('DELETE FROM cache_entries')
+        conn.execute('DELETE FROM cache_stats')
+        with self._lock:
+            for name in self._counters:
+                self._counters[name] = 0
+
+    def _flush(self):
+        with self._lock:
+            pending = dict(self._counters)
+            for name in self._counters:
+                self._counters[name] = 0
+            self._last_flush = time.time()
+        conn = self._connection()
+        for name, value in pending.items():
+            if value:
+                conn.execute('''
+                    INSERT INTO cache_stats (name, value) VALUES (?, ?)
+                    ON CONFLICT(name) DO UPDATE SET value = value + excluded.value
+                ''', (name, value))
+
+    def stats(self):
+        self._flush()
+        conn = self._connection()
+        counters = dict.fromkeys(COUNTERS, 0)
+        for name, value in conn.execute('SELECT name, value FROM cache_stats'):
+            counters[name] = value
+        return self._stats_dict(counters, self._entry_count(conn), self.max_entries)
+
+
+def create_cache(config):
+    backend = config.get('TMDB_CACHE_BACKEND', 'sqlite')
+    max_entries = config.get('TMDB_CACHE_MAX_ENTRIES', 5000)
+    if backend == 'sqlite':
+        return SQLiteCache(config['TMDB_CACHE_PATH'], max_entries)
+    if backend == 'memory':
+        return MemoryCache(max_entries)
+    return NullCache()
+
+
+_cache = None
+
+
+def get_cache(config=None):
+    """Get the TMDB response cache for the current app, creating it on first use"""
+    global _cache
+    if _cache is None:
+        if config is None:
+            from flask import current_app
+            config = current_app.config
+        _cache = create_cache(config)
+    return _cache
@@ -0,0 +1,177 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import zlib
+
+from utils.cache import make_cache_key, is_feed_endpoint
+
+MOVIE_DETAILS_ENDPOINT = re.compile(r"^movie/(\d+)$")
+
+
+def _encode(data):
+    return zlib.compress(json.dumps(data, separators=(',', ':')).encode('utf-8'), 6)
+
+
+def _decode(blob):
+    return json.loads(zlib.decompress(blob))
+
+
+class Catalog:
+    """Offline snapshot of TMDB: movie details and category feed pages.
+
+    Filled by `flask ingest-catalog` (services/catalog_ingest.py) and read
+    by TMDBClient, which answers from it first with TMDB_SNAPSHOT_FIRST and
+    falls back to it whenever TMDB fails. Payloads are zlib-compressed JSON
+    in the same slimmed shape the TMDB cache keeps. Ingest progress lives
+    here too, so an interrupted run resumes where it stopped.
+    """
+
+    def __init__(self, path, mmap_size=256 * 1024 * 1024):
+        self.path = path
+        self.mmap_size = mmap_size
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._create_tables(self._connection())
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(f'PRAGMA mmap_size={int(self.mmap_size)}')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _create_tables(self, conn):
+        conn.executescript('''
+            CREATE TABLE IF NOT EXISTS movies(
+                id INTEGER PRIMARY KEY,
+                payload BLOB NOT NULL,
+                fetched_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS pages(
+                key TEXT PRIMARY KEY,
+                payload BLOB NOT NULL,
+                fetched_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS ingest_pending(
+                id INTEGER PRIMARY KEY
+            );
+            CREATE TABLE IF NOT EXISTS ingest_state(
+                name TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+        ''')
+
+    def get(self, endpoint, params=None):
+        """(data, fetched_at) for a movie details or feed page request, or None"""
+        endpoint = endpoint.strip('/')
+        match = MOVIE_DETAILS_ENDPOINT.match(endpoint)
+        if match:
+            return self.get_movie(int(match.group(1)))
+        if not is_feed_endpoint(endpoint):
+            return None
+        row = self._connection().execute(
+            'SELECT payload, fetched_at FROM pages WHERE key = ?', (make_cache_key(endpoint, params),)
+        ).fetchone()
+        return (_decode(row[0]), row[1]) if row else None
+
+    def get_movie(self, movie_id):
+        row = self._connection().execute(
+            'SELECT payload, fetched_at FROM movies WHERE id = ?', (movie_id,)
+        ).fetchone()
+        return (_decode(row[0]), row[1]) if row else None
+
+    def put_page(self, endpoint, params, data, fetched_at):
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO pages (key, payload, fetched_at) VALUES (?, ?, ?)',
+                (make_cache_key(endpoint, params), _encode(data), fetched_at)
+            )
+
+    def store_movies(self, movies, missing, fetched_at):
+        """Save fetched details and drop deleted movies, checking them off the pending list"""
+        conn = self._connection()
+        with conn:
+            conn.executemany(
+                'INSERT OR REPLACE INTO movies (id, payload, fetched_at) VALUES (?, ?, ?)',
+                ((movie_id, _encode(data), fetched_at) for movie_id, data in movies)
+            )
+            conn.executemany('DELETE FROM movies WHERE id = ?', ((i,) for i in missing))
+            done = [(movie_id,) for movie_id, _ in movies] + [(i,) for i in missing]
+            conn.executemany('DELETE FROM ingest_pending WHERE id = ?', done)
+
+    def movies(self):
+        """Every stored movie details payload"""
+        for row in self._connection().execute('SELECT payload FROM movies'):
+            yield _decode(row[0])
+
+    def movie_ids(self):
+        return {row[0] for row in self._connection().execute('SELECT id FROM movies')}
+
+    def add_pending(self, ids):
+        conn = self._connection()
+        with conn:
+            conn.executemany('INSERT OR IGNORE INTO ingest_pending (id) VALUES (?)', ((i,) for i in ids))
+
+    def pending_after(self, after_id, limit):
+        return [row[0] for row in self._connection().execute(
+            'SELECT id FROM ingest_pending WHERE id > ? ORDER BY id LIMIT ?', (after_id, limit)
+        )]
+
+    def pending_count(self):
+        return self._connection().execute('SELECT COUNT(*) FROM ingest_pending').fetchone()[0]
+
+    def clear_pending(self):
+        conn = self._connection()
+        with conn:
+            conn.execute('DELETE FROM ingest_pending')
+
+    def get_state(self, name, default=None):
+        row = self._connection().execute(
+            'SELECT value FROM ingest_state WHERE name = ?', (name,)
+        ).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set_state(self, name, value):
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO ingest_state (name, value) VALUES (?, ?)', (name, json.dumps(value))
+            )
+
+    def stats(self):
+        conn = self._connection()
+        return {
+            "movies": conn.execute('SELECT COUNT(*) FROM movies').fetchone()[0],
+            "pages": conn.execute('SELECT COUNT(*) FROM pages').fetchone()[0],
+            "pending": self.pending_count(),
+            "size_bytes": sum(
+                os.path.getsize(p) for p in (self.path, self.path + '-wal') if os.path.exists(p)
+            ),
+            "last_ingest": self.get_state('last_ingest'),
+            "changes_synced_to": self.get_state('changes_synced_to')
+        }
+
+
+_catalog = None
+
+
+def get_catalog(config=None):
+    """Get the catalog snapshot, or None when CATALOG_ENABLED is off"""
+    global _catalog
+    if config is None:
+        from flask import current_app
+        config = current_app.config
+    if not config.get('CATALOG_ENABLED', True) or not config.get('CATALOG_PATH'):
+        return None
+    if _catalog is None:
+        _catalog = Catalog(config['CATALOG_PATH'])
+    return _catalog
@@ -0,0 +1,293 @@
+import io
+import os
+import re
+import sqlite3
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from utils.api_client import SingleFlight
+
+try:
+    from PIL import Image
+except ImportError:  # optional; without it thumbnail sizes get the next TMDB size up
+    Image = None
+
+TMDB_IMAGE_URL = "https://image.tmdb.org/t/p"
+
+# Sizes TMDB serves for posters, backdrops and profiles, smallest first
+TMDB_SIZES = ('w45', 'w92', 'w154', 'w185', 'w300', 'w342', 'w500', 'w780', 'w1280', 'original')
+
+# TMDB image paths are a single file name
+# Raster formats only: an SVG served from our origin could carry script
+IMAGE_NAME_RE = re.compile(r"^[A-Za-z0-9_-]{1,100}\.(jpg|jpeg|png|webp)$")
+
+MIMETYPES = {
+    'jpg': 'image/jpeg', 'jpeg': 'image/jpeg', 'png': 'image/png',
+    'webp': 'image/webp'
+}
+
+# An image's last access is written back at most this often
+TOUCH_INTERVAL = 60
+
+# Eviction frees space down to this share of max_bytes
+EVICT_TO = 0.9
+
+# Largest TMDB image we are willing to store
+MAX_IMAGE_BYTES = 20 * 1024 * 1024
+
+# TMDB 404s are remembered this long, per process, so made-up paths stay local
+MISS_TTL = 5 * 60
+MAX_MISSES = 10000
+
+
+class ImageFetchError(Exception):
+    """TMDB's image server failed or answered with an error other than 404"""
+
+
+def _width(size):
+    return int(size[1:]) if size.startswith('w') and size[1:].isdigit() else None
+
+
+def mimetype_for(name):
+    return MIMETYPES[name.rsplit('.', 1)[1].lower()]
+
+
+class ImageCache:
+    """TMDB posters and backdrops kept in a size-bounded on-disk LRU.
+
+    Files live under `directory/<size>/`, and an SQLite index next to them
+    holds their sizes and last access so all workers share one byte budget;
+    once it is exceeded the least recently used files are deleted. Files
+    are written to a temporary name and renamed into place, so readers only
+    ever see complete images. `thumbnail_widths` are extra sizes resized
+    locally with Pillow from the next TMDB size up (or served as that size
+    when Pillow is not installed).
+    """
+
+    def __init__(self, directory, max_bytes=512 * 1024 * 1024, base_url=TMDB_IMAGE_URL,
+                 thumbnail_widths=(), timeout=(3.05, 10), pool_size=10):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.thumbnails = {f"w{width}" for width in thumbnail_widths} - set(TMDB_SIZES)
+        self.sizes = set(TMDB_SIZES) | self.thumbnails
+        self._local = threading.local()
+        self._touched = {}
+        self._not_found = {}  # key -> time.monotonic() when TMDB said 404
+        self._counters = {"hits": 0, "misses": 0, "evicted": 0, "not_found_hits": 0}
+        self._lock = threading.Lock()
+        self.inflight = SingleFlight()
+        os.makedirs(directory, exist_ok=True)
+        self.session = requests.Session()
+        self.session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+        self.session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+        self._create_tables(self._connection())
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(os.path.join(self.directory, 'index.db'), timeout=5)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _create_tables(self, conn):
+        conn.executescript('''
+            CREATE TABLE IF NOT EXISTS images(
+                key TEXT PRIMARY KEY,
+                bytes INTEGER NOT NULL,
+                accessed_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_images_accessed_at ON images(accessed_at);
+            CREATE TABLE IF NOT EXISTS usage(
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                bytes INTEGER NOT NULL
+            );
+            INSERT OR IGNORE INTO usage (id, bytes) VALUES (1, 0);
+        ''')
+
+    def file_path(self, size, name):
+        return os.path.join(self.directory, size, name[:2], name)
+
+    def get(self, size, name):
+        """Local file for an image, fetching it on first use; None when TMDB has no such image.
+
+        Raises ValueError for sizes and names we do not proxy and
+        ImageFetchError when TMDB fails.
+        """
+        if size not in self.sizes:
+            raise ValueError(f"Unsupported image size: {size}")
+        if not IMAGE_NAME_RE.match(name):
+            raise ValueError("Invalid image path")
+        if size in self.thumbnails and Image is None:
+            size = self._source_size(size)
+        path = self.file_path(size, name)
+        if os.path.exists(path):
+            self._count('hits')
+            self._touch(f"{size}/{name}")
+            return path
+        key = f"{size}/{name}"
+        if time.monotonic() - self._not_found.get(key, -MISS_TTL) < MISS_TTL:
+            self._count('not_found_hits')
+            return None
+        self._count('misses')
+        # Concurrent requests for the same image in this process share one fetch
+        path, _ = self.inflight.do(key, lambda: self._load(size, name, path))
+        if path is None:
+            if len(self._not_found) >= MAX_MISSES:
+                self._not_found = {}
+            self._not_found[key] = time.monotonic()
+        return path
+
+    def _load(self, size, name, path):
+        if os.path.exists(path):
+            return path
+        if size in self.thumbnails:
+            source = self.get(self._source_size(size), name)
+            if source is None:
+                return None
+            data = self._resize(source, _width(size), name)
+        else:
+            data = self._download(size, name)
+            if data is None:
+                return None
+        self._store(f"{size}/{name}", path, data)
+        return path
+
+    def _source_size(self, size):
+        """Smallest TMDB size at least as wide as a thumbnail size"""
+        width = _width(size)
+        for candidate in TMDB_SIZES:
+            if _width(candidate) is None or _width(candidate) >= width:
+                return candidate
+        return 'original'
+
+    def _download(self, size, name):
+        try:
+            response = self.session.get(f"{self.base_url}/{size}/{name}", timeout=self.timeout, stream=True)
+        except requests.exceptions.RequestException as e:
+            raise ImageFetchError(f"Image fetch failed: {e}")
+        with response:
+            if response.status_code == 404:
+                return None
+            if response.status_code >= 400:
+                raise ImageFetchError(f"{response.status_code} Error from TMDB for image {size}/{name}")
+            data = response.raw.read(MAX_IMAGE_BYTES + 1, decode_content=True)
+        if len(data) > MAX_IMAGE_BYTES:
+            raise ImageFetchError(f"Image {size}/{name} is too large")
+        return data
+
+    def _resize(self, source, width, name):
+        try:
+            with Image.open(source) as image:
+                if image.width <= width:
+                    with open(source, 'rb') as f:
+                        return f.read()
+                height = max(1, round(image.height * width / image.width))
+                thumbnail = image.resize((width, height), Image.LANCZOS)
+                output = io.BytesIO()
+                if mimetype_for(name) == 'image/jpeg':
+                    thumbnail.convert('RGB').save(output, 'JPEG', quality=80, optimize=True, progressive=True)
+                else:
+                    thumbnail.save(output, image.format)
+                return output.getvalue()
+        except (OSError, ValueError, Image.DecompressionBombError) as e:
+            # UnidentifiedImageError is an OSError: TMDB sent something we cannot decode
+            raise ImageFetchError(f"Image {name} could not be resized: {e}")
+
+    def _store(self, key, path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporary, 'wb') as f:
+            f.write(data)
+        os.replace(temporary, path)
+        conn = self._connection()
+        with conn:
+            previous = conn.execute('SELECT bytes FROM images WHERE key = ?', (key,)).fetchone()
+            conn.execute(
+                'INSERT OR REPLACE INTO images (key, bytes, accessed_at) VALUES (?, ?, ?)',
+                (key, len(data), time.time())
+            )
+            conn.execute(
+                'UPDATE usage SET bytes = bytes + ? WHERE id = 1',
+                (len(data) - (previous[0] if previous else 0),)
+            )
+            used = conn.execute('SELECT bytes FROM usage WHERE id = 1').fetchone()[0]
+        if used > self.max_bytes:
+            self._evict(used)
+
+    def _evict(self, used):
+        conn = self._connection()
+        target = used - int(self.max_bytes * EVICT_TO)
+        freed = 0
+        victims = []
+        for key, size in conn.execute('SELECT key, bytes FROM images ORDER BY accessed_at'):
+            victims.append((key, size))
+            freed += size
+            if freed >= target:
+                break
+        with conn:
+            for key, size in victims:
+                # Another worker may be evicting the same rows
+                if conn.execute('DELETE FROM images WHERE key = ?', (key,)).rowcount:
+                    conn.execute('UPDATE usage SET bytes = bytes - ? WHERE id = 1', (size,))
+        for key, _ in victims:
+            size, name = key.split('/', 1)
+            try:
+                os.remove(self.file_path(size, name))
+            except OSError:
+                pass
+        self._count('evicted', len(victims))
+
+    def _touch(self, key):
+        now = time.time()
+        if now - self._touched.get(key, 0) < TOUCH_INTERVAL:
+            return
+        self._touched[key] = now
+        if len(self._touched) > 100000:
+            self._touched = {}
+        conn = self._connection()
+        with conn:
+            conn.execute('UPDATE images SET accessed_at = ? WHERE key = ?', (now, key))
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._counters[name] += amount
+
+    def stats(self):
+        conn = self._connection()
+        with self._lock:
+            counters = dict(self._counters)
+        return dict(
+            counters,
+            images=conn.execute('SELECT COUNT(*) FROM images').fetchone()[0],
+            bytes=conn.execute('SELECT bytes FROM usage WHERE id = 1').fetchone()[0],
+            max_bytes=self.max_bytes,
+            thumbnails=sorted(self.thumbnails, key=_width),
+            resizing=Image is not None
+        )
+
+
+_image_cache = None
+
+
+def get_image_cache(config=None):
+    global _image_cache
+    if config is None:
+        from flask import current_app
+        config = current_app.config
+    if _image_cache is None:
+        _image_cache = ImageCache(
+            config['IMAGE_CACHE_DIR'],
+            max_bytes=config.get('IMAGE_CACHE_MAX_BYTES', 512 * 1024 * 1024),
+            base_url=config.get('IMAGE_BASE_URL') or TMDB_IMAGE_URL,
+            thumbnail_widths=config.get('IMAGE_THUMBNAIL_WIDTHS', ()),
+            timeout=(config.get('TMDB_CONNECT_TIMEOUT', 3.05), config.get('TMDB_READ_TIMEOUT', 10))
+        )
+    return _image_cache
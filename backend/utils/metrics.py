@@ -0,0 +1,338 @@
+import bisect
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from flask import request
+
+# Upper bounds in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.1, 0.5)
+
+Metric = namedtuple('Metric', ['kind', 'help', 'labels', 'buckets'])
+
+METRICS = {
+    'http_request_duration_seconds': Metric(
+        'histogram', "Time spent handling requests, by Flask route",
+        ('method', 'route', 'status'), LATENCY_BUCKETS),
+    'http_requests_in_flight': Metric(
+        'gauge', "Requests being handled right now", (), None),
+    'tmdb_request_duration_seconds': Metric(
+        'histogram', "TMDB API calls (each retry counts), by endpoint",
+        ('endpoint', 'status'), LATENCY_BUCKETS),
+    'tmdb_requests_in_flight': Metric(
+        'gauge', "TMDB API calls waiting for a response", (), None),
+    'sqlite_query_duration_seconds': Metric(
+        'histogram', "App database statements until the first row is ready",
+        ('statement', 'table'), QUERY_BUCKETS),
+    'recommendation_ranking_duration_seconds': Metric(
+        'histogram', "Time to re-rank the /recommendations lists, full or incremental",
+        ('mode',), LATENCY_BUCKETS),
+    'response_cache_hits_total': Metric(
+        'counter', "Responses served from pre-encoded bodies", (), None),
+    'response_cache_misses_total': Metric(
+        'counter', "Response cache lookups that had to build the body", (), None),
+    'response_cache_bytes_sent_total': Metric(
+        'counter', "Bytes of cached response bodies sent", (), None),
+    'tmdb_cache_hits_total': Metric('counter', "Fresh TMDB cache hits", (), None),
+    'tmdb_cache_stale_hits_total': Metric('counter', "Stale TMDB cache hits served while refreshing", (), None),
+    'tmdb_cache_misses_total': Metric('counter', "TMDB cache misses", (), None),
+    'tmdb_cache_evictions_total': Metric('counter', "Entries evicted from the TMDB cache", (), None),
+    'tmdb_cache_coalesced_total': Metric('counter', "Upstream calls avoided by request coalescing", (), None),
+    'tmdb_cache_entries': Metric('gauge', "Entries in the TMDB cache", (), None),
+    'tmdb_cache_hit_ratio': Metric('gauge', "Share of TMDB cache lookups served from cache", (), None),
+}
+
+# Rows of processes that stopped flushing this long ago are folded into pid 0
+RETIRE_AFTER = 60
+
+
+def _add_series(totals, series):
+    for key, values in list(series.items()):
+        total = totals.get(key)
+        if total is None:
+            totals[key] = list(values)
+        else:
+            for i, value in enumerate(values):
+                total[i] += value
+
+
+class Metrics:
+    """Latency histograms, counters and gauges for every worker process.
+
+    Recording never takes a lock: each thread adds to its own dict of
+    series and nothing is ever reset, so summing the threads can at worst
+    miss an observation that is being written. A daemon thread stores the
+    process totals in a SQLite file shared by all workers every
+    `flush_interval` seconds; render() adds up the rows of every process.
+    """
+
+    def __init__(self, path=None, flush_interval=5, enabled=True):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.enabled = enabled
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._threads = []  # (thread, series dict) per live recording thread
+        self._retired = {}  # totals of recording threads that have exited
+        self._collectors = []
+        self._pid = os.getpid()
+        self._flusher = None
+
+    def configure(self, path, flush_interval=5, enabled=True):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.enabled = enabled
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = self._connect()
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS metric_samples(
+                    pid INTEGER NOT NULL,
+                    name TEXT NOT NULL,
+                    labels TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (pid, name, labels)
+                )
+            ''')
+            conn.close()
+
+    def register_collector(self, collect):
+        """`collect()` returns (name, labels, value) samples of this process, read at flush"""
+        self._collectors.append(collect)
+
+    def _series(self):
+        series = getattr(self._local, 'series', None)
+        if series is None or self._local.pid != os.getpid():
+            series = self._local.series = {}
+            self._local.pid = os.getpid()
+            with self._lock:
+                if self._pid != os.getpid():
+                    # Forked: the parent's numbers are the parent's
+                    self._threads = []
+                    self._retired = {}
+                    self._flusher = None
+                    self._pid = os.getpid()
+                self._threads.append((threading.current_thread(), series))
+                if len(self._threads) % 64 == 0:
+                    self._retire_threads()
+                if self._flusher is None and self.path:
+                    self._flusher = threading.Thread(target=self._run, name="metrics-flush", daemon=True)
+                    self._flusher.start()
+        return series
+
+    def _retire_threads(self):
+        """Fold the series of exited threads into one total (caller holds the lock)"""
+        live = []
+        for thread, series in self._threads:
+            if thread.is_alive():
+                live.append((thread, series))
+            else:
+                _add_series(self._retired, series)
+        self._threads = live
+
+    def observe(self, name, labels, seconds):
+        if not self.enabled:
+            return
+        series = self._series()
+        values = series.get((name, labels))
+        if values is None:
+            # One slot per bucket, then +Inf, then the running sum
+            values = series[(name, labels)] = [0] * (len(METRICS[name].buckets) + 2)
+        values[bisect.bisect_left(METRICS[name].buckets, seconds)] += 1
+        values[-1] += seconds
+
+    def inc(self, name, labels=(), amount=1):
+        if not self.enabled:
+            return
+        series = self._series()
+        values = series.get((name, labels))
+        if values is None:
+            values = series[(name, labels)] = [0]
+        values[0] += amount
+
+    def snapshot(self):
+        """This process's totals: {(name, labels): values}"""
+        with self._lock:
+            self._retire_threads()
+            live = list(self._threads)
+            totals = {key: list(values) for key, values in self._retired.items()}
+        for _, series in live:
+            _add_series(totals, series)
+        for collect in self._collectors:
+            try:
+                for name, labels, value in collect():
+                    totals[(name, labels)] = [value]
+            except Exception as e:
+                print(f"Metrics collector error: {e}")
+        return totals
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def flush(self):
+        if not self.path:
+            return
+        now = time.time()
+        rows = [
+            (os.getpid(), name, json.dumps(labels), json.dumps(values), now)
+            for (name, labels), values in self.snapshot().items()
+        ]
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.executemany('''
+                INSERT OR REPLACE INTO metric_samples (pid, name, labels, value, updated_at)
+                VALUES (?, ?, ?, ?, ?)
+            ''', rows)
+            self._retire(conn, now)
+            conn.execute('COMMIT')
+        except Exception:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+
+    def _retire(self, conn, now):
+        """Fold the rows of workers that have exited into pid 0 so counters keep growing"""
+        stale = conn.execute(
+            'SELECT pid, name, labels, value FROM metric_samples WHERE pid != 0 AND updated_at < ?',
+            (now - max(RETIRE_AFTER, self.flush_interval * 3),)
+        ).fetchall()
+        for pid, name, labels, value in stale:
+            conn.execute('DELETE FROM metric_samples WHERE pid = ? AND name = ? AND labels = ?',
+                         (pid, name, labels))
+            if name not in METRICS or METRICS[name].kind == 'gauge':
+                continue
+            row = conn.execute('SELECT value FROM metric_samples WHERE pid = 0 AND name = ? AND labels = ?',
+                               (name, labels)).fetchone()
+            values = json.loads(value)
+            if row is not None:
+                values = [a + b for a, b in zip(json.loads(row[0]), values)]
+            conn.execute('''
+                INSERT OR REPLACE INTO metric_samples (pid, name, labels, value, updated_at)
+                VALUES (0, ?, ?, ?, ?)
+            ''', (name, labels, json.dumps(values), now))
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Metrics flush error: {e}")
+
+    def collect(self):
+        """Totals across all worker processes (just this one without a shared file)"""
+        if not self.path:
+            return self.snapshot()
+        self.flush()
+        conn = self._connect()
+        rows = conn.execute('SELECT name, labels, value, updated_at FROM metric_samples').fetchall()
+        conn.close()
+        # A gauge only means something while its process is still reporting
+        live_since = time.time() - self.flush_interval * 3
+        totals = {}
+        for name, labels, value, updated_at in rows:
+            if name in METRICS and METRICS[name].kind == 'gauge' and updated_at < live_since:
+                continue
+            key = (name, tuple(json.loads(labels)))
+            values = json.loads(value)
+            if key in totals:
+                values = [a + b for a, b in zip(totals[key], values)]
+            totals[key] = values
+        return totals
+
+    def render(self, extra=()):
+        """Prometheus text exposition of collect() plus already-aggregated `extra` samples"""
+        totals = self.collect()
+        for name, labels, value in extra:
+            totals[(name, labels)] = [value]
+        lines = []
+        for name, metric in METRICS.items():
+            samples = sorted((labels, values) for (n, labels), values in totals.items() if n == name)
+            if not samples:
+                continue
+            lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            for labels, values in samples:
+                pairs = list(zip(metric.labels, labels))
+                if metric.kind != 'histogram':
+                    lines.append(f"{name}{_format_labels(pairs)} {_format_value(values[0])}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(metric.buckets + ('+Inf',), values[:-1]):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(pairs + [('le', bound)])} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(pairs)} {_format_value(values[-1])}")
+                lines.append(f"{name}_count{_format_labels(pairs)} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(pairs):
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in pairs) + "}"
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def cache_samples(stats):
+    """Samples for the TMDB cache stats, already shared across workers by the sqlite backend"""
+    return [
+        ('tmdb_cache_hits_total', (), stats['hits']),
+        ('tmdb_cache_stale_hits_total', (), stats['stale_hits']),
+        ('tmdb_cache_misses_total', (), stats['misses']),
+        ('tmdb_cache_evictions_total', (), stats['evictions']),
+        ('tmdb_cache_coalesced_total', (), stats['coalesced']),
+        ('tmdb_cache_entries', (), stats['entries']),
+        ('tmdb_cache_hit_ratio', (), stats['hit_ratio']),
+    ]
+
+
+# Shared by the whole process; app.py points it at the metrics file
+metrics = Metrics()
+
+
+def instrument_app(app):
+    """Time every request by its URL rule and count requests in flight"""
+
+    def finish(req, status):
+        started = req.environ.pop('metrics.started', None)
+        if started is None:
+            return
+        metrics.inc('http_requests_in_flight', amount=-1)
+        route = req.url_rule.rule if req.url_rule is not None else "unmatched"
+        metrics.observe('http_request_duration_seconds', (req.method, route, str(status)),
+                        time.perf_counter() - started)
+
+    @app.before_request
+    def start_request_timer():
+        request.environ['metrics.started'] = time.perf_counter()
+        metrics.inc('http_requests_in_flight')
+
+    @app.after_request
+    def observe_request(response):
+        # One proxy lookup; every attribute access through `request` costs one
+        finish(request._get_current_object(), response.status_code)
+        return response
+
+    @app.teardown_request
+    def observe_failed_request(exception=None):
+        # Only still pending when after_request never ran
+        finish(request._get_current_object(), 500)
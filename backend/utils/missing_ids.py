@@ -0,0 +1,120 @@
+import glob
+import mmap
+import os
+import threading
+import time
+
+# Movie ids covered by the bitmap (one bit each, 256KB per file)
+DEFAULT_CAPACITY = 1 << 21
+
+
+class MissingIds:
+    """Bitmap of movie ids TMDB answered 404 for, shared by all worker processes.
+
+    Bits live in memory-mapped files next to the TMDB cache, so a bot
+    walking sequential ids costs one upstream call per id across the whole
+    deployment rather than per worker, and can never push real entries out
+    of the cache. Ids are remembered for one to two `ttl` periods: each
+    period writes a new file and lookups check the current and previous one.
+    """
+
+    def __init__(self, path, ttl=3600, capacity=DEFAULT_CAPACITY):
+        self.path = path
+        self.ttl = ttl
+        self.capacity = capacity
+        self._maps = {}
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "marked": 0}
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _epoch(self):
+        return int(time.time() // self.ttl)
+
+    def _map(self, epoch, create):
+        with self._lock:
+            if self._pid != os.getpid():
+                # Mappings survive a fork, but start clean in each worker anyway
+                self._maps = {}
+                self._pid = os.getpid()
+            bitmap = self._maps.get(epoch)
+            if bitmap is not None:
+                return bitmap
+            path = f"{self.path}.{epoch}"
+            if not create and not os.path.exists(path):
+                return None
+            size = self.capacity // 8
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                if os.fstat(fd).st_size < size:
+                    os.ftruncate(fd, size)
+                bitmap = mmap.mmap(fd, size)
+            finally:
+                os.close(fd)
+            self._maps[epoch] = bitmap
+            for old in [e for e in self._maps if e < epoch - 1]:
+                self._maps.pop(old).close()
+            if create:
+                self._remove_old_files(epoch)
+            return bitmap
+
+    def _remove_old_files(self, epoch):
+        for path in glob.glob(f"{self.path}.*"):
+            suffix = path.rsplit('.', 1)[1]
+            if suffix.isdigit() and int(suffix) < epoch - 1:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def contains(self, movie_id):
+        if not 0 < movie_id < self.capacity:
+            return False
+        byte, mask = movie_id >> 3, 1 << (movie_id & 7)
+        epoch = self._epoch()
+        for e in (epoch, epoch - 1):
+            bitmap = self._map(e, create=False)
+            if bitmap is not None and bitmap[byte] & mask:
+                with self._lock:
+                    self._counters["hits"] += 1
+                return True
+        return False
+
+    def add(self, movie_id):
+        """Remember a missing id; False when it is outside the bitmap"""
+        if not 0 < movie_id < self.capacity:
+            return False
+        byte, mask = movie_id >> 3, 1 << (movie_id & 7)
+        bitmap = self._map(self._epoch(), create=True)
+        # A racing writer in another process can drop this bit; that only
+        # costs one more upstream call
+        bitmap[byte] |= mask
+        with self._lock:
+            self._counters["marked"] += 1
+        return True
+
+    def clear(self):
+        with self._lock:
+            for bitmap in self._maps.values():
+                bitmap.close()
+            self._maps = {}
+        for path in glob.glob(f"{self.path}.*"):
+            os.remove(path)
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counters, ttl=self.ttl, capacity=self.capacity)
+
+
+def create_missing_ids(config):
+    """The shared bitmap, or None when the cache is not shared (memory/none backends)"""
+    if config.get('TMDB_CACHE_BACKEND', 'sqlite') != 'sqlite':
+        return None
+    path = config.get('TMDB_MISSING_IDS_PATH')
+    if not path and config.get('TMDB_CACHE_PATH'):
+        path = config['TMDB_CACHE_PATH'] + '.missing'
+    if not path:
+        return None
+    return MissingIds(path, ttl=config.get('TMDB_NEGATIVE_TTL', 3600))
@@ -0,0 +1,80 @@
+import base64
+import json
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(values):
+    """Opaque cursor holding the sort key of the last row on a page"""
+    raw = json.dumps(list(values), separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, size):
+    """Sort key from a cursor made by encode_cursor, or ValueError"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Invalid cursor")
+    # Sort keys are timestamps and ids; anything else cannot have come from us
+    if not all(isinstance(v, (str, int)) and not isinstance(v, bool) for v in values):
+        raise ValueError("Invalid cursor")
+    return tuple(values)
+
+
+def limit_arg(args, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    """`limit` from request args clamped to 1..maximum; ValueError when not an integer"""
+    value = args.get('limit')
+    if value is None or value == '':
+        return default
+    try:
+        limit = int(value)
+    except ValueError:
+        raise ValueError("limit must be an integer")
+    return max(1, min(limit, maximum))
+
+
+def page_number_arg(args, maximum):
+    """`page` from request args, default 1; ValueError unless an integer in 1..maximum"""
+    value = args.get('page')
+    if value is None or value == '':
+        return 1
+    try:
+        page = int(value)
+    except ValueError:
+        raise ValueError("page must be an integer")
+    if not 1 <= page <= maximum:
+        raise ValueError(f"page must be between 1 and {maximum}")
+    return page
+
+
+def page_args(args, key_size=2):
+    """(limit, after) from request args; raises ValueError on a bad limit or cursor"""
+    limit = limit_arg(args)
+    cursor = args.get('cursor')
+    return limit, decode_cursor(cursor, key_size) if cursor else None
+
+
+def parse_active(value, default=True):
+    """`is_active` filter: '1'/'true' -> True, '0'/'false' -> False, 'all' -> None"""
+    if value is None or value == '':
+        return default
+    value = value.lower()
+    if value == 'all':
+        return None
+    if value in ('1', 'true'):
+        return True
+    if value in ('0', 'false'):
+        return False
+    raise ValueError("is_active must be 1, 0 or all")
+
+
+def next_cursor(rows, limit, *columns):
+    """Cursor after the last of `limit` rows, or None when `rows` (fetched limit+1) has no more"""
+    if len(rows) <= limit:
+        return None
+    last = rows[limit - 1]
+    return encode_cursor(last[column] for column in columns)
@@ -0,0 +1,94 @@
+import re
+from utils.search_index import MOVIE_FIELDS
+
+# What a movie card in the frontend needs; the default for list endpoints
+CARD_FIELDS = (
+    'id', 'title', 'overview', 'poster_path', 'backdrop_path', 'release_date',
+    'vote_average', 'genre_ids'
+)
+
+# List items as stored in the TMDB cache: enough for any projection we serve
+# and for rebuilding the search index from the cache
+STORED_ITEM_FIELDS = MOVIE_FIELDS + ('media_type',)
+
+# How much of the appended responses the details endpoint keeps
+MAX_CAST = 10
+MAX_CREW = 5
+MAX_VIDEOS = 3
+MAX_SIMILAR = 6
+CAST_FIELDS = ('id', 'name', 'character', 'profile_path')
+CREW_FIELDS = ('id', 'name', 'job', 'department')
+VIDEO_FIELDS = ('key', 'name', 'site', 'type')
+
+# Upper bound on names accepted in ?fields=
+MAX_FIELDS = 30
+
+FIELD_NAME_RE = re.compile(r"^[a-z_]+$")
+MOVIE_DETAILS_RE = re.compile(r"^movie/\d+$")
+
+
+def parse_fields(value, default=CARD_FIELDS):
+    """Field names from a ?fields= argument.
+
+    Missing or empty gives `default`; "all" gives None (no projection).
+    Raises ValueError on malformed input.
+    """
+    if value is None or not value.strip():
+        return default
+    if value.strip() == 'all':
+        return None
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    if len(names) > MAX_FIELDS:
+        raise ValueError(f"At most {MAX_FIELDS} fields")
+    for name in names:
+        if not FIELD_NAME_RE.match(name):
+            raise ValueError(f"Invalid field name: {name}")
+    return tuple(dict.fromkeys(names))
+
+
+def fields_key(fields):
+    """Stable cache-key component for a projection"""
+    return 'all' if fields is None else ','.join(sorted(fields))
+
+
+def project(item, fields):
+    if fields is None or not isinstance(item, dict):
+        return item
+    return {name: item[name] for name in fields if name in item}
+
+
+def project_page(data, fields):
+    """Project every item of a TMDB-shaped results page, keeping paging info"""
+    if fields is None or not isinstance(data, dict) or 'results' not in data:
+        return data
+    return dict(data, results=[project(item, fields) for item in data['results'] or []])
+
+
+def slim_movie_details(data):
+    """Drop the parts of appended credits/videos/similar the API never serves"""
+    data = dict(data)
+    credits = data.get('credits')
+    if isinstance(credits, dict):
+        data['credits'] = {
+            'cast': [project(p, CAST_FIELDS) for p in (credits.get('cast') or [])[:MAX_CAST]],
+            'crew': [project(p, CREW_FIELDS) for p in (credits.get('crew') or [])[:MAX_CREW]]
+        }
+    videos = data.get('videos')
+    if isinstance(videos, dict):
+        youtube = [v for v in videos.get('results') or [] if v.get('site') == 'YouTube']
+        data['videos'] = {'results': [project(v, VIDEO_FIELDS) for v in youtube[:MAX_VIDEOS]]}
+    similar = data.get('similar')
+    if isinstance(similar, dict):
+        data['similar'] = {
+            'results': [project(m, STORED_ITEM_FIELDS) for m in (similar.get('results') or [])[:MAX_SIMILAR]]
+        }
+    return data
+
+
+def slim_payload(endpoint, data):
+    """The part of a TMDB response worth keeping in the cache"""
+    if not isinstance(data, dict) or 'error' in data:
+        return data
+    if MOVIE_DETAILS_RE.match(endpoint.strip('/')):
+        return slim_movie_details(data)
+    return project_page(data, STORED_ITEM_FIELDS)
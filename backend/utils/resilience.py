@@ -0,0 +1,146 @@
+import random
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+
+
+class TokenBucket:
+    """In-process token bucket allowing `rate` calls per second, bursting to `capacity`"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(1, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self):
+        """Take a token; returns 0 on success or the seconds to wait for the next one"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self):
+        while True:
+            wait = self.try_acquire()
+            if not wait:
+                return
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """Hand out no tokens for the next `seconds` (e.g. after a 429 Retry-After)"""
+        with self._lock:
+            self.tokens = min(self.tokens, -seconds * self.rate)
+            self.updated = time.monotonic()
+
+
+def backoff_delay(attempt, base=0.25, cap=4.0):
+    """Exponential backoff with full jitter"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def parse_retry_after(value):
+    """Seconds from a Retry-After header (delta-seconds or HTTP-date), or None"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class CircuitBreaker:
+    """Fails fast once the upstream error rate crosses a threshold.
+
+    closed: calls flow and outcomes are tracked over a sliding window.
+    open: calls are rejected until `cooldown` seconds have passed.
+    half_open: a single probe call is let through; success closes the
+    circuit, failure opens it again.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_ratio=0.5, min_calls=10, window=30, cooldown=15):
+        self.failure_ratio = failure_ratio
+        self.min_calls = min_calls
+        self.window = window
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.opened_at = 0
+        self.times_opened = 0
+        self._events = deque()
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.cooldown:
+                    return False
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self.state == self.HALF_OPEN:
+                if self._probe_in_flight:
+                    return False
+                self._probe_in_flight = True
+            return True
+
+    def retry_after(self):
+        """Seconds until the next probe may be let through (0 unless open)"""
+        with self._lock:
+            if self.state != self.OPEN:
+                return 0
+            return max(0.0, self.cooldown - (time.monotonic() - self.opened_at))
+
+    def record_success(self):
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self.state = self.CLOSED
+                self._events.clear()
+            self._record(True)
+
+    def record_failure(self):
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._open()
+                return
+            self._record(False)
+            failures = sum(1 for _, ok in self._events if not ok)
+            if (len(self._events) >= self.min_calls
+                    and failures / len(self._events) >= self.failure_ratio):
+                self._open()
+
+    def _record(self, ok):
+        now = time.monotonic()
+        self._events.append((now, ok))
+        while self._events and self._events[0][0] < now - self.window:
+            self._events.popleft()
+
+    def _open(self):
+        self.state = self.OPEN
+        self.opened_at = time.monotonic()
+        self.times_opened += 1
+        self._events.clear()
+        self._probe_in_flight = False
+
+    def stats(self):
+        with self._lock:
+            calls = len(self._events)
+            failures = sum(1 for _, ok in self._events if not ok)
+            return {
+                "state": self.state,
+                "window_calls": calls,
+                "window_failures": failures,
+                "times_opened": self.times_opened
+            }
@@ -0,0 +1,194 @@
+import gzip
+import hashlib
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from flask import current_app, g, jsonify, request
+from utils.metrics import metrics
+
+try:
+    import brotli
+except ImportError:  # optional; gzip is always available
+    brotli = None
+
+# Bodies smaller than this are not worth compressing
+MIN_COMPRESS_SIZE = 512
+
+# identity/gzip/br bytes of one JSON body; compressed variants are None when skipped
+EncodedBody = namedtuple('EncodedBody', ['identity', 'gzip', 'br', 'etag', 'encode_time'])
+
+
+def encode_body(data):
+    """Serialize `data` once and pre-compress it for every encoding we serve"""
+    start = time.perf_counter()
+    identity = current_app.json.dumps(data).encode('utf-8')
+    gzipped = compressed_br = None
+    if len(identity) >= MIN_COMPRESS_SIZE:
+        gzipped = gzip.compress(identity, compresslevel=6, mtime=0)
+        if brotli is not None:
+            compressed_br = brotli.compress(identity, quality=5)
+    etag = hashlib.sha1(identity).hexdigest()
+    return EncodedBody(identity, gzipped, compressed_br, etag, time.perf_counter() - start)
+
+
+def choose_encoding(body):
+    """Best variant of `body` for the request's Accept-Encoding"""
+    offered = [name for name in ('br', 'gzip') if getattr(body, name) is not None]
+    if not offered:
+        return 'identity'
+    return request.accept_encodings.best_match(offered + ['identity'], default='identity')
+
+
+def send_encoded(body, status=200):
+    """Response for an EncodedBody: no serialization, just the stored bytes"""
+    encoding = choose_encoding(body)
+    data = body.identity if encoding == 'identity' else getattr(body, encoding)
+    response = current_app.response_class(data, status=status, mimetype='application/json')
+    response.vary.add('Accept-Encoding')
+    if encoding != 'identity':
+        response.content_encoding = encoding
+    # Each encoding is a different byte sequence, so each needs its own strong ETag
+    response.set_etag(body.etag if encoding == 'identity' else f"{body.etag}-{encoding}")
+    response = response.make_conditional(request)
+    get_response_cache().record_sent(body, 0 if response.status_code == 304 else len(data))
+    return response
+
+
+class ResponseCache:
+    """Per-process LRU of encoded response bodies, bounded by total bytes.
+
+    Entries live only as long as the data they were built from stays fresh
+    in the TMDB cache, so they never outlive what the slow path would serve.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()  # key -> (body, stored_at, expires_at, age)
+        self._lock = threading.Lock()
+        self._counters = {
+            "hits": 0, "misses": 0, "bytes_sent": 0, "bytes_saved": 0, "encode_seconds_saved": 0.0
+        }
+
+    @staticmethod
+    def _body_size(body):
+        return sum(len(part) for part in (body.identity, body.gzip, body.br) if part)
+
+    def get(self, key):
+        """(body, age) for a live entry, or None"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[2] <= now:
+                if entry is not None:
+                    self._remove(key)
+                self._counters["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counters["hits"] += 1
+            self._counters["encode_seconds_saved"] += entry[0].encode_time
+            return entry[0], entry[3] + int(now - entry[1])
+
+    def set(self, key, body, ttl, age=0):
+        if ttl <= 0:
+            return
+        size = self._body_size(body)
+        if size > self.max_bytes // 10:
+            return
+        now = time.time()
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (body, now, now + ttl, age)
+            self.size += size
+            while self.size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key):
+        body = self._entries.pop(key)[0]
+        self.size -= self._body_size(body)
+
+    def record_sent(self, body, sent):
+        with self._lock:
+            self._counters["bytes_sent"] += sent
+            self._counters["bytes_saved"] += len(body.identity) - sent
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["misses"]
+            return dict(
+                self._counters,
+                encode_seconds_saved=round(self._counters["encode_seconds_saved"], 4),
+                hit_rate=round(self._counters["hits"] / lookups, 4) if lookups else 0.0,
+                entries=len(self._entries),
+                size_bytes=self.size,
+                max_bytes=self.max_bytes,
+                brotli=brotli is not None
+            )
+
+
+_response_cache = None
+
+
+def response_cache_samples():
+    """This process's response cache counters for /metrics; none until it is first used"""
+    if _response_cache is None:
+        return []
+    stats = _response_cache.stats()
+    return [
+        ('response_cache_hits_total', (), stats['hits']),
+        ('response_cache_misses_total', (), stats['misses']),
+        ('response_cache_bytes_sent_total', (), stats['bytes_sent']),
+    ]
+
+
+metrics.register_collector(response_cache_samples)
+
+
+def get_response_cache():
+    global _response_cache
+    if _response_cache is None:
+        _response_cache = ResponseCache(current_app.config.get('RESPONSE_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+    return _response_cache
+
+
+def error_response(data):
+    """Response for a TMDB client error dict.
+
+    Sent with its status_code (502 when it has none) and Retry-After when
+    the client knows how long to wait. Upstream failures are marked
+    no-store so no cache mistakes them for content.
+    """
+    response = jsonify(data)
+    response.status_code = data.get('status_code') or 502
+    if data.get('retry_after'):
+        response.headers['Retry-After'] = str(data['retry_after'])
+    if response.status_code >= 500:
+        response.cache_control.no_store = True
+    return response
+
+
+def cached_json(key, build):
+    """Serve `build()`'s JSON from the encoded-response cache.
+
+    `build` returns the data dict; it is cached for as long as the TMDB data
+    behind it stays fresh (g.tmdb_fresh_for, set by TMDBClient). Errors are
+    neither encoded nor cached; they go out through error_response().
+    """
+    cache = get_response_cache()
+    hit = cache.get(key)
+    if hit is not None:
+        body, age = hit
+        g.tmdb_cache_age = age
+        return send_encoded(body)
+    data = build()
+    if isinstance(data, dict) and 'error' in data:
+        return error_response(data)
+    body = encode_body(data)
+    cache.set(key, body, g.get('tmdb_fresh_for', 0), g.get('tmdb_cache_age') or 0)
+    return send_encoded(body)
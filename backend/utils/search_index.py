@@ -0,0 +1,244 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+RESULTS_PER_PAGE = 20
+
+# Above this many matches bm25 scoring every hit gets expensive, so broad
+# queries ("the", "st") are ordered by popularity alone
+BROAD_MATCH_THRESHOLD = 1000
+
+# Fields kept per movie, matching the shape of TMDB list results
+MOVIE_FIELDS = (
+    'id', 'title', 'original_title', 'overview', 'release_date', 'popularity',
+    'vote_average', 'vote_count', 'poster_path', 'backdrop_path', 'genre_ids', 'adult'
+)
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def build_match_query(query):
+    """Turn free text into an FTS5 prefix query over the title columns"""
+    tokens = TOKEN_RE.findall(query.lower())
+    if not tokens:
+        return None
+    terms = " ".join(f'"{token}"*' for token in tokens)
+    return f"{{title original_title}} : {terms}"
+
+
+def movies_from_payload(endpoint, data):
+    """Extract movie records from any TMDB payload (lists, details, appended similar)"""
+    movies = []
+    if not isinstance(data, dict):
+        return movies
+    if re.match(r"^movie/\d+$", endpoint.strip('/')) and data.get('title'):
+        movie = dict(data)
+        movie['genre_ids'] = [g['id'] for g in data.get('genres', []) if 'id' in g]
+        movies.append(movie)
+        data = data.get('similar') or {}
+    for item in data.get('results') or []:
+        # Trending and search can include people and TV shows
+        if item.get('media_type', 'movie') == 'movie' and item.get('id') and item.get('title'):
+            movies.append(item)
+    return movies
+
+
+class SearchIndex:
+    """SQLite FTS5 index of every movie we have seen from TMDB.
+
+    Lives in its own file so it can be rebuilt or deleted independently of
+    the main database; one connection per thread and per process.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._create_tables(self._connection())
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _create_tables(self, conn):
+        conn.executescript('''
+            CREATE TABLE IF NOT EXISTS movies(
+                id INTEGER PRIMARY KEY,
+                title TEXT NOT NULL,
+                original_title TEXT,
+                overview TEXT,
+                release_date TEXT,
+                popularity REAL NOT NULL DEFAULT 0,
+                vote_average REAL,
+                vote_count INTEGER,
+                poster_path TEXT,
+                backdrop_path TEXT,
+                genre_ids TEXT,
+                adult INTEGER NOT NULL DEFAULT 0,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_movies_popularity ON movies(popularity DESC);
+            CREATE VIRTUAL TABLE IF NOT EXISTS movies_fts USING fts5(
+                title, original_title,
+                content='movies', content_rowid='id', prefix='2 3',
+                tokenize='unicode61 remove_diacritics 2'
+            );
+            CREATE TRIGGER IF NOT EXISTS movies_ai AFTER INSERT ON movies BEGIN
+                INSERT INTO movies_fts(rowid, title, original_title)
+                VALUES (new.id, new.title, new.original_title);
+            END;
+            CREATE TRIGGER IF NOT EXISTS movies_ad AFTER DELETE ON movies BEGIN
+                INSERT INTO movies_fts(movies_fts, rowid, title, original_title)
+                VALUES ('delete', old.id, old.title, old.original_title);
+            END;
+            CREATE TRIGGER IF NOT EXISTS movies_au AFTER UPDATE ON movies BEGIN
+                INSERT INTO movies_fts(movies_fts, rowid, title, original_title)
+                VALUES ('delete', old.id, old.title, old.original_title);
+                INSERT INTO movies_fts(rowid, title, original_title)
+                VALUES (new.id, new.title, new.original_title);
+            END;
+        ''')
+
+    def add_movies(self, movies):
+        rows = [
+            (
+                movie['id'], movie['title'], movie.get('original_title'),
+                movie.get('overview'), movie.get('release_date'),
+                movie.get('popularity') or 0, movie.get('vote_average'),
+                movie.get('vote_count'), movie.get('poster_path'),
+                movie.get('backdrop_path'), json.dumps(movie.get('genre_ids') or []),
+                1 if movie.get('adult') else 0, time.time()
+            )
+            for movie in movies
+            if not movie.get('adult')
+        ]
+        if not rows:
+            return 0
+        conn = self._connection()
+        with conn:
+            conn.executemany('''
+                INSERT INTO movies (id, title, original_title, overview, release_date,
+                    popularity, vote_average, vote_count, poster_path, backdrop_path,
+                    genre_ids, adult, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET
+                    title = excluded.title,
+                    original_title = excluded.original_title,
+                    overview = COALESCE(excluded.overview, overview),
+                    release_date = COALESCE(excluded.release_date, release_date),
+                    popularity = excluded.popularity,
+                    vote_average = COALESCE(excluded.vote_average, vote_average),
+                    vote_count = COALESCE(excluded.vote_count, vote_count),
+                    poster_path = COALESCE(excluded.poster_path, poster_path),
+                    backdrop_path = COALESCE(excluded.backdrop_path, backdrop_path),
+                    genre_ids = excluded.genre_ids,
+                    adult = excluded.adult,
+                    updated_at = excluded.updated_at
+            ''', rows)
+        return len(rows)
+
+    def index_payload(self, endpoint, data):
+        return self.add_movies(movies_from_payload(endpoint, data))
+
+    def search(self, query, page=1, per_page=RESULTS_PER_PAGE):
+        """Ranked title search returning a TMDB-shaped results page"""
+        match = build_match_query(query)
+        page = max(1, page)
+        if match is None:
+            return {"page": page, "results": [], "total_results": 0, "total_pages": 0}
+        conn = self._connection()
+        total = conn.execute(
+            'SELECT COUNT(*) FROM movies_fts WHERE movies_fts MATCH ?', (match,)
+        ).fetchone()[0]
+        if total > BROAD_MATCH_THRESHOLD:
+            sql = '''
+                SELECT * FROM movies
+                WHERE id IN (SELECT rowid FROM movies_fts WHERE movies_fts MATCH ?)
+                ORDER BY popularity DESC
+                LIMIT ? OFFSET ?
+            '''
+        else:
+            # bm25 is negative (lower is better); scaling it up by popularity
+            # keeps well-known films above obscure exact matches
+            sql = '''
+                SELECT m.* FROM movies_fts
+                JOIN movies m ON m.id = movies_fts.rowid
+                WHERE movies_fts MATCH ?
+                ORDER BY bm25(movies_fts, 10.0, 5.0) * (1 + m.popularity / 100.0)
+                LIMIT ? OFFSET ?
+            '''
+        rows = conn.execute(sql, (match, per_page, (page - 1) * per_page)).fetchall()
+        return {
+            "page": page,
+            "results": [self._row_to_movie(row) for row in rows],
+            "total_results": total,
+            "total_pages": (total + per_page - 1) // per_page,
+            "source": "local"
+        }
+
+    def _row_to_movie(self, row):
+        movie = {field: row[field] for field in MOVIE_FIELDS}
+        movie['genre_ids'] = json.loads(row['genre_ids'] or '[]')
+        movie['adult'] = False
+        return movie
+
+    def all_movies(self):
+        rows = self._connection().execute(
+            'SELECT id, title, popularity, release_date, poster_path FROM movies'
+        )
+        for row in rows:
+            yield dict(row)
+
+    def movie_features(self):
+        """Genres, release date and popularity of every movie, for the similarity index"""
+        rows = self._connection().execute(
+            'SELECT id, genre_ids, release_date, popularity FROM movies'
+        )
+        for row in rows:
+            yield {
+                'id': row['id'],
+                'genre_ids': json.loads(row['genre_ids'] or '[]'),
+                'release_date': row['release_date'],
+                'popularity': row['popularity']
+            }
+
+    def get_movies(self, movie_ids):
+        """Movies by id, as stored list items"""
+        if not movie_ids:
+            return {}
+        placeholders = ','.join('?' * len(movie_ids))
+        rows = self._connection().execute(
+            f'SELECT * FROM movies WHERE id IN ({placeholders})', list(movie_ids)
+        )
+        return {row['id']: self._row_to_movie(row) for row in rows}
+
+    def count(self):
+        return self._connection().execute('SELECT COUNT(*) FROM movies').fetchone()[0]
+
+
+_search_index = None
+
+
+def get_search_index(config=None):
+    """Get the local search index, or None when SEARCH_INDEX_ENABLED is off"""
+    global _search_index
+    if config is None:
+        from flask import current_app
+        config = current_app.config
+    if not config.get('SEARCH_INDEX_ENABLED', True):
+        return None
+    if _search_index is None:
+        _search_index = SearchIndex(config['SEARCH_INDEX_PATH'])
+    return _search_index
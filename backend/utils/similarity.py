@@ -0,0 +1,369 @@
+import math
+import threading
+
+import numpy as np
+
+from utils.projection import CARD_FIELDS, project
+
+# TMDB movie genres; each is one column of the genre block
+GENRE_IDS = (28, 12, 16, 35, 80, 99, 18, 10751, 14, 36, 27, 10402, 9648, 10749, 878, 10770, 53, 10752, 37)
+GENRE_COLUMNS = {genre_id: column for column, genre_id in enumerate(GENRE_IDS)}
+
+# Top-billed cast and crew (directors first) hashed into this many buckets
+TOP_CAST = 6
+TOP_CREW = 3
+PEOPLE_BUCKETS = 1 << 14
+MAX_PEOPLE = TOP_CAST + TOP_CREW
+
+# Release years are binned per year (bin 0 is "unknown") and popularity per
+# doubling; nearby bins count as similar
+YEAR_MIN = 1870
+YEAR_BINS = 180
+YEAR_SCALE = 8.0
+POPULARITY_BINS = 20
+POPULARITY_SCALE = 2.0
+
+# Each feature block is unit-normalized and scaled by the square root of its
+# weight, so the cosine of two full vectors is the weighted sum of the
+# per-block cosines
+WEIGHTS = {"genres": 0.4, "people": 0.35, "year": 0.15, "popularity": 0.1}
+
+# Every SAMPLE_STRIDE-th score sets the cut-off for the top-k candidates
+SAMPLE_STRIDE = 16
+
+# People added since the last rebuild of the bucket index before it is rebuilt
+REBUILD_PENDING = 50000
+
+
+def _kernel(bins, scale, unknown_bin=None):
+    offsets = np.arange(bins)[:, None] - np.arange(bins)[None, :]
+    kernel = np.exp(-(offsets / scale) ** 2).astype(np.float32)
+    if unknown_bin is not None:
+        kernel[unknown_bin, :] = 0
+        kernel[:, unknown_bin] = 0
+    return kernel
+
+
+def _person_bucket(person_id):
+    # Multiplicative hash: ids are sequential, buckets should not be
+    return (person_id * 2654435761) % (1 << 32) % PEOPLE_BUCKETS
+
+
+def movie_features(movie):
+    """(genre columns, year bin, popularity bin, people buckets or None) for a TMDB movie"""
+    genre_ids = movie.get('genre_ids')
+    if genre_ids is None:
+        genre_ids = [g.get('id') for g in movie.get('genres') or []]
+    genres = tuple(sorted({GENRE_COLUMNS[g] for g in genre_ids if g in GENRE_COLUMNS}))
+    release_date = movie.get('release_date') or ""
+    year = int(release_date[:4]) if release_date[:4].isdigit() else None
+    year_bin = min(max(year - YEAR_MIN + 1, 1), YEAR_BINS - 1) if year else 0
+    popularity = float(movie.get('popularity') or 0)
+    popularity_bin = min(int(math.log2(1 + max(popularity, 0))), POPULARITY_BINS - 1)
+    credits = movie.get('credits')
+    people = None
+    if isinstance(credits, dict):
+        cast = [p['id'] for p in (credits.get('cast') or [])[:TOP_CAST] if p.get('id')]
+        crew = sorted(credits.get('crew') or [], key=lambda p: p.get('job') != 'Director')
+        crew = [p['id'] for p in crew[:TOP_CREW] if p.get('id')]
+        people = tuple(dict.fromkeys(_person_bucket(i) for i in cast + crew))
+    return genres, year_bin, popularity_bin, people
+
+
+def top_k(scores, k):
+    """Indexes of the k highest scores, best first"""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.zeros(0, dtype=np.intp)
+    # The k-th best of a strided sample is a lower bound for the k-th best
+    # overall, so only entries scoring at least that are ranked
+    stride = max(1, min(SAMPLE_STRIDE, len(scores) // (k * 4)))
+    threshold = np.partition(scores[::stride], -k)[-k]
+    candidates = np.flatnonzero(scores >= threshold)
+    top = candidates[np.argpartition(scores[candidates], -k)[-k:]]
+    return top[np.argsort(-scores[top], kind='stable')]
+
+
+class SimilarityIndex:
+    """Content-based "similar movies" over a precomputed feature matrix.
+
+    Every movie is a vector of four unit-normalized, weighted blocks: genre
+    one-hots, hashed top cast/crew, a release-year bump and a popularity
+    bump. Vectors are stored factorized by block: the genre block as an id
+    into a small matrix of distinct genre combinations, year and popularity
+    as one joint bin into precomputed kernels, and people as bucket ids with
+    an inverted index from bucket to movies. A query scores every movie with
+    two gathers over contiguous arrays plus the movies sharing a bucket,
+    then ranks only those above a sampled top-k threshold.
+    """
+
+    def __init__(self, capacity=1024):
+        self._slots = {}
+        self._ids = np.zeros(capacity, dtype=np.int64)
+        # Index arrays are intp so np.take needs no conversion per query
+        self._genres = np.zeros(capacity, dtype=np.intp)
+        self._bins = np.zeros(capacity, dtype=np.intp)  # year bin * POPULARITY_BINS + popularity bin
+        self._people = np.full((capacity, MAX_PEOPLE), -1, dtype=np.int32)
+        self._people_count = np.zeros(capacity, dtype=np.float32)
+        self._patterns = {(): 0}
+        self._pattern_vectors = np.zeros((1, len(GENRE_IDS)), dtype=np.float32)
+        self._year_kernel = _kernel(YEAR_BINS, YEAR_SCALE, unknown_bin=0) * WEIGHTS["year"]
+        self._popularity_kernel = _kernel(POPULARITY_BINS, POPULARITY_SCALE) * WEIGHTS["popularity"]
+        # Bucket -> slots: a sorted base built in bulk plus per-bucket additions
+        self._bucket_ptr = np.zeros(PEOPLE_BUCKETS + 1, dtype=np.int64)
+        self._bucket_slots = np.zeros(0, dtype=np.int32)
+        self._bucket_added = {}
+        self._pending = 0
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._slots)
+
+    def __contains__(self, movie_id):
+        return movie_id in self._slots
+
+    def add_movies(self, movies):
+        """Add or update movies; payloads without credits keep the people already known"""
+        with self._lock:
+            for movie in movies:
+                if movie.get('id'):
+                    self._set(movie['id'], *movie_features(movie))
+            if self._pending > REBUILD_PENDING:
+                self._rebuild_buckets()
+
+    def load(self, movies):
+        """Bulk add, rebuilding the bucket index once at the end"""
+        with self._lock:
+            for movie in movies:
+                if movie.get('id'):
+                    self._set(movie['id'], *movie_features(movie), index_people=False)
+            self._rebuild_buckets()
+
+    def _set(self, movie_id, genres, year_bin, popularity_bin, people, index_people=True):
+        slot = self._slots.get(movie_id)
+        if slot is None:
+            slot = len(self._slots)
+            if slot == len(self._ids):
+                self._grow()
+            self._slots[movie_id] = slot
+            self._ids[slot] = movie_id
+        self._genres[slot] = self._pattern(genres)
+        self._bins[slot] = year_bin * POPULARITY_BINS + popularity_bin
+        if people is None:
+            return
+        previous = set(self._people[slot][self._people[slot] >= 0].tolist())
+        self._people[slot] = -1
+        self._people[slot, :len(people)] = people
+        self._people_count[slot] = len(people)
+        if index_people:
+            # Buckets the movie left are filtered out at query time
+            for bucket in set(people) - previous:
+                self._bucket_added.setdefault(bucket, []).append(slot)
+                self._pending += 1
+
+    def _grow(self):
+        capacity = len(self._ids) * 2
+        for name in ('_ids', '_genres', '_bins', '_people_count'):
+            array = getattr(self, name)
+            grown = np.zeros(capacity, dtype=array.dtype)
+            grown[:len(array)] = array
+            setattr(self, name, grown)
+        people = np.full((capacity, MAX_PEOPLE), -1, dtype=np.int32)
+        people[:len(self._people)] = self._people
+        self._people = people
+
+    def _pattern(self, genres):
+        pattern = self._patterns.get(genres)
+        if pattern is None:
+            vector = np.zeros((1, len(GENRE_IDS)), dtype=np.float32)
+            vector[0, list(genres)] = 1 / math.sqrt(len(genres))
+            pattern = len(self._patterns)
+            self._patterns[genres] = pattern
+            self._pattern_vectors = np.vstack([self._pattern_vectors, vector])
+        return pattern
+
+    def _rebuild_buckets(self):
+        n = len(self._slots)
+        people = self._people[:n]
+        slots, columns = np.nonzero(people >= 0)
+        buckets = people[slots, columns]
+        order = np.argsort(buckets, kind='stable')
+        self._bucket_slots = slots[order].astype(np.int32)
+        self._bucket_ptr = np.searchsorted(buckets[order], np.arange(PEOPLE_BUCKETS + 1))
+        self._bucket_added = {}
+        self._pending = 0
+
+    def _bucket_members(self, bucket):
+        base = self._bucket_slots[self._bucket_ptr[bucket]:self._bucket_ptr[bucket + 1]]
+        added = self._bucket_added.get(bucket)
+        return np.concatenate([base, np.array(added, dtype=np.int32)]) if added else base
+
+    def _scores(self, slots):
+        """Mean cosine of every indexed movie to the movies in `slots`"""
+        n = len(self._slots)
+        slots = np.asarray(slots, dtype=np.intp)
+        # The genre and bin blocks are linear in the seed vectors, so they are averaged first
+        seed_genres = self._pattern_vectors[self._genres[slots]].mean(axis=0) * WEIGHTS["genres"]
+        year_bins, popularity_bins = np.divmod(self._bins[slots], POPULARITY_BINS)
+        bin_scores = (
+            self._year_kernel[year_bins].mean(axis=0)[:, None]
+            + self._popularity_kernel[popularity_bins].mean(axis=0)[None, :]
+        ).ravel()
+        scores = np.take(self._pattern_vectors @ seed_genres, self._genres[:n])
+        scores += np.take(bin_scores, self._bins[:n])
+
+        people = self._people[slots]
+        seeds, columns = np.nonzero(people >= 0)
+        if len(seeds):
+            buckets = people[seeds, columns]
+            members = [self._bucket_members(b) for b in buckets]
+            lengths = [len(m) for m in members]
+            candidates = np.concatenate(members)
+            expected = np.repeat(buckets, lengths)
+            weights = np.repeat(1 / np.sqrt(self._people_count[slots][seeds]), lengths)
+            # Drop entries for buckets a movie has since left
+            valid = (self._people[candidates] == expected[:, None]).any(axis=1)
+            shared, inverse = np.unique(candidates[valid], return_inverse=True)
+            overlap = np.bincount(inverse, weights=weights[valid])
+            scores[shared] += (WEIGHTS["people"] / len(slots)) * overlap / np.sqrt(self._people_count[shared])
+        return scores
+
+    def similar(self, movie_id, k=10):
+        """[(movie_id, score)] for the k most similar movies, best first; None if unknown"""
+        with self._lock:
+            slot = self._slots.get(movie_id)
+            if slot is None:
+                return None
+            n = len(self._slots)
+            scores = self._scores([slot])
+            scores[slot] = -np.inf
+            k = min(k, n - 1)
+            if k <= 0:
+                return []
+            top = top_k(scores, k)
+            return [(int(self._ids[i]), round(float(scores[i]), 4)) for i in top]
+
+    def scores(self, movie_ids):
+        """(ids, scores): every indexed movie's mean similarity to movie_ids.
+
+        Slots only ever grow, so arrays from different calls line up when
+        cut to the shortest.
+        """
+        with self._lock:
+            n = len(self._slots)
+            slots = [self._slots[i] for i in movie_ids if i in self._slots]
+            scores = self._scores(slots) if slots else np.zeros(n, dtype=np.float32)
+            return self._ids[:n].copy(), scores
+
+    def popularity(self):
+        """(ids, popularity of every indexed movie on a 0-1 scale, log-binned)"""
+        with self._lock:
+            n = len(self._slots)
+            popularity = (self._bins[:n] % POPULARITY_BINS).astype(np.float32) / (POPULARITY_BINS - 1)
+            return self._ids[:n].copy(), popularity
+
+    def stats(self):
+        with self._lock:
+            n = len(self._slots)
+            return {
+                "movies": n,
+                "with_people": int(np.count_nonzero(self._people_count[:n])),
+                "genre_patterns": len(self._patterns),
+                "pending_people": self._pending
+            }
+
+
+_similarity_index = None
+_similarity_lock = threading.Lock()
+_build_thread = None
+_build_lock = threading.Lock()
+
+
+def get_similarity_index():
+    """Get the per-process index, building it from local data on first use.
+
+    The build reads every movie known locally, so only background threads
+    (the ranker, build_similarity_index_async) should be the first caller.
+    """
+    global _similarity_index
+    if _similarity_index is None:
+        with _similarity_lock:
+            if _similarity_index is None:
+                index = SimilarityIndex()
+                index.load(_known_movies())
+                _similarity_index = index
+    return _similarity_index
+
+
+def build_similarity_index_async(app):
+    """Build this process's index on a daemon thread unless it exists or is being built"""
+    global _build_thread
+    with _build_lock:
+        if _similarity_index is not None or (_build_thread is not None and _build_thread.is_alive()):
+            return
+
+        def build():
+            with app.app_context():
+                try:
+                    get_similarity_index()
+                except Exception as e:
+                    print(f"Similarity index build failed: {e}")
+
+        _build_thread = threading.Thread(target=build, name="similarity-build", daemon=True)
+        _build_thread.start()
+
+
+def ready_similarity_index():
+    """The index if this process has built it, else None (a build is started)"""
+    if _similarity_index is None:
+        from flask import current_app
+        build_similarity_index_async(current_app._get_current_object())
+    return _similarity_index
+
+
+def _known_movies():
+    """Everything seen from TMDB: indexed list items, then cached and snapshot details"""
+    from utils.cache import get_cache
+    from utils.catalog import get_catalog
+    from utils.search_index import get_search_index
+
+    index = get_search_index()
+    if index is not None:
+        yield from index.movie_features()
+    for key, data in get_cache().items():
+        if key.startswith('movie/') and isinstance(data, dict) and 'credits' in data:
+            yield data
+    catalog = get_catalog()
+    if catalog is not None:
+        yield from catalog.movies()
+
+
+def update_similarity(movies):
+    """Feed newly fetched movies into the index if this process has built one"""
+    if _similarity_index is not None and movies:
+        _similarity_index.add_movies(movies)
+
+
+def similar_movies(movie_id, limit=10, fields=CARD_FIELDS, index=None):
+    """Cards for the movies most similar to movie_id, with their score; None if unknown"""
+    from utils.catalog import get_catalog
+    from utils.search_index import get_search_index
+
+    if index is None:
+        index = get_similarity_index()
+    ranked = index.similar(movie_id, limit)
+    if ranked is None:
+        return None
+    index = get_search_index()
+    movies = index.get_movies([i for i, _ in ranked]) if index is not None else {}
+    catalog = get_catalog()
+    results = []
+    for similar_id, score in ranked:
+        movie = movies.get(similar_id)
+        if movie is None and catalog is not None:
+            snapshot = catalog.get_movie(similar_id)
+            movie = snapshot[0] if snapshot else None
+        card = project(movie or {'id': similar_id}, fields)
+        card['score'] = score
+        results.append(card)
+    return results
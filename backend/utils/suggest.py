@@ -0,0 +1,239 @@
+import bisect
+import heapq
+import re
+import sys
+import threading
+import unicodedata
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# Prefixes matching more keys than this are too slow to scan per keystroke,
+# so their top results are memoised until a title under them changes
+MEMO_MIN_RANGE = 1000
+MEMO_SIZE = 20
+MEMO_MAX_PREFIXES = 50000
+
+# Batches larger than this are merged with a full re-sort instead of insort
+REBUILD_BATCH = 500
+
+# Curated recommendations rank like reasonably popular titles
+CURATED_POPULARITY = 100.0
+
+
+def normalize(text):
+    """Lowercase and strip accents so 'Amélie' is found by 'ame'"""
+    text = unicodedata.normalize('NFKD', text.lower())
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+
+def title_keys(title):
+    """Index a title under every word start: 'Star Wars' -> 'star wars', 'wars'"""
+    words = TOKEN_RE.findall(normalize(title))
+    return {" ".join(words[i:]) for i in range(len(words))}
+
+
+class TitleSuggester:
+    """Popularity-weighted prefix suggestions over an in-memory sorted array.
+
+    Each title is stored once in `_movies`; `_keys`/`_ids` are parallel
+    sorted lists of search keys so a prefix maps to a contiguous bisect
+    range. When more than `max_titles` are known, the least popular are
+    dropped.
+    """
+
+    def __init__(self, max_titles=200000):
+        self.max_titles = max_titles
+        self._movies = {}  # id -> (title, popularity, year, poster_path)
+        self._keys = []
+        self._ids = []
+        self._memo = {}
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._movies)
+
+    def load(self, movies):
+        """Replace the contents with `movies` in one sorted build"""
+        with self._lock:
+            self._movies = {}
+            for movie in movies:
+                existing = self._movies.get(movie['id'])
+                if existing is None or existing[1] < float(movie.get('popularity') or 0):
+                    self._remember(movie)
+            self._trim()
+            self._rebuild()
+
+    def add_movies(self, movies):
+        """Incrementally add or update titles"""
+        movies = [m for m in movies if m.get('id') and m.get('title')]
+        with self._lock:
+            if len(movies) > REBUILD_BATCH:
+                for movie in movies:
+                    self._remember(movie)
+                self._trim()
+                self._rebuild()
+                return
+            for movie in movies:
+                movie_id = movie['id']
+                title = movie['title']
+                previous = self._movies.get(movie_id)
+                self._remember(movie)
+                if previous is not None and previous[0] == title:
+                    self._forget_prefixes(title)
+                    continue
+                if previous is not None:
+                    self._remove_keys(movie_id, previous[0])
+                for key in title_keys(title):
+                    index = bisect.bisect_left(self._keys, key)
+                    self._keys.insert(index, key)
+                    self._ids.insert(index, movie_id)
+                self._forget_prefixes(title)
+            if len(self._movies) > self.max_titles:
+                self._trim()
+                self._rebuild()
+
+    def suggest(self, prefix, limit=10):
+        prefix = " ".join(TOKEN_RE.findall(normalize(prefix)))
+        if not prefix or limit <= 0:
+            return []
+        with self._lock:
+            top = self._memo.get(prefix)
+            if top is None or len(top) < min(limit, MEMO_SIZE):
+                top = self._top(prefix, max(limit, MEMO_SIZE))
+            return [self._as_dict(movie_id) for movie_id in top[:limit]]
+
+    def _top(self, prefix, limit):
+        lo = bisect.bisect_left(self._keys, prefix)
+        hi = bisect.bisect_left(self._keys, prefix + "\uffff", lo)
+        ids = set(self._ids[lo:hi])
+        top = heapq.nlargest(limit, ids, key=lambda movie_id: self._movies[movie_id][1])
+        if hi - lo >= MEMO_MIN_RANGE:
+            if len(self._memo) >= MEMO_MAX_PREFIXES:
+                self._memo.clear()
+            self._memo[prefix] = top
+        return top
+
+    def _as_dict(self, movie_id):
+        title, popularity, year, poster_path = self._movies[movie_id]
+        return {"id": movie_id, "title": title, "year": year, "poster_path": poster_path}
+
+    def _remember(self, movie):
+        release_date = movie.get('release_date') or ""
+        self._movies[movie['id']] = (
+            movie['title'],
+            float(movie.get('popularity') or 0),
+            int(release_date[:4]) if release_date[:4].isdigit() else None,
+            movie.get('poster_path')
+        )
+
+    def _remove_keys(self, movie_id, title):
+        for key in title_keys(title):
+            lo = bisect.bisect_left(self._keys, key)
+            hi = bisect.bisect_right(self._keys, key, lo)
+            for index in range(lo, hi):
+                if self._ids[index] == movie_id:
+                    del self._keys[index]
+                    del self._ids[index]
+                    break
+
+    def _forget_prefixes(self, title):
+        if not self._memo:
+            return
+        for key in title_keys(title):
+            for length in range(1, len(key) + 1):
+                self._memo.pop(key[:length], None)
+
+    def _trim(self):
+        if len(self._movies) <= self.max_titles:
+            return
+        # Drop 10% below the budget so trimming is not repeated on every insert
+        keep = int(self.max_titles * 0.9)
+        kept = heapq.nlargest(keep, self._movies.items(), key=lambda item: item[1][1])
+        self._movies = dict(kept)
+
+    def _rebuild(self):
+        pairs = sorted(
+            (key, movie_id)
+            for movie_id, movie in self._movies.items()
+            for key in title_keys(movie[0])
+        )
+        self._keys = [key for key, _ in pairs]
+        self._ids = [movie_id for _, movie_id in pairs]
+        self._memo = {}
+
+    def memory_estimate(self):
+        """Rough bytes held by the structure, for checking the budget"""
+        size = sys.getsizeof(self._keys) + sys.getsizeof(self._ids) + sys.getsizeof(self._movies)
+        size += sum(sys.getsizeof(key) for key in self._keys)
+        size += sum(sys.getsizeof(movie) + sys.getsizeof(movie[0]) for movie in self._movies.values())
+        return size
+
+
+_suggester = None
+_suggester_lock = threading.Lock()
+_build_thread = None
+_build_lock = threading.Lock()
+
+
+def get_suggester():
+    """Get the per-process suggester, building it from local data on first use.
+
+    The build sorts every title known locally, so only background threads
+    (build_suggester_async) should be the first caller.
+    """
+    global _suggester
+    if _suggester is None:
+        with _suggester_lock:
+            if _suggester is None:
+                from flask import current_app
+                suggester = TitleSuggester(current_app.config.get('SUGGEST_MAX_TITLES', 200000))
+                suggester.load(_known_movies())
+                _suggester = suggester
+    return _suggester
+
+
+def build_suggester_async(app):
+    """Build this process's suggester on a daemon thread unless it exists or is being built"""
+    global _build_thread
+    with _build_lock:
+        if _suggester is not None or (_build_thread is not None and _build_thread.is_alive()):
+            return
+
+        def build():
+            with app.app_context():
+                try:
+                    get_suggester()
+                except Exception as e:
+                    print(f"Suggester build failed: {e}")
+
+        _build_thread = threading.Thread(target=build, name="suggester-build", daemon=True)
+        _build_thread.start()
+
+
+def ready_suggester():
+    """The suggester if this process has built it, else None (a build is started)"""
+    if _suggester is None:
+        from flask import current_app
+        build_suggester_async(current_app._get_current_object())
+    return _suggester
+
+
+def _known_movies():
+    from utils.search_index import get_search_index
+    from models.recommendation_model import get_all_recommendations
+
+    index = get_search_index()
+    if index is not None:
+        yield from index.all_movies()
+    for rec in get_all_recommendations():
+        yield {
+            'id': rec['movie_id'],
+            'title': rec['movie_title'],
+            'popularity': CURATED_POPULARITY
+        }
+
+
+def notify_movies(movies):
+    """Feed newly fetched movies into the suggester if this process has built one"""
+    if _suggester is not None and movies:
+        _suggester.add_movies(movies)
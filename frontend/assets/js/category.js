@@ -242,7 +242,7 @@ function showSkeletonLoading(container, count) {
 
 // Create movie card
 function createMovieCard(movie) {
-    const posterUrl = getImageUrl(movie.poster_path);
+    const posterUrl = getImageUrl(movie.poster_path, TMDB_CARD_SIZE);
     const year = getMovieYear(movie.release_date);
     const rating = formatRating(movie.vote_average);
     
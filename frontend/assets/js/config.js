@@ -13,11 +13,13 @@ const getApiBaseUrl = () => {
 
 const API_BASE_URL = getApiBaseUrl();
 
-// TMDB image base URLs
-const TMDB_IMAGE_BASE = 'https://image.tmdb.org/t/p';
+// TMDB images, through the backend's caching image proxy
+const TMDB_IMAGE_BASE = API_BASE_URL.replace(/\/$/, '') + '/img';
 
 // Image sizes
 const TMDB_POSTER_SIZE = 'w500';
+// Grid cards: one of the backend's IMAGE_THUMBNAIL_WIDTHS, resized by the proxy
+const TMDB_CARD_SIZE = 'w320';
 const TMDB_BACKDROP_SIZE = 'w1280';
 const TMDB_PROFILE_SIZE = 'w185';
 
@@ -75,6 +77,7 @@ const APP_CONFIG = {
     // TMDB Settings
     TMDB_IMAGE_BASE: TMDB_IMAGE_BASE,
     TMDB_POSTER_SIZE: TMDB_POSTER_SIZE,
+    TMDB_CARD_SIZE: TMDB_CARD_SIZE,
     TMDB_BACKDROP_SIZE: TMDB_BACKDROP_SIZE,
     TMDB_PROFILE_SIZE: TMDB_PROFILE_SIZE,
     
@@ -186,7 +186,7 @@ function renderSimilarMovies(similar) {
 
 // Create movie card (reused from main.js)
 function createMovieCard(movie) {
-    const posterUrl = getImageUrl(movie.poster_path);
+    const posterUrl = getImageUrl(movie.poster_path, TMDB_CARD_SIZE);
     const year = getMovieYear(movie.release_date);
     const rating = formatRating(movie.vote_average);
     
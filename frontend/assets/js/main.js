@@ -185,7 +185,7 @@ function renderMovies(container, movies) {
 // Create movie card HTML
 function createMovieCard(movie) {
     const posterUrl = movie.poster_path 
-        ? `${TMDB_IMAGE_BASE}/${TMDB_POSTER_SIZE}${movie.poster_path}`
+        ? `${TMDB_IMAGE_BASE}/${TMDB_CARD_SIZE}${movie.poster_path}`
         : 'assets/images/placeholder.jpg';
     
     const year = movie.release_date ? new Date(movie.release_date).getFullYear() : 'N/A';